@@ -1,6 +1,12 @@
 
 
-switch_file = open('../switch.py', 'r+').readlines()
+import os
+
+# every example imports switch.py (upload switch.py and its modules to the hub
+# as well); the other classes are imported from their own modules
+header = [
+    "from switch import *",
+]
 
 suffixes = {
     '1sensor_1motor': [
@@ -14,6 +20,11 @@ suffixes = {
         "controller.run()"
     ],
     'mindstorms_51515_1_1': [
+        "from pybricks.hubs import ThisHub",
+        "from pybricks.parameters import Side",
+        "from switch_ultrasonic import SwitchUltrasonicSensor",
+        "from switch_ir import SwitchIRSensor",
+        "",
         "hub = ThisHub()",
         "hub.display.orientation(Side.BOTTOM)",
         "controller = SwitchController(hub)",
@@ -32,15 +43,18 @@ suffixes = {
         "controller.run()"
     ],
     'mindstorms_51515_1_1_1': [
-        "hub = PrimeHub()",
+        "from pybricks.hubs import ThisHub",
+        "from pybricks.parameters import Side",
+        "",
+        "hub = ThisHub()",
         "hub.display.orientation(Side.BOTTOM)",
         "controller = SwitchController(hub)"
         "",
         "# configure your switch layout here",
         "sensor1 = SwitchSensor(Port.A)",
-        "sensor1.set_init_timeout(60)",
+        "sensor1.set_init_timeout_ms(3000)",
         "sensor2 = SwitchSensor(Port.D)",
-        "sensor2.set_init_timeout(20)",
+        "sensor2.set_init_timeout_ms(1000)",
         "sensor3 = SwitchSensor(Port.E)",
         "motor1 = SwitchMotor(Port.C, probability_curved_to_straight=0.8, probability_straight_to_curved=0.8)",
         "motor2 = SwitchMotor(Port.F, probability_curved_to_straight=0.8, probability_straight_to_curved=0.8)",
@@ -88,10 +102,12 @@ suffixes = {
         "controller.run()"
     ],
     '2sensor_1motor': [
+        "from switch_smart import SmartSensor",
+        "",
         "controller = SwitchController()",
         "",
         "pre_sensor = SwitchSensor(Port.A)",
-        "post_sensor = SwitchSensor(Port.B, post_sensor_init_timeout=50, post_sensor_delay=100)",
+        "post_sensor = SwitchSensor(Port.B, post_sensor_init_timeout_ms=2500, post_sensor_delay_ms=5000)",
         "post_sensors = {(SwitchPosition.STRAIGHT,): post_sensor}",
         "smart_sensor = SmartSensor(pre_sensor, post_sensors=post_sensors)",
         "",
@@ -102,8 +118,8 @@ suffixes = {
     ]
 }
 
-for name, suffix in suffixes.items():
-    with open(name + '.py', 'w+') as out:
-        out.writelines(switch_file)
-        for line in ['\n\n'] + suffix:
-            out.write(line + '\n')
\ No newline at end of file
+if __name__ == '__main__':
+    for name, suffix in suffixes.items():
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name + '.py'), 'w+') as out:
+            for line in header + [''] + suffix:
+                out.write(line + '\n')
\ No newline at end of file
@@ -0,0 +1,52 @@
+from pybricks.parameters import Port
+from pybricks.tools import StopWatch
+from gc import collect, mem_alloc, mem_free
+
+"""
+Prints how many bytes of the heap the modules of switch.py, a sensor, a
+SmartSensor, a motor and the controller take on the hub, and how long it takes
+to import the modules. Run this program on the hub (with switch.py and its
+modules uploaded next to it) to check how large a switch layout can become
+before the hub runs out of RAM.
+
+This measures the current classes only. tools/bench_memory.py compares two
+revisions of the classes, but on the host (CPython), not on the hub.
+
+Connect a distance sensor to Port.A and a motor to Port.B. The motor is not
+calibrated (turn_degrees is given), so it does not need to be connected to a
+switch.
+"""
+
+def measure(factory, *args, **kwargs):
+    collect()
+    before = mem_alloc()
+    obj = factory(*args, **kwargs)
+    collect()
+    return obj, mem_alloc() - before
+
+
+def measure_import(name):
+    watch = StopWatch()
+    module, module_bytes = measure(__import__, name)
+    print("Import of %s: %s bytes, %s ms" % (name, module_bytes, watch.time()))
+    return module
+
+
+switch = measure_import('switch')
+# the modules which are only imported if the layout needs them
+measure_import('switch_sensor')
+measure_import('switch_distance')
+switch_smart = measure_import('switch_smart')
+
+controller, controller_bytes = measure(switch.SwitchController)
+sensor, sensor_bytes = measure(switch.SwitchSensor, Port.A)
+smart_sensor, smart_sensor_bytes = measure(switch_smart.SmartSensor, sensor)
+motor, motor_bytes = measure(switch.SwitchMotor, Port.B, turn_degrees=90)
+
+print("Bytes per SwitchController: %s" % controller_bytes)
+print("Bytes per sensor (%s): %s" % (sensor, sensor_bytes))
+print("Bytes per SmartSensor: %s" % smart_sensor_bytes)
+print("Bytes per SwitchMotor: %s" % motor_bytes)
+
+collect()
+print("Heap allocated: %s, heap free: %s" % (mem_alloc(), mem_free()))
@@ -1,21 +1,36 @@
-from pybricks.pupdevices import Motor, ColorDistanceSensor, InfraredSensor, ColorSensor, UltrasonicSensor
+from pybricks.pupdevices import Motor
 from pybricks.parameters import Port, Direction, Button, Color, Stop, Side
-from pybricks.tools import wait, Matrix, vector
+from pybricks.tools import wait, Matrix, StopWatch
 from pybricks.iodevices import PUPDevice
 from pybricks.hubs import ThisHub
-from urandom import random, uniform
-from umath import ceil
+from urandom import getrandbits
+from micropython import const
+
+# The sensor classes, the SmartSensor and the LightMatrix live in their own
+# modules (switch_sensor.py with the base class SwitchSensor_,
+# switch_distance.py, switch_ir.py, switch_ultrasonic.py, switch_color.py,
+# switch_smart.py and switch_display.py), like the optional parts
+# (switch_profile.py, switch_schedule.py and switch_policy.py). They are
+# imported only when they are needed, so a hub keeps only the bytecode of the
+# devices of its layout.
 
 def enum(**enums):
     return type('Enum', (), enums)
 
+# small-int constants used internally. MicroPython inlines const() values with
+# a leading underscore, so they neither take RAM nor need an attribute lookup.
+_STRAIGHT = const(0)
+_CURVED = const(1)
+_RISING_EDGE = const(0)
+_FALLING_EDGE = const(1)
+
 """
 SwitchPosition.STRAIGHT means a train would pass the switch in the straight 
 direction.
 SwitchPosition.CURVED means a train would pass the switch in the curved 
 direction (either left or right).
 """
-SwitchPosition = enum(STRAIGHT=0, CURVED=1)
+SwitchPosition = enum(STRAIGHT=_STRAIGHT, CURVED=_CURVED)
 
 """
 SwitchMode.RISING_EDGE means that the switch is randomly moved if an incoming 
@@ -25,357 +40,178 @@ reaches switch (depends on distance of sensor and switch)
 SwitchPosition.FALLING_EDGE means that the switch is randomly moved after a 
 train has been passed the switch/ sensor completly.
 """
-SwitchMode = enum(RISING_EDGE=0, FALLING_EDGE=1)
+SwitchMode = enum(RISING_EDGE=_RISING_EDGE, FALLING_EDGE=_FALLING_EDGE)
+
+_ARRIVED = const(0)
+_CLEARED = const(1)
+_POST_BLOCKED = const(2)
+_POST_FREED = const(3)
 
 """
-The very basic sensor for a switch. Use the concrete implementations like 
-SwitchDistanceSensor to create a specific one or use the generic SwitchSensor()
-method.
-Note that the init_timeout depends on the dt-value (time in ms between two 
-ticks) of the SwitchController. The default dt-value of 50ms combined with 
-init_timeout of 20 means that after 20 * 50ms = 1s without sensor detection a 
-train is considered to be passed completely.
+The events a sensor emits into the EventQueue of the SwitchController, if the
+switch of the sensor has to move.
+SensorEvent.ARRIVED means that a train has been detected (a sensor in
+SwitchMode.RISING_EDGE).
+SensorEvent.CLEARED means that a train has passed the sensor (a sensor in
+SwitchMode.FALLING_EDGE, or a SmartSensor whose pre-sensors became free).
+SensorEvent.POST_BLOCKED and SensorEvent.POST_FREED mean that a post-sensor of
+a SmartSensor has become blocked or free.
 """
-class SwitchSensor_():
-
-    """
-    Creates a SwitchSensor.
-
-    params:
-    -switch_mode: If FALLING_EDGE, the switch moves after a train has passed,
-        if RISING_EDGE, the switch moves after a train has been detected and
-        (hopefully) before the train has reached the switch. Since the moving
-        takes a little bit, the distance between sensor and switch must be large
-        enough and the speed of the train must not be too fast. That's why,
-        FALLING_EDGE is recommended in general.
-    -init_timeout: The initial timeout, which is the number of ticks the sensor
-        needs to be unblocked, until a train is really considered to be passed.
-        This is necessary since the sensor may become unblocked during a train
-        passes (e.g. because of wagons). The time between two ticks is the 'dt'
-        of the SwitchController (default dt=50ms, i.e. 20 ticks per second).
-    -post_sensor_init_timeout: if this sensor is used as post-sensor, then this
-        timeout refers to the number of ticks the sensor stays additionally
-        blocked (after it becomes unblocked according to the usual timeouting).
-        If post_sensor_init_timeout=100, dt=50ms, and init_timeout=20, then
-        after a train passed the sensor, the track is considered to be blocked
-        for another (20+100)*50ms = 6 seconds.
-    -post_sensor_delay: number of ticks to delay the post_sensor_blocking 
-        signal. If the delay is 100, dt=50ms, and a train passes this sensor, 
-        the sensor will be blocked first after 50ms*100=5s (as post-sensor).
-        This is especially useful if a train passing this post-sensor still 
-        needs to drive some seconds until it reaches a potential point of 
-        conflict with an output of another switch setup (where the post-sensor 
-        is used).
-    """
-    def __init__(self, critical_distance, 
-                switch_mode=SwitchMode.FALLING_EDGE, 
-                init_timeout=20, 
-                post_sensor_init_timeout=20, 
-                post_sensor_delay=0):
-        self.critical_distance = critical_distance
-        self.init_timeout = init_timeout
-        self.post_sensor_init_timeout = post_sensor_init_timeout + 1 # +1 because of internal purposess
-        self.post_sensor_timeout = -1
-        self.set_switch_mode(switch_mode) # initializes timeouts
-        self.state = False
-        n = ceil(post_sensor_delay / 8.0)
-        self.delay = bytearray(n)
-        self.delay_end = post_sensor_delay % 8
-        self.post_sensor_delay = post_sensor_delay > 0
-        self.blocked = False
-
-    def __str__(self):
-        return "%s(%s)" % (str(type(self))[8:-2], self.port)
-
-    def tick(self):
-        self._distance()
-        self.state = self._tick()
-        self.is_blocked()
-
-    """
-    Performs a 'tick' of the sensor. 
-    
-    The 'timeout' is used as following: the timeout is resetted (i. e. set to a
-    positive number) if a train is currently detected in front of the train. If no
-    train can be detected this value is decremented. The check is only successful
-    if the timout is not positive anymore (i. e. some time has been passed
-    since a train has been detected and we are not in between waggons by accident)
-    and the a train is currently in front the sensor.
-    """
-    def _tick(self):
-        if self.switch_mode == SwitchMode.RISING_EDGE:
-            if self.distance < self.critical_distance:
-                # a train is in front the sensor
-                if self.timeout <= 0: 
-                    self.reset()
-                    return True
-                self.reset()
-            else:
-                self.decrement()
-        else:
-            if self.distance > self.critical_distance:
-                if self.timeout >= 0:
-                    self.decrement()
-            else:
-                self.reset()
-
-            if self.timeout == 0:
-                # a train is not anymore in front
-                self.timeout = -1
-                return True
-
-        return False
-
-    def check(self):
-        return self.state
-
-    def is_currently_blocked(self):
-        return self.timeout > 0
-
-    def is_blocked(self):
-        currently_blocked = self.is_currently_blocked()
-        if currently_blocked:
-            self.post_sensor_timeout = self.post_sensor_init_timeout
-        elif self.post_sensor_timeout > 0:
-            self.post_sensor_timeout -= 1
-        
-        blocked = self.post_sensor_timeout > 0 
-
-        # delay the blocked signal (if post_sensor_delay > 0)
-        if self.post_sensor_delay:
-            self.blocked = self._delay_binary_state(int(blocked))
-        else:
-            self.blocked = blocked
-        return self.blocked
-
-    def _delay_binary_state(self, new_bit):
-        out = self._get_nth_bit(self.delay[0], self.delay_end)
-
-        # shift the bits in the byte array to the left by one bit
-        for i in range(len(self.delay) - 1):
-            b1 = self.delay[i]
-            b2 = self.delay[i+1]
-            bb2 = self._get_first_bit(b2)
-            b1 = (b1 << 1) | ((1 << bb2) - 1)
-            self.delay[i] = b1
-
-        # shift the last byte to left + insert new bit
-        self.delay[-1] = (self.delay[-1] << 1) | ((1 << new_bit) - 1)
-        return out
-
-    def _get_first_bit(self, byte):
-        return self._get_nth_bit(byte, 0)
-
-    def _get_nth_bit(self, byte, n):
-        first_bit = (byte >> (7 - n)) & 1
-        return first_bit
-
-    def _distance(self):
-        self.distance = self.sensor.distance()
-
-    def decrement(self):
-        self.timeout = max(0, self.timeout - 1)
-        return 
-
-    def reset(self):
-        self.timeout = self.init_timeout
-
-    def reset2wait(self):
-        if self.switch_mode == SwitchMode.RISING_EDGE:
-            self.timeout = self.init_timeout
-        else:
-            self.timeout = -1
-
-    def set_init_timeout(self, init_timeout):
-        self.init_timeout = init_timeout
-
-    def set_switch_mode(self, switch_mode : SwitchMode):
-        self.switch_mode = switch_mode
-        if self.switch_mode == SwitchMode.RISING_EDGE:
-            self.timeout = 0
-        else:
-            self.timeout = -1
+SensorEvent = enum(ARRIVED=_ARRIVED, CLEARED=_CLEARED, POST_BLOCKED=_POST_BLOCKED, POST_FREED=_POST_FREED)
 
-    def sensors(self):
-        return {self}
+# measures the move times of the motors
+_watch = StopWatch()
 
-"""
-A color distance sensor (LEGO item 88007)
-"""
-class SwitchDistanceSensor(SwitchSensor_):
-    # critical distance in %
-    def __init__(self, port : Port, critical_distance=30, *args, **kwargs):
-        super().__init__(critical_distance, *args, **kwargs)
-        self.sensor = ColorDistanceSensor(port)
-        self.port = port
+# the probabilities of the motors are compared as integers in 1/_ONE
+_ONE = const(65535)
 
 """
-The motion/ IR sensor known from LEGO WeDo 2.0 or the Grand Piano (LEGO item 20844)
+A small xorshift pseudo random number generator (the 16 bit variant with the
+shifts 7, 9 and 8, which has the full period of 65535 draws). It only uses
+small integers, so a draw neither allocates memory nor needs floating point
+operations (which are slow on hubs without an FPU). The same seed gives the
+same sequence on the hub and on the host.
 """
-class SwitchIRSensor(SwitchSensor_):
-    # critical distance in %
-    def __init__(self, port : Port, critical_distance=60, *args, **kwargs):
-        super().__init__(critical_distance, *args, **kwargs)
-        self.sensor = InfraredSensor(port)
-        self.port = port
+class XorShift():
+    __slots__ = ('state',)
 
-"""
-The ultrasonic sensor known from LEGO Mindstorms 51515 (LEGO part 37316c01)
-"""
-class SwitchUltrasonicSensor(SwitchSensor_):
-    
-    # critical distance in mm
-    def __init__(self, port : Port, critical_distance=120, *args, **kwargs):
-        super().__init__(critical_distance, *args, **kwargs)
-        self.sensor = UltrasonicSensor(port)
-        self.port = port
+    def __init__(self, seed=1):
+        self.seed(seed)
 
-"""
-The color sensor known from LEGO Mindstorms 51515 (LEGO part 37308c01)
-"""
-class SwitchColorSensor(SwitchSensor_):
-    # critical distance in %
-    def __init__(self, port : Port, critical_distance=95, *args, **kwargs):
-        super().__init__(critical_distance, *args, **kwargs)
-        self.sensor = ColorSensor(port)
-        self.port = port
+    def seed(self, seed):
+        self.state = (seed & 0xFFFF) or 1 # 0 would stay 0
 
-    def distance(self):
-        return 100 - self.sensor.reflection()
+    # returns the next number, between 0 and _ONE - 1
+    def next(self):
+        x = self.state
+        x ^= (x << 7) & 0xFFFF
+        x ^= x >> 9
+        x ^= (x << 8) & 0xFFFF
+        self.state = x
+        return x - 1
 
-# a remote sensor i.e. a sensor that is connected to another hub
-class SwitchRemoteSensor(SwitchSensor_):
-    # todo implement (placeholder so far) (Issue2)
-    pass
+# the generator of the motors which are not registered with a SwitchController
+_rng = XorShift(getrandbits(16))
 
 """
-Creates a SwitchSensor which fits the connected sensor type.
+Returns the SwitchSensor class for the given device id (or None if the device
+is unknown). Only the module of this class is imported.
 """
-def SwitchSensor(port: Port, *args, **kwargs):
-    device = PUPDevice(port)
-    info = device.info()
-    device_id = info['id']
-
+def _sensor_class(device_id):
     # https://github.com/pybricks/technical-info/blob/master/assigned-numbers.md
     if device_id == 37:
-        return SwitchDistanceSensor(port, *args, **kwargs)
+        from switch_distance import SwitchDistanceSensor
+        return SwitchDistanceSensor
     elif device_id == 61:
-        return SwitchColorSensor(port, *args, **kwargs)
+        from switch_color import SwitchColorSensor
+        return SwitchColorSensor
     elif device_id == 62:
-        return SwitchUltrasonicSensor(port, *args, **kwargs)
+        from switch_ultrasonic import SwitchUltrasonicSensor
+        return SwitchUltrasonicSensor
     elif device_id == 35:
-        return SwitchIRSensor(port, critical_distance, *args, **kwargs)
-    else:
-        raise ValueError("Unknown device on port %s" % port)
+        from switch_ir import SwitchIRSensor
+        return SwitchIRSensor
+    return None
+
+# the device ids by port, from the hub storage or a scan (see scan_ports)
+_devices = {}
+_devices_changed = False
+
+# the device ids are stored as magic byte, version byte and one byte per port
+# (A-F), i.e. in _STORAGE_SIZE bytes at this offset of the hub storage (by
+# default, see the storage_offset of the SwitchController)
+_STORAGE_OFFSET = const(0)
+_STORAGE_MAGIC = const(0x53)
+_STORAGE_VERSION = const(1)
+_STORAGE_SIZE = const(8)
+
+def _ports():
+    return [getattr(Port, name) for name in 'ABCDEF' if hasattr(Port, name)]
+
+# returns the device id of the given port (0 if there is no device)
+def _query_device(port):
+    try:
+        return PUPDevice(port).info()['id']
+    except OSError:
+        return 0
+
+def _set_device(port, device_id):
+    global _devices_changed
+    if _devices.get(port) != device_id:
+        _devices[port] = device_id
+        _devices_changed = True
 
 """
-A wrapper class for multiple sensors. 
-
-To type of sensors are distinguished: pre- and post-sensors.
-
-A pre-sensor can be any SwitchSensor and checks if the current switch is
-blocked or not. Compared to the SwitchSensor, multiple pre-sensors can be
-provided. This might be useful to prevent situations in which a train drives in
-front of the (single) sensor, just after the switch moving started. This might
-derail the train. This motivates to place the sensor as far away from the motor/
-switch as possible. On the other hand, this can lead to derailments if a train
-stops on the switch. That's why using multiple sensors might make your track
-saver and leads to less crashes.
-
-A post-sensor can also be any SwitchSensor which checks if an output of the
-switch leads to a currently blocked track. Those sensors can still be used 
-normally in another switch as well. You can even define the delay of such 
-switches (using the post_sensor_delay option of the SwitchSensor) and a timeout
-(using the post_sensor_init_timeout option of the SwitchSensor). The timeout
-extends the blocking state of a post-sensor by the number of timeout cycles
-(depends on dt of the controller, dt=100ms and post_sensor_init_timeout=20 means
-the sensor stays 100ms*20=2s longer blocked - additionally to the init_timeout).   
+Detects the devices on all ports of the hub in a single pass (motor ports
+included). The device ids are stored in the storage of the hub (if a hub is
+given) at the given offset, so the next boot can reuse them without querying
+the ports again (see load_ports). Returns a dict from ports to device ids (0
+means no device).
+
+Scan the ports before creating any sensor or motor, e.g. right after the
+SwitchController.
 """
-class SmartSensor:
-
-    def __init__(self, *args, **kwargs):
-        self.pre_sensors = list(args) + kwargs.get('pre_sensors', [])
-        self.post_sensors = kwargs.get('post_sensors', {})
-        self._sanitize_post_sensors()  
-        self.update_timeout()
-        self.update_init_timeout()
-        self.state = (False, (False, []))  
-        self.blocked = []  
-
-    def __str__(self):
-        pre_sensors = ", ".join([str(s) for s in self.pre_sensors])
-        return "SmartSensor\n-Pre-Sensors: %s" % (pre_sensors)
-
-    def _sanitize_post_sensors(self):
-        for path1 in self.post_sensors:
-            for path2 in self.post_sensors:
-                if path1 != path2:
-                    # check if path1 is subpath of path2 -> this is an error
-                    if self._is_sub_path(path1, path2):
-                        raise ValueError("The configuration of the post_sensors is invalid! Path <%s> and Path <%s> is a subpath/ superpath pair!" % (path2, path1))
-   
-    def _is_sub_path(self, path1, path2):
-        for p1, p2 in zip(path1, path2):
-            if p1 != p2:
-                return False
-        return len(path1) != len(path2)
-
-
-    def add_pre_sensor(self, sensor):
-        self.pre_sensors.append(sensor)
-        self.update_timeout()
-        self.update_init_timeout()
-
-    def add_post_sensor(self, sensor, path):
-        self.post_sensors[path] = sensor
+def scan_ports(hub=None, offset=_STORAGE_OFFSET):
+    for port in _ports():
+        _set_device(port, _query_device(port))
+    if hub:
+        save_ports(hub, offset)
+    return dict(_devices)
 
-    def update_timeout(self):
-        self.timeout = max([s.timeout for s in self.pre_sensors])
-    
-    def update_init_timeout(self):
-        self.init_timeout = max([s.init_timeout for s in self.pre_sensors])
-
-    def tick(self):
-        self.state = self._tick()
-        self.update_timeout()
-
-    """
-    The core function of the SmartSensor.
-
-    It checks for blocked paths and if any pre_sensor is activated (i.e. the 
-    corresponding motor should move in this tick randomly) or is blocked (i.e.
-    a train is in front of the sensor).
-    """
-    def _tick(self):
-        post_conditions = [cond for cond, sensor in self.post_sensors.items() if sensor.blocked]
-        # first check if any presensor fires
-        any_activated = any(s.check() for s in self.pre_sensors)
-        any_blocked = any(s.is_currently_blocked() for s in self.pre_sensors)
-        if any_activated:
-            for s in self.pre_sensors:
-                s.reset2wait()
-
-        self.post_sensors_blocked = [s.blocked for s in self.post_sensors.values()]
-
-        return not any_blocked, (any_activated, post_conditions)
-
-    def check(self):
-        return self.state
-        
-    def sensors(self):
-        return self.pre_sensors + list(self.post_sensors.values())
-
-    def reset(self):
-        for sensor in self.sensors():
-            sensor.reset()
+"""
+Reads the device ids of the last scan from the storage of the hub at the given
+offset. Returns False if the hub has no (valid) stored scan, i.e. if the magic
+or the version byte does not match (e.g. other data of the program or a scan
+of an older version).
+"""
+def load_ports(hub, offset=_STORAGE_OFFSET):
+    if not hasattr(hub.system, 'storage'):
+        return False
+    data = hub.system.storage(offset, read=_STORAGE_SIZE)
+    if data[0] != _STORAGE_MAGIC or data[1] != _STORAGE_VERSION:
+        return False
+    for i, name in enumerate('ABCDEF'):
+        if hasattr(Port, name):
+            _devices[getattr(Port, name)] = data[i + 2]
+    return True
+
+# writes the device ids to the storage of the hub at the given offset (if they
+# changed)
+def save_ports(hub, offset=_STORAGE_OFFSET):
+    global _devices_changed
+    if _devices_changed and hasattr(hub.system, 'storage'):
+        data = bytearray(_STORAGE_SIZE)
+        data[0] = _STORAGE_MAGIC
+        data[1] = _STORAGE_VERSION
+        for i, name in enumerate('ABCDEF'):
+            if hasattr(Port, name):
+                data[i + 2] = _devices.get(getattr(Port, name), 0)
+        hub.system.storage(offset, write=data)
+        _devices_changed = False
 
-    def set_init_timeout(self, init_timeout):
-        for sensor in self.sensors():
-            sensor.set_init_timeout(init_timeout)
+"""
+Creates a SwitchSensor which fits the connected sensor type (a class of
+switch_distance.py, switch_ir.py, switch_ultrasonic.py or switch_color.py).
 
-    def set_switch_mode(self, switchMode : SwitchMode):
-        for sensor in self.sensors():
-            sensor.set_switch_mode(switchMode)
+The device id of the port is taken from the last port scan if possible (see
+scan_ports), so the port does not need to be queried. If the driver of the
+stored id fails, another device has been connected meanwhile and the port is
+queried again.
+"""
+def SwitchSensor(port: Port, *args, **kwargs):
+    sensor_class = _sensor_class(_devices.get(port))
+    if sensor_class is not None:
+        try:
+            return sensor_class(port, *args, **kwargs)
+        except OSError:
+            pass # the port has another device now
+
+    device_id = _query_device(port)
+    _set_device(port, device_id)
+    sensor_class = _sensor_class(device_id)
+    if sensor_class is None:
+        raise ValueError("Unknown device on port %s" % port)
+    return sensor_class(port, *args, **kwargs)
 
 """ 
 A representation of a motor for a switch.
@@ -405,9 +241,14 @@ Params:
     turn_degrees is given
 """
 class SwitchMotor:
+    __slots__ = ('switch_position', 'initial_position',
+                 'motor', 'port', 'successors', 'power', 'stop_mode',
+                 'display', 'next_path', 'all_paths', 'angle', 'move_time',
+                 'thresholds', 'rng', 'policy')
+
     def __init__(self, 
             port : Port, 
-            switch_position=SwitchPosition.STRAIGHT, 
+            switch_position=_STRAIGHT, 
             direction=Direction.CLOCKWISE,
             probability_straight_to_curved=0.5,
             probability_curved_to_straight=0.5,
@@ -415,8 +256,10 @@ class SwitchMotor:
             power=750,
             stop_mode=Stop.COAST,
             display=None):
-        self.probabilities = {SwitchPosition.STRAIGHT: probability_straight_to_curved,
-                                SwitchPosition.CURVED: probability_curved_to_straight}
+        # the probabilities indexed by the current switch position, in 1/_ONE
+        # (compared with the integers of the XorShift)
+        self.thresholds = (int(probability_straight_to_curved * _ONE + 0.5), int(probability_curved_to_straight * _ONE + 0.5))
+        self.rng = _rng
         self.switch_position = switch_position
         self.initial_position = switch_position
         self.motor = Motor(port, direction)
@@ -428,41 +271,45 @@ class SwitchMotor:
         self.stop_mode = stop_mode
         self.display = display
         self.next_path = None
+        self.move_time = None # the longest measured move in ms
+        self.policy = None # see set_policy
         self._update()
 
         if turn_degrees is None:
             self.calibrate()
         else:
-            other_switch_position = self.other_switch_position()
-            self.angle = {switch_position: 0, other_switch_position: turn_degrees}
+            self._set_angles(0, turn_degrees)
 
     def __str__(self):
         return self._string()
 
-    def print(self, depth=0, post_sensors={}):
-        print(self._string(depth=depth, post_sensors=post_sensors))
+    # trie is the root of the PathTrie of the post-sensors of a SmartSensor
+    def print(self, depth=0, trie=None):
+        print(self._string(depth=depth, trie=trie))
 
-    def _string(self, depth=0, direction=None, post_sensors={}):
+    # walks the successors and the trie of the post-sensors together
+    def _string(self, depth=0, direction=None, trie=None):
         def string_direction(direction):
-            return "Direction." + ('STRAIGHT' if direction == SwitchPosition.STRAIGHT else 'CURVED')
-        if direction:
-            direction = 'STRAIGHT' if direction == SwitchPosition.STRAIGHT else 'CURVED'
+            return "Direction." + ('STRAIGHT' if direction == _STRAIGHT else 'CURVED')
+        if direction is not None:
             name = "%s: SwitchMotor(%s)" % (string_direction(direction), self.port)
         else:
             name = "SwitchMotor(%s)" % (self.port)
 
-        if self in post_sensors:
-            for direction, sensor in post_sensors[self]:
-                name += "\n" + (depth + 1) * " " + "-" + string_direction(direction) + ": Post-Sensor: " + str(sensor)
+        if trie is not None:
+            for position in (_STRAIGHT, _CURVED):
+                child = trie[position + 1]
+                if child is not None and child[0] is not None:
+                    name += "\n" + (depth + 1) * " " + "-" + string_direction(position) + ": Post-Sensor: " + str(child[0])
         
         result = depth * " " + "-" + name 
         for position, motor in self.successors.items():
-            post = {k: v[1:] for k, v in post_sensors.items() if v[0] == position}
-            result += '\n' + motor._string(depth+1, position, post)
+            child = trie[position + 1] if trie is not None else None
+            result += '\n' + motor._string(depth+1, position, child)
         return result
 
     def other_switch_position(self):
-        return SwitchPosition.STRAIGHT if self.switch_position == SwitchPosition.CURVED else SwitchPosition.CURVED
+        return self.switch_position ^ 1
 
     def calibrate(self):
         self.motor.reset_angle(0)
@@ -475,15 +322,21 @@ class SwitchMotor:
             angle1 = int(angle1 - diff / 5)
             angle2 = int(angle2 + diff / 5)
 
-        other_switch_position = self.other_switch_position()
         if angle1 < -angle2:
             self.motor.run_target(self.power, angle1)
-            self.angle = {self.switch_position: angle1, other_switch_position: angle2}
+            self._set_angles(angle1, angle2)
         else:
             self.motor.run_target(self.power, angle2)
-            self.angle = {self.switch_position: angle2, other_switch_position: angle1}
+            self._set_angles(angle2, angle1)
         self.motor.stop()
 
+    # stores the target angles as a tuple indexed by the switch position
+    def _set_angles(self, current, other):
+        if self.switch_position == _STRAIGHT:
+            self.angle = (current, other)
+        else:
+            self.angle = (other, current)
+
     """
     Registers a successor (i.e. another motor) for the given switch position,
     i.e. register_successor(motor2, SwitchPosition.STRAIGHT) means, that after
@@ -497,18 +350,38 @@ class SwitchMotor:
     def move(self):
         if self.display is not None:
             self.display.cross()
-        if self.switch_position == SwitchPosition.STRAIGHT:
-            self.switch_position = SwitchPosition.CURVED
-        elif self.switch_position == SwitchPosition.CURVED:
-            self.switch_position = SwitchPosition.STRAIGHT
+        self.switch_position ^= 1
         angle = self.angle[self.switch_position]
+        start = _watch.time()
         self.motor.run_target(self.power, angle, then=self.stop_mode, wait=True)      
+        time = _watch.time() - start
+        if self.move_time is None or time > self.move_time:
+            self.move_time = time
+
+    """
+    Returns the longest time in ms a move of this switch and its successors
+    takes, according to the measured move times (None if a motor has not
+    moved yet). Used to check whether a RISING_EDGE move is done in time.
+    """
+    def move_duration(self):
+        longest = 0
+        for motor in self.successors.values():
+            duration = motor.move_duration()
+            if duration is None:
+                return None
+            longest = max(longest, duration)
+        if self.move_time is None:
+            return None
+        return self.move_time + longest
 
     """
     Moves randomly this switch position (and its successor positions).
     """
     def move_random(self):
-        if random() < self.probabilities[self.switch_position]:
+        if self.policy is not None:
+            self.policy.move()
+            return
+        if self.rng.next() < self.thresholds[self.switch_position]:
             self.move()
         self.move_successor_random()
 
@@ -524,24 +397,28 @@ class SwitchMotor:
     configured probability distribution).
     """
     def move_smart(self, check: bool, blocked_paths: list):
+        if self.policy is not None:
+            self.policy.move_smart(check, blocked_paths)
+            return
         current_path = self.current_path()
-        path_candidates = [p for p in self.all_paths if p not in blocked_paths + [current_path]]
+        mask = self.blocked_mask(blocked_paths)
+        path_candidates = [p for i, p in enumerate(self.all_paths) if not mask >> i & 1 and p != current_path]
 
         if self.next_path in path_candidates:
             # go back to the last path that has been blocked before, but is free again
             self.move_path(self.next_path)
             self.next_path = None
         else:
-            needs2move = current_path in blocked_paths
-            if (check and random() < self.probabilities[self.switch_position]) or needs2move:
+            needs2move = mask >> self.all_paths.index(current_path) & 1
+            if (check and self.rng.next() < self.thresholds[self.switch_position]) or needs2move:
                 # we need to move (at least if a new path is available)         
                 if len(path_candidates) == 0:
                     # no 'good' path is available, so stay for now, and probably 
                     pass
                 else:
                     # choose random path based on probabilities!!!
-                    path_weights = self._get_path_probabilities(path_candidates)
-                    path = self._get_random_path(path_candidates, path_weights)
+                    path_thresholds = self._get_path_probabilities(path_candidates)
+                    path = self._get_random_path(path_candidates, path_thresholds)
                     
                     self.move_path(path)
 
@@ -553,6 +430,20 @@ class SwitchMotor:
 
     def _update(self):
         self.all_paths = [tuple(p) for p in self._all_paths()]
+        if self.policy is not None:
+            self.policy.attach(self)
+
+    """
+    Lets the policy decide the paths of this motor and its successors instead
+    of the probabilities (see RoutingPolicy in switch_policy.py), e.g.
+    motor.set_policy(RoundRobinPolicy()). Set it on the motor registered with
+    the sensor, after its successors have been registered. None restores the
+    random moves.
+    """
+    def set_policy(self, policy):
+        self.policy = policy
+        if policy is not None:
+            policy.attach(self)
 
     """
     Iterates over all switch paths in this layout. 
@@ -564,7 +455,7 @@ class SwitchMotor:
     paths are [(STRAIGHT, STRAIGHT), (STRAIGHT, CURVED), (CURVED,)], etc...
     """
     def _all_paths(self):
-        for position in [SwitchPosition.STRAIGHT, SwitchPosition.CURVED]:
+        for position in (_STRAIGHT, _CURVED):
             if position not in self.successors:
                 yield [position]
 
@@ -588,6 +479,21 @@ class SwitchMotor:
         else:
             return path
 
+    """
+    Returns the bitmask of the paths of all_paths which start with one of the
+    given paths (e.g. the paths of the blocked post-sensors of a SmartSensor,
+    where a post-sensor behind the first motor blocks all paths through it).
+    The same rule is used by the RoutingPolicy.
+    """
+    def blocked_mask(self, blocked_paths):
+        mask = 0
+        for i, path in enumerate(self.all_paths):
+            for blocked_path in blocked_paths:
+                if path[:len(blocked_path)] == blocked_path:
+                    mask |= 1 << i
+                    break
+        return mask
+
     def move_successor_random(self):
         if self.switch_position in self.successors.keys():
             self.successors[self.switch_position].move_random()
@@ -598,11 +504,31 @@ class SwitchMotor:
         for motor in self.successors.values():
             motor.reset()
 
-    def set_display(self, display: LightMatrix):
+    # lets a motor with stop_mode HOLD spin freely (saves power while idle)
+    def release(self):
+        if self.stop_mode == Stop.HOLD:
+            self.motor.stop()
+        for motor in self.successors.values():
+            motor.release()
+
+    # holds the switch position again after release()
+    def hold(self):
+        if self.stop_mode == Stop.HOLD:
+            self.motor.hold()
+        for motor in self.successors.values():
+            motor.hold()
+
+    def set_display(self, display):
         self.display = display
         for successor in self.successors.values():
             successor.set_display(display)
 
+    # the XorShift of the SwitchController, used by this motor and its successors
+    def set_rng(self, rng: XorShift):
+        self.rng = rng
+        for successor in self.successors.values():
+            successor.set_rng(rng)
+
     """
     Calcualates the probability for a switch path. 
 
@@ -614,10 +540,24 @@ class SwitchMotor:
     stay in this position (with probability 1 - probability_curved_to_straight).
     This concept is apllied recursively to successors and the corresponding 
     subpaths.
+    Returns the cumulative probabilities of the paths as integer thresholds in
+    1/_ONE (see _cumulative_thresholds).
     """
     def _get_path_probabilities(self, paths):
         probs = self._determine_path_probabilities(paths)
-        return probs
+        return self._cumulative_thresholds(probs)
+
+    # the k-th path is drawn if the XorShift returns less than the k-th
+    # threshold, the last threshold is _ONE
+    def _cumulative_thresholds(self, weights):
+        total = sum(weights)
+        thresholds = []
+        cumulative = 0
+        for weight in weights:
+            cumulative += weight
+            thresholds.append(int(cumulative * _ONE / total + 0.5))
+        thresholds[-1] = _ONE
+        return thresholds
 
     def _determine_path_probabilities(self, states, num_steps=5):
         if len(states) == 1:
@@ -643,7 +583,7 @@ class SwitchMotor:
         motor = self
         for i, (p1, p2) in enumerate(zip(path1, path2)):
             if p1 != p2:
-                prob1 = motor.probabilities[p1] # probability from p1 -> p2
+                prob1 = motor.thresholds[p1] / _ONE # probability from p1 -> p2
                 switches_to_move_probs.append(prob1)
                 break
             else:
@@ -658,7 +598,7 @@ class SwitchMotor:
         for j in range(i, len(path2)-1):
             motor = motor.successors[path2[j]]
             if motor.switch_position != path2[j+1]:
-                prob = motor.probabilities[motor.switch_position]
+                prob = motor.thresholds[motor.switch_position] / _ONE
                 switches_to_move_probs.append(prob)
 
         if len(switches_to_move_probs) == 0:
@@ -673,146 +613,257 @@ class SwitchMotor:
 
     """
     Returns a random path out of the given path with optional weighted 
-    probabilities. This has a similar behaviour as the ususal python 
-    implementation of random.choices(paths, weights=weights, k=1)[0].
+    probabilities, given as cumulative integer thresholds (see
+    _get_path_probabilities). This has a similar behaviour as the ususal python 
+    implementation of random.choices(paths, cum_weights=thresholds, k=1)[0],
+    but a single integer draw is compared, without floating point numbers.
     """
-    def _get_random_path(self, paths, weights=None):
-        if weights is None:
-            return random.choice(paths)
-        
-        total_weight = sum(weights)
-        choices = []
-        
-        rand = uniform(0, total_weight)
-        cumulative_weight = 0
-        
-        for i, item in enumerate(paths):
-            cumulative_weight += weights[i]
-            if rand <= cumulative_weight:
-                return item
-
-class LightMatrix():
-
-    def __init__(self, hub):
-        self.hub = hub
+    def _get_random_path(self, paths, thresholds=None):
+        rand = self.rng.next()
+        if thresholds is None:
+            return paths[rand % len(paths)]
+
+        for path, threshold in zip(paths, thresholds):
+            if rand < threshold:
+                return path
+
+# set to 1 to measure the phases of every tick (see switch_profile.py), with 0
+# the profiling code is compiled out
+_PROFILE = const(0)
+
+# the phases of SwitchController.tick (see PHASES in switch_profile.py)
+_PHASE_SENSORS = const(0)
+_PHASE_SMART = const(1)
+_PHASE_MOTORS = const(2)
+_PHASE_LIGHT = const(3)
+_PHASE_MATRIX = const(4)
 
-    def update(self, timeouts, init_timeouts, blocked=None):
-        amount = len(timeouts)
-        if amount == 1:
-            self.update_one(timeouts, init_timeouts, blocked)
-        elif amount == 2:
-            self.update_two(timeouts, init_timeouts, None) # blocked not supported yet for > 1 SmartSensor
-        elif amount == 3:
-            self.update_three(timeouts, init_timeouts, None) # blocked not supported yet for > 1 SmartSensor
-        else:
-            raise ValueError("Unknown amount <%s>" % amount)
-
-    def _convert(self, pixel_number, total_pixel, proportion):
-        if pixel_number / total_pixel <= proportion:
-            return 100
-        elif (pixel_number - 1) / total_pixel <= proportion:
-            return  int(100 * (total_pixel * proportion - (pixel_number - 1)))
+"""
+A queue of sensor events with a fixed capacity. The sensors push their events
+during the tick, then dispatch() passes them to the subscribers of the sensor
+in the order they were pushed. The events are stored in preallocated lists,
+so nothing is allocated per event.
+"""
+class EventQueue():
+    __slots__ = ('sources', 'kinds', 'head', 'size', 'subscribers')
+
+    def __init__(self, capacity=1):
+        self.sources = [None] * capacity
+        self.kinds = bytearray(capacity)
+        self.head = 0
+        self.size = 0
+        self.subscribers = {} # map from sensors to lists of handler(sensor, kind)
+
+    # makes room for at least capacity events (the queue must be empty)
+    def reserve(self, capacity):
+        if capacity > len(self.sources):
+            self.sources = [None] * capacity
+            self.kinds = bytearray(capacity)
+            self.head = 0
+
+    def subscribe(self, sensor, handler):
+        if sensor in self.subscribers:
+            self.subscribers[sensor].append(handler)
         else:
-            return 0
-
-    def _blocked_row(self, blocked):
-        b = [100 * int(b) for b in blocked][:5]
-        l = len(b)
-        if l < 5:
-            b = b + [0] * (5 - l)
-        return b
-
-
-    def update_one(self, timeouts, init_timeouts, blocked):
-        proportion = timeouts[0] / init_timeouts[0]
-        width = 5
-        height = 5
-        matrix = []
-        if blocked:
-            blocked = blocked[0]
-            l = len(blocked)
-            if l > 0:
-                height = 4
-                blocked_row = [100 * int(b) for b in blocked][:5]
-                if l < 5:
-                    blocked_row = blocked_row + [0] * (5 - l)
-
-                matrix = [blocked_row]
-
-        matrix += [[self._convert(j * width + i + 1, height * width, proportion) for i in range(width)] for j in range(height)]
-        self.hub.display.icon(matrix)
-    
-    def update_two(self, timeouts, init_timeouts, blocked):
-        data = []
-        matrix = []
-        width = 5
-        height = 5
-        if blocked:
-            if any(len(b) > 0 for b in blocked):
-                blocked_row = []
-                height = height - 1
-
-                for i, b in enumerate(blocked):
-                    l = len(b)
-                    
-                    if l > 0:
-                        b = [100 * int(bb) for bb in b][:2]
-                        l = len(b)
-                        if l < 2:
-                            blocked_row += b + [0] * (2 - l)
-                        else:
-                            blocked_row = b
-
-                        if i == 0:
-                            blocked_row += [0]
-                    else:
-                        blocked_row += [0, 0]
-
-                
-                matrix = [blocked_row]
-
-        for index in range(2):
-            proportion = timeouts[index] / init_timeouts[index]
-            m = [[self._convert(j * 2 + i + 1, 10, proportion) for i in range(2)] for j in range(height)]
-            data.append(m)
-        matrix += [[data[0][i][0], data[0][i][1], 0, data[1][i][0], data[1][i][1]] for i in range(height)]
-        self.hub.display.icon(matrix)
-
-    def update_three(self, timeouts, init_timeouts, blocked):
-        data = []
-        for index in range(3):
-            proportion = timeouts[index] / init_timeouts[index]
-            m = [self._convert(j + 1, 5, proportion) for j in range(5)]
-            data.append(m)
-        matrix = [[data[0][i], 0, data[1][i], 0, data[2][i]] for i in range(5)]
-        self.hub.display.icon(matrix)
-
-    def cross(self):
-        matrix = [[100, 0, 0, 0, 100], [0, 100, 0, 100, 0], [0, 0, 100, 0, 0], [0, 100, 0, 100, 0], [100, 0, 0, 0, 100]]
-        self.hub.display.icon(matrix)
-
+            self.subscribers[sensor] = [handler]
+
+    def push(self, sensor, kind):
+        capacity = len(self.sources)
+        if self.size == capacity:
+            raise RuntimeError("The event queue is full")
+        i = (self.head + self.size) % capacity
+        self.sources[i] = sensor
+        self.kinds[i] = kind
+        self.size += 1
+
+    def dispatch(self):
+        while self.size:
+            i = self.head
+            sensor = self.sources[i]
+            self.sources[i] = None
+            self.head = (i + 1) % len(self.sources)
+            self.size -= 1
+            for handler in self.subscribers.get(sensor, ()):
+                handler(sensor, self.kinds[i])
 
 class SwitchController():
+    __slots__ = ('sensors', 'sensor_list', 'dt', 'hub', 'display', 'all_sensors',
+                 'current_color', 'idle_timeout', 'idle_dt', 'idle', 'quiet',
+                 'profiler', 'watch', 'cause', 'ticks', 'slack', 'min_slack',
+                 'overruns', 'worst_overrun', 'worst_cause', 'too_slow',
+                 'events', 'fired', 'rng', 'schedule', 'schedules', 'storage_offset',
+                 'smart', 'blocked')
+
+    """
+    Creates a SwitchController.
 
-    def __init__(self, hub=None, dt=50):
+    params:
+    -dt: the time in ms to wait between two ticks.
+    -idle_timeout_ms: If positive, the controller becomes idle after no sensor
+        has fired or seen a train for this time in ms: it ticks only every
+        idle_dt ms, does not refresh the light matrix and releases the motors
+        with stop_mode HOLD, which saves the batteries of the hub. As soon as a
+        sensor reads a distance close to its critical_distance, the controller
+        returns to dt (i.e. within idle_dt ms). Note that with
+        SwitchMode.RISING_EDGE the first train after an idle period is
+        detected up to idle_dt ms later.
+    -idle_dt: the time in ms to wait between two ticks while idle.
+    -seed: the seed of the random number generator of the motors (see
+        XorShift). With the same seed, the switches choose the same paths
+        (e.g. on the hub and in a simulation on the host). If None, a random
+        seed is used.
+    -schedule: If positive, the next schedule decisions of every motor tree
+        which is not controlled by a SmartSensor or a RoutingPolicy (see
+        SwitchMotor.set_policy) are computed in advance
+        while the controller waits for the next tick (see DecisionSchedule in
+        switch_schedule.py), so a triggered switch only has to move its
+        motors.
+    -storage_offset: the offset in the storage of the hub of the detected
+        devices of the ports (8 bytes, see scan_ports). Change it if the
+        program keeps other data at the default offset 0.
+    """
+    def __init__(self, hub=None, dt=50, idle_timeout_ms=0, idle_dt=500, seed=None, schedule=0, storage_offset=_STORAGE_OFFSET):
         self.sensors = {} # map from sensors to motors
         self.sensor_list = [] # preserves order for correct update of the LightMatrix
         self.dt = dt
+        self.idle_timeout = idle_timeout_ms
+        self.idle_dt = idle_dt
+        self.idle = False
+        self.quiet = 0 # the time in ms since the last activity of a sensor
+        self.events = EventQueue()
+        self.rng = XorShift(getrandbits(16) if seed is None else seed)
+        self.fired = False # a switch has been moved in the current tick
+        self.schedule = schedule
+        self.schedules = {} # map from motors to their DecisionSchedule
+        if _PROFILE:
+            from switch_profile import TickProfiler
+            self.profiler = TickProfiler()
+        self.watch = StopWatch()
+        self.cause = None # the slowest sensor or the moved motor of the last tick
+        self.reset_telemetry()
+        self.current_color = None # the color the status light currently shows
         if not hub:
             hub = ThisHub()
         self.hub = hub
         self.initialize_hub()
+        # reuse the ports of the last boot, the scan is only needed once
+        self.storage_offset = storage_offset
+        if hasattr(self.hub.system, 'storage') and not load_ports(self.hub, storage_offset):
+            scan_ports(self.hub, storage_offset)
         if hasattr(self.hub, 'display'):
+            from switch_display import LightMatrix
             self.display = LightMatrix(self.hub)
         else:
             self.display = None
         self._update()
         
     def register_sensor(self, sensor : SwitchSensor, motor):
+        self._register(sensor, motor)
+        self._update()
+        if self.display:
+            self.display.register(self.sensor_list)
+
+    def _register(self, sensor, motor):
         self.sensors[sensor] = motor
         self.sensor_list.append(sensor)
         motor.set_display(self.display)
+        motor.set_rng(self.rng)
+        sensor.set_move_time(motor.move_duration())
+        # the tick-based parameters of the sensor are ticks of this controller
+        sensor.set_tick_ms(self.dt)
+        # the sensor only emits events if the controller subscribed to them
+        sensor.events = self.events
+        self.events.subscribe(sensor, self._on_event)
+
+    """
+    Creates and registers all sensors and motors of a packed layout (see
+    tools/layout.py and tools/pack_layout.py), so the layout needs no Python
+    setup code. The layout has been checked on the host, so everything is
+    built in a single pass: every motor tree is computed once and the light
+    matrix is set up once. The paths of the post-sensors are still inserted
+    into the PathTrie of their SmartSensor, which rejects a path that is the
+    prefix of another one while it walks the path, so this check costs nothing
+    extra.
+    """
+    def load(self, layout):
+        if layout[0] != _LAYOUT_VERSION:
+            raise ValueError("Unknown layout version %s" % layout[0])
+        self.dt = _u16(layout, 1)
+        i = 4
+        sensors = []
+        for _ in range(layout[3]):
+            kwargs = {
+                'switch_mode': layout[i + 2],
+                'init_timeout_ms': _u16(layout, i + 5),
+                'post_sensor_init_timeout_ms': _u16(layout, i + 7),
+                'post_sensor_delay_ms': _u16(layout, i + 9),
+                'median_window': layout[i + 11],
+                'ema_shift': layout[i + 12],
+            }
+            if _u16(layout, i + 3) != 0xFFFF:
+                kwargs['critical_distance'] = _u16(layout, i + 3)
+            if _u16(layout, i + 13) != 0xFFFF:
+                kwargs['leave_distance'] = _u16(layout, i + 13)
+            if _u16(layout, i + 17):
+                kwargs['learn_gaps'] = True
+                kwargs['min_init_timeout_ms'] = _u16(layout, i + 15)
+                kwargs['max_init_timeout_ms'] = _u16(layout, i + 17)
+            if _u16(layout, i + 19) != 0xFFFF:
+                kwargs['approach_ms'] = _u16(layout, i + 19)
+            port = getattr(Port, 'ABCDEF'[layout[i]])
+            if layout[i + 1]:
+                sensors.append(_sensor_class(_DEVICE_IDS[layout[i + 1]])(port, **kwargs))
+            else:
+                sensors.append(SwitchSensor(port, **kwargs))
+            i += 21
+
+        motors = []
+        i += 1
+        for _ in range(layout[i - 1]):
+            turn_degrees = _u16(layout, i + 8)
+            if turn_degrees == 0x7FFF:
+                turn_degrees = None
+            elif turn_degrees >= 0x8000:
+                turn_degrees -= 0x10000
+            motor = SwitchMotor(getattr(Port, 'ABCDEF'[layout[i]]),
+                switch_position=layout[i + 1],
+                direction=(Direction.CLOCKWISE, Direction.COUNTERCLOCKWISE)[layout[i + 2]],
+                probability_straight_to_curved=_u16(layout, i + 4) / 10000,
+                probability_curved_to_straight=_u16(layout, i + 6) / 10000,
+                turn_degrees=turn_degrees,
+                power=_u16(layout, i + 10),
+                stop_mode=(Stop.COAST, Stop.BRAKE, Stop.HOLD)[layout[i + 3]])
+            # successors are packed before their predecessor
+            for position in (_STRAIGHT, _CURVED):
+                if layout[i + 12 + position] != 0xFF:
+                    motor.successors[position] = motors[layout[i + 12 + position]]
+            if motor.successors:
+                motor._update()
+            motors.append(motor)
+            i += 14
+
+        i += 1
+        for _ in range(layout[i - 1]):
+            motor = motors[layout[i]]
+            pre_sensors = [sensors[j] for j in layout[i + 2:i + 2 + layout[i + 1]]]
+            i += 3 + layout[i + 1]
+            post_sensors = {}
+            for _ in range(layout[i - 1]):
+                length, bits = layout[i], layout[i + 1]
+                post_sensors[tuple((bits >> k) & 1 for k in range(length))] = sensors[layout[i + 2]]
+                i += 3
+            spacing, clearance = _u16(layout, i), _u16(layout, i + 2)
+            i += 4
+            if len(pre_sensors) > 1 or post_sensors:
+                from switch_smart import SmartSensor
+                self._register(SmartSensor(*pre_sensors, post_sensors=post_sensors,
+                                           sensor_spacing_mm=spacing, clearance_mm=clearance), motor)
+            else:
+                self._register(pre_sensors[0], motor)
+
         self._update()
+        if self.display:
+            self.display.register(self.sensor_list)
 
     def buttons(self):
         if hasattr(self.hub, 'buttons'):
@@ -822,11 +873,39 @@ class SwitchController():
         else:
             raise ValueError()
 
+    """
+    Runs the controller until the center button is pressed. Every tick gets the
+    measured time since the last tick, so the timeouts of the sensors are real
+    time and do not depend on dt. A tick starts every dt ms: the controller
+    only waits for the slack of the tick (dt minus the time the tick took), and
+    a tick which takes longer than dt (e.g. because a motor moves) is counted
+    as overrun (see telemetry()).
+    """
     def run(self):
+        # stores the devices which changed since the last scan
+        save_ports(self.hub, self.storage_offset)
         self.print()
-        while Button.CENTER not in self.buttons():
-            self.tick()
-            wait(self.dt)
+        watch = self.watch
+        last = watch.time() - self.dt
+        pressed = self.buttons()
+        while Button.CENTER not in pressed:
+            now = watch.time()
+            self.tick(now - last)
+            last = now
+            slack = (self.idle_dt if self.idle else self.dt) - (watch.time() - now)
+            self._record(slack)
+            if slack > 0 and self.schedules:
+                # compute the next decisions in the slack of the tick
+                self._fill_schedules(watch.time() + slack)
+                slack = (self.idle_dt if self.idle else self.dt) - (watch.time() - now)
+            if slack > 0:
+                wait(slack)
+            pressed = self.buttons()
+            if _PROFILE:
+                self.profiler.buttons(pressed)
+        if _PROFILE:
+            self.profiler.print()
+        self.print_telemetry()
         self.color(Color.BLUE)
         self.reset()
         self.hub.system.shutdown()
@@ -835,55 +914,190 @@ class SwitchController():
         print("Start SwitchController")
         for sensor, motor in self.sensors.items():
             print("Sensor: %s" % sensor)
-            post_sensors = {}
-            if isinstance(sensor, SmartSensor):
-                for path, post in sensor.post_sensors.items():
-                    m = motor
-                    for p in path[:-1]:
-                        m = m.successors[p]
-                    
-                    pair = (path, post)
-                    if m in post_sensors:
-                        post_sensors[m].append(pair)
-                    else:
-                        post_sensors[m] = [pair]
-
-            motor.print(depth=1, post_sensors=post_sensors)
-
-    def tick(self):
+            if hasattr(sensor, 'post_trie'): # a SmartSensor
+                motor.print(depth=1, trie=sensor.post_trie.root)
+            else:
+                motor.print(depth=1)
+
+    # dt is the time in ms since the last tick (default: the dt of the controller)
+    def tick(self, dt=None):
+        if dt is None:
+            dt = self.dt
+        if _PROFILE:
+            self.profiler.start()
+        watch = self.watch
+        last = watch.time()
+        slowest = -1
         for sensor in self.all_sensors:
-            sensor.tick()
-
-        blocked = None
-        for sensor in self.sensors:
-            check = sensor.check()
-            if check is True:
-                self.color(Color.RED)
-                self.sensors[sensor].move_random()
-            elif isinstance(check, tuple) and check[0]:
-                self.color(Color.RED)
-                self.sensors[sensor].move_smart(*check[1])
-                blocked = [sensor.post_sensors_blocked if hasattr(sensor, 'post_sensors_blocked') else [] for sensor in self.sensor_list]
+            if self.idle:
+                # every sensor is read in every idle tick
+                sensor.wake()
+            sensor.tick(dt)
+            if _PROFILE:
+                self.profiler.lap(_PHASE_SMART if sensor in self.smart else _PHASE_SENSORS)
+            now = watch.time()
+            if now - last > slowest:
+                slowest = now - last
+                self.cause = sensor
+            last = now
+
+        self.fired = False
+        self.events.dispatch()
+        fired = self.fired
+        if fired:
+            self.too_slow = False
+        if self.idle_timeout > 0:
+            self._update_idle(fired, dt)
+        if _PROFILE:
+            self.profiler.lap(_PHASE_MOTORS)
         
-        timeouts = [sensor.timeout for sensor in self.sensor_list]
-        max_timeout = max(timeouts)
-        init_timeouts = [sensor.init_timeout for sensor in self.sensor_list]
-        init_timeout = max(init_timeouts)
-        
-        # update status light
-        if max_timeout <= 0:
-            self.color(Color.GREEN)
-        elif any([timeout == init for timeout, init in zip(timeouts, init_timeouts)]): # todo improve
+        # update status light (ORANGE while a sensor has just seen a train)
+        waiting = False
+        seeing = False
+        for sensor in self.sensor_list:
+            timeout = sensor.timeout
+            if timeout > 0:
+                waiting = True
+                if timeout == sensor.init_timeout:
+                    seeing = True
+                    break
+        if not waiting:
+            self.color(Color.MAGENTA if self.too_slow else Color.GREEN)
+        elif seeing:
             self.color(Color.ORANGE)
         else:
             self.color(Color.YELLOW)
 
+        if _PROFILE:
+            self.profiler.lap(_PHASE_LIGHT)
+
         # update status light matrix
+        if self.display and not self.idle:
+            sensors = self.sensor_list
+            self.display.update([sensor.timeout for sensor in sensors], [sensor.init_timeout for sensor in sensors], self.blocked)
+        if _PROFILE:
+            self.profiler.lap(_PHASE_MATRIX)
+            self.profiler.stop()
+
+    # moves the switch of a sensor which emitted an event (see SensorEvent)
+    def _on_event(self, sensor, kind):
+        motor = self.sensors[sensor]
+        self.color(Color.RED)
+        schedule = self.schedules.get(motor)
+        if schedule and motor.policy is not None:
+            # the policy has been set after the schedule was built
+            del self.schedules[motor]
+            schedule = None
+        if schedule:
+            schedule.apply()
+        else:
+            sensor.move_motor(motor, kind)
+        self.fired = True
+        self.cause = motor # a move takes longer than any sensor
+        # the sensor checks if the next RISING_EDGE move is done in time
+        sensor.set_move_time(motor.move_duration())
+
+    """
+    Records the slack of a tick, i.e. dt minus the time the tick took. A
+    negative slack is an overrun. If it is caused by the sensors (and not by a
+    moving motor), dt is too small for the layout, which is shown by a MAGENTA
+    instead of a GREEN status light until the next train triggers a switch.
+    """
+    def _record(self, slack):
+        self.ticks += 1
+        self.slack = slack
+        if self.min_slack is None or slack < self.min_slack:
+            self.min_slack = slack
+        if slack < 0:
+            self.overruns += 1
+            if -slack > self.worst_overrun:
+                self.worst_overrun = -slack
+                self.worst_cause = self.cause
+            if not isinstance(self.cause, SwitchMotor):
+                self.too_slow = True
+
+    """
+    Returns (ticks, overruns, min_slack, worst_overrun, worst_cause) since the
+    start or the last reset_telemetry(), all times in ms. worst_cause is the
+    SwitchMotor which moved in the tick of the worst overrun, or the slowest
+    sensor of this tick.
+    """
+    def telemetry(self):
+        return self.ticks, self.overruns, self.min_slack, self.worst_overrun, self.worst_cause
+
+    def reset_telemetry(self):
+        self.ticks = 0
+        self.slack = 0 # of the last tick
+        self.min_slack = None
+        self.overruns = 0
+        self.worst_overrun = 0
+        self.worst_cause = None
+        self.too_slow = False
+
+    def print_telemetry(self):
+        cause = self.worst_cause
+        if isinstance(cause, SwitchMotor):
+            cause = "move of SwitchMotor(%s)" % cause.port
+        print("Ticks: %s, overruns: %s, min slack: %s ms, worst overrun: %s ms (%s)" % (
+            self.ticks, self.overruns, self.min_slack, self.worst_overrun, cause))
+
+    def _update_idle(self, fired, dt):
+        if fired or any(sensor.is_near() for sensor in self.all_sensors):
+            self.quiet = 0
+            if self.idle:
+                self.set_idle(False)
+        else:
+            self.quiet += dt
+            if not self.idle and self.quiet >= self.idle_timeout:
+                self.set_idle(True)
+
+    def set_idle(self, idle):
+        self.idle = idle
+        for motor in self.sensors.values():
+            if idle:
+                motor.release()
+            else:
+                motor.hold()
         if self.display:
-            self.display.update(timeouts, init_timeouts, blocked)
+            if idle:
+                self.hub.display.off()
+            self.display.shown = None # redraw after the idle period
 
     def _update(self):
         self.all_sensors = list(self._all_sensors())
+        # the SmartSensors and their blocked states of the post-sensors (the
+        # lists are updated in place), so a tick needs no hasattr
+        self.smart = set([sensor for sensor in self.all_sensors if hasattr(sensor, 'post_sensors')])
+        self.blocked = tuple([sensor.post_sensors_blocked if sensor in self.smart else () for sensor in self.sensor_list])
+        # every registered sensor emits at most one event per tick
+        self.events.reserve(len(self.sensors))
+        self._update_schedules()
+
+    def _update_schedules(self):
+        self.schedules = {}
+        if self.schedule <= 0:
+            return
+        from switch_schedule import DecisionSchedule
+        # a SmartSensor decides with the blocked paths at the time of the train,
+        # a RoutingPolicy is cheap enough to decide then
+        smart = [motor for sensor, motor in self.sensors.items() if hasattr(sensor, 'post_trie')]
+        for motor in self.sensors.values():
+            if motor not in smart and motor.policy is None and motor not in self.schedules:
+                # every tree draws from its own generator, so the decisions do
+                # not depend on when they are computed
+                rng = XorShift(self.rng.next() + 1)
+                self.schedules[motor] = DecisionSchedule(motor, rng, self.schedule)
+
+    # computes decisions until all schedules are full or the deadline is reached
+    def _fill_schedules(self, deadline):
+        watch = self.watch
+        for schedule in self.schedules.values():
+            if schedule.root.policy is not None:
+                continue # dropped by the next event, see _on_event
+            while schedule.size < schedule.capacity:
+                if watch.time() >= deadline:
+                    return
+                schedule.fill(1)
 
     def _all_sensors(self):
         sensors = []
@@ -900,8 +1114,10 @@ class SwitchController():
         for motor in self.sensors.values():
             motor.reset()
 
+    # the light is only switched if the color changes
     def color(self, color : Color):
-        if self.hub:
+        if self.hub and color != self.current_color:
+            self.current_color = color
             self.hub.light.on(color)
 
     def initialize_hub(self):
@@ -909,11 +1125,19 @@ class SwitchController():
             self.hub.system.set_stop_button(None)
         self.color(Color.GREEN)
 
+_LAYOUT_VERSION = const(6)
+
+# the device ids by the sensor type of a packed layout (0 = detect the device)
+_DEVICE_IDS = (0, 37, 35, 62, 61)
+
+# reads two bytes (little endian) of a packed layout
+def _u16(data, i):
+    return data[i] | data[i + 1] << 8
+
 __all__ = [
     # PyBricks classes (that needs to be exported)
     'Port',
-    # Switch classes
-    'SwitchPosition', 'SwitchMode', 'SwitchSensor', 'SwitchDistanceSensor',
-    'SwitchIRSensor', 'SwitchUltrasonicSensor', 'SwitchColorSensor',
-    'RemoteSensor', 'SwitchSensor', 'SmartSensor', 'SwitchMotor', 'SwitchController'
+    # Switch classes (the other classes are imported from their own modules)
+    'SwitchPosition', 'SwitchMode', 'SwitchSensor', 'SwitchMotor', 'SwitchController',
+    'scan_ports', 'load_ports', 'save_ports'
 ]
@@ -0,0 +1,17 @@
+from pybricks.pupdevices import ColorSensor
+from pybricks.parameters import Port
+from switch_sensor import SwitchSensor_
+
+"""
+The color sensor known from LEGO Mindstorms 51515 (LEGO part 37308c01)
+"""
+class SwitchColorSensor(SwitchSensor_):
+    __slots__ = ()
+    # critical distance in %
+    def __init__(self, port : Port, critical_distance=95, *args, **kwargs):
+        super().__init__(critical_distance, *args, **kwargs)
+        self.sensor = ColorSensor(port)
+        self.port = port
+
+    def _distance(self):
+        self.distance = 100 - self.sensor.reflection()
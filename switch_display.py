@@ -0,0 +1,169 @@
+from pybricks.tools import Matrix
+
+"""
+Shows the timeout progress of the sensors on the light matrix of the hub.
+
+The matrix (5x5 by default) is split among all registered sensors: each sensor
+gets a rectangular region with a progress bar of its timeout. If any sensor is
+a SmartSensor with post-sensors, the first row of each region shows the blocked
+state of the post-sensors of this sensor. The geometry is computed once when a
+sensor is registered, so the amount of sensors adds no layout work per tick.
+
+A bar pixel is dimmed in dim_steps steps (100 by default, i.e. in 1% steps),
+so a bar with n pixels has dim_steps * n + 1 visible levels, and the level of
+the timeout is quantized to them before it is used as key of a frame. Every
+shown frame is kept as ready-to-send Matrix in a cache of at most cache_size
+frames (the least recently used frame is dropped first). The frames of the
+whole pixels of the usual states (one sensor counts down while the others are
+idle) are built when a sensor is registered, as far as they fit into the
+cache. With fewer dim_steps (e.g. 4 for 25% steps, or 1 for whole pixels),
+more countdown states hit the cache, so refreshing the matrix is a single
+lookup in general.
+"""
+class LightMatrix():
+    __slots__ = ('hub', 'width', 'height', 'bars', 'thresholds', 'scales',
+                 'indicators', 'shown', 'frames', 'uses', 'dim_steps', 'cache_size')
+
+    def __init__(self, hub, width=5, height=5, dim_steps=100, cache_size=32):
+        self.hub = hub
+        self.width = width
+        self.height = height
+        self.bars = [] # per sensor, the pixel indices of its progress bar
+        self.thresholds = [] # per sensor, the level at which each bar pixel starts to light up
+        self.scales = [] # per sensor, the level of a full bar (dim_steps * bar pixels)
+        self.indicators = [] # per sensor, the pixel indices of its blocked row
+        self.shown = None # key of the currently shown frame (None = unknown)
+        self.frames = {} # map from frame keys to [Matrix, last use]
+        self.uses = 0 # the number of lookups, the time of the last use of a frame
+        self.dim_steps = dim_steps
+        self.cache_size = cache_size
+
+    """
+    Computes the layout of the matrix for the given sensors and builds the 
+    frames of the idle matrix and of each sensor with a whole number of lit
+    pixels (while the other sensors are idle), the full bar first. At most
+    cache_size frames are built. Called when a sensor is registered.
+    """
+    def register(self, sensors):
+        self._layout(len(sensors), any(getattr(s, 'post_sensors', None) for s in sensors))
+        self.shown = None
+        self.frames = {}
+        self.uses = 0
+
+        unblocked = tuple([(False,) * len(pixels) for pixels in self.indicators])
+        self._frame(((0,) * len(sensors), unblocked))
+        for index, scale in enumerate(self.scales):
+            levels = [0] * len(sensors)
+            for level in range(scale, 0, -self.dim_steps):
+                if len(self.frames) >= self.cache_size:
+                    return
+                levels[index] = level
+                self._frame((tuple(levels), unblocked))
+
+    """
+    Splits the matrix into one region per sensor. The regions are placed in 
+    columns (separated by an empty column if there is enough space), and in 
+    multiple rows of regions if there are more sensors than columns.
+    """
+    def _layout(self, amount, with_indicators):
+        width, height = self.width, self.height
+        columns = min(amount, width)
+        rows = (amount + columns - 1) // columns
+        column_gap = 1 if 2 * columns - 1 <= width else 0
+        row_gap = 1 if 2 * rows - 1 <= height else 0
+        region_width = (width - column_gap * (columns - 1)) // columns
+        region_height = (height - row_gap * (rows - 1)) // rows
+        if region_height < 1:
+            raise ValueError("Too many sensors <%s> for the light matrix" % amount)
+        with_indicators = with_indicators and region_height > 1
+
+        self.bars = []
+        self.indicators = []
+        for index in range(amount):
+            top = (index // columns) * (region_height + row_gap)
+            left = (index % columns) * (region_width + column_gap)
+            pixels = [(top + j) * width + left + i for j in range(region_height) for i in range(region_width)]
+            if with_indicators:
+                self.indicators.append(pixels[:region_width])
+                self.bars.append(pixels[region_width:])
+            else:
+                self.indicators.append([])
+                self.bars.append(pixels)
+        dim_steps = self.dim_steps
+        self.thresholds = [[dim_steps * k for k in range(len(bar))] for bar in self.bars]
+        self.scales = [dim_steps * len(bar) for bar in self.bars]
+
+    """
+    Updates the progress bar(s) of the matrix. The matrix is only written if 
+    the visible output changes, i.e. if the quantized state of the progress 
+    bars or the blocked rows differ from the currently shown frame.
+
+    blocked is a list with the blocked states of the post-sensors per sensor
+    (an empty list for sensors without post-sensors).
+    """
+    def update(self, timeouts, init_timeouts, blocked=None):
+        if blocked is None:
+            blocked = [()] * len(timeouts)
+        blocked = [tuple(b[:len(pixels)]) for b, pixels in zip(blocked, self.indicators)]
+        key = (self._levels(timeouts, init_timeouts), tuple(blocked))
+        if key == self.shown:
+            return
+        self.shown = key
+        self.hub.display.icon(self._frame(key))
+
+    """
+    Returns the quantized state of the progress bars. With d = dim_steps, a
+    bar with n pixels shows the level d * n * timeout // init_timeout: the
+    k-th pixel (k=0,..) is fully lit at a level of at least d * (k+1), and
+    dimmed to 100 * (level - d * k) // d if the level is between d * k and
+    d * (k+1). So two states with equal levels look identical on the matrix.
+    Only integer math is used, since many hubs have no FPU. Called every tick,
+    so the list is built without a generator and without max().
+    """
+    def _levels(self, timeouts, init_timeouts):
+        return tuple([scale * timeout // init_timeout if timeout > 0 else 0 for timeout, init_timeout, scale in zip(timeouts, init_timeouts, self.scales)])
+
+    """
+    Returns the cached Matrix of the given key (the levels and the blocked
+    states) and builds it on a cache miss. A hit only stamps the frame with
+    the number of lookups, the least recently used frame is searched only when
+    a frame is built anyway.
+    """
+    def _frame(self, key):
+        self.uses += 1
+        entry = self.frames.get(key)
+        if entry is not None:
+            entry[1] = self.uses
+            return entry[0]
+
+        pixels = [0] * (self.width * self.height)
+        dim_steps = self.dim_steps
+        for level, bar, thresholds, indicator, b in zip(key[0], self.bars, self.thresholds, self.indicators, key[1]):
+            for pixel, threshold in zip(bar, thresholds):
+                brightness = level - threshold
+                if brightness >= dim_steps:
+                    pixels[pixel] = 100
+                elif brightness > 0:
+                    pixels[pixel] = 100 * brightness // dim_steps
+            for pixel, is_blocked in zip(indicator, b):
+                pixels[pixel] = 100 * int(is_blocked)
+        width = self.width
+        frame = Matrix([pixels[row:row + width] for row in range(0, len(pixels), width)])
+
+        frames = self.frames
+        if len(frames) >= self.cache_size:
+            oldest = None
+            for other, (_, used) in frames.items():
+                if oldest is None or used < last:
+                    oldest, last = other, used
+            del frames[oldest]
+        frames[key] = [frame, self.uses]
+        return frame
+
+    def cross(self):
+        if self.shown == 'cross':
+            return
+        self.shown = 'cross'
+        w, h = self.width - 1, self.height - 1
+        matrix = [[100 if j * w == i * h or j * w == (w - i) * h else 0 for i in range(w + 1)] for j in range(h + 1)]
+        self.hub.display.icon(matrix)
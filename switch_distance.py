@@ -0,0 +1,14 @@
+from pybricks.pupdevices import ColorDistanceSensor
+from pybricks.parameters import Port
+from switch_sensor import SwitchSensor_
+
+"""
+A color distance sensor (LEGO item 88007)
+"""
+class SwitchDistanceSensor(SwitchSensor_):
+    __slots__ = ()
+    # critical distance in %
+    def __init__(self, port : Port, critical_distance=30, *args, **kwargs):
+        super().__init__(critical_distance, *args, **kwargs)
+        self.sensor = ColorDistanceSensor(port)
+        self.port = port
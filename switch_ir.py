@@ -0,0 +1,14 @@
+from pybricks.pupdevices import InfraredSensor
+from pybricks.parameters import Port
+from switch_sensor import SwitchSensor_
+
+"""
+The motion/ IR sensor known from LEGO WeDo 2.0 or the Grand Piano (LEGO item 20844)
+"""
+class SwitchIRSensor(SwitchSensor_):
+    __slots__ = ()
+    # critical distance in %
+    def __init__(self, port : Port, critical_distance=60, *args, **kwargs):
+        super().__init__(critical_distance, *args, **kwargs)
+        self.sensor = InfraredSensor(port)
+        self.port = port
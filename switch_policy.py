@@ -0,0 +1,203 @@
+from micropython import const
+
+# the probabilities and weights are integers in 1/_ONE (see XorShift in switch.py)
+_ONE = const(65535)
+
+"""
+Decides which path of a SwitchMotor tree the next train gets (see
+SwitchMotor.set_policy). Without a policy, the motors move randomly with their
+probabilities (move_random and move_smart).
+
+When the policy is set, the tree is flattened into tables: the motors in
+preorder, the successor of every motor position (an index into the motors or
+-1) and the path which ends at a motor position without successor (an index
+into all_paths of the root, or -1). A decision walks these tables and returns
+the index of a path, the blocked paths are a bitmask of these indices. So
+deciding only reads tuples and compares small integers.
+
+choose(current, blocked) returns the index of the next path (or -1 to stay)
+given the index of the current path and the bitmask of the blocked paths. The
+RoutingPolicy itself makes the random decisions of SwitchMotor.move_random,
+the subclasses below override choose.
+"""
+class RoutingPolicy():
+    __slots__ = ('root', 'motors', 'successors', 'leaves', 'paths')
+
+    def __init__(self):
+        self.root = None
+
+    # builds the tables of the tree of the root motor
+    def attach(self, root):
+        self.root = root
+        self.motors = []
+        self._add(root)
+        self.paths = root.all_paths
+        successors = []
+        leaves = []
+        for motor in self.motors:
+            for position in (0, 1):
+                successor = motor.successors.get(position)
+                successors.append(-1 if successor is None else self.motors.index(successor))
+                leaves.append(-1)
+        for i, path in enumerate(self.paths):
+            k = 0
+            for position in path[:-1]:
+                k = successors[2 * k + position]
+            leaves[2 * k + path[-1]] = i
+        self.successors = tuple(successors)
+        self.leaves = tuple(leaves)
+
+    def _add(self, motor):
+        self.motors.append(motor)
+        for successor in motor.successors.values():
+            self._add(successor)
+
+    # the index of the current path
+    def current(self):
+        k = 0
+        while True:
+            i = 2 * k + self.motors[k].switch_position
+            if self.successors[i] < 0:
+                return self.leaves[i]
+            k = self.successors[i]
+
+    # the bitmask of the blocked paths, the same rule as SwitchMotor.move_smart
+    def blocked(self, blocked_paths):
+        return self.root.blocked_mask(blocked_paths)
+
+    """
+    The random decisions of SwitchMotor.move_random: every motor on the way
+    moves with its probability, drawn from the XorShift of the root motor.
+    Without blocked paths, it makes exactly the same decisions as move_random
+    (with the same numbers of the generator). If the drawn path is blocked,
+    one of the free paths is chosen with equal probability.
+    """
+    def choose(self, current, blocked):
+        rng = self.root.rng
+        k = 0
+        while True:
+            motor = self.motors[k]
+            i = 2 * k + motor.switch_position
+            if rng.next() < motor.thresholds[motor.switch_position]:
+                i ^= 1 # the other position of motor k
+            if self.successors[i] < 0:
+                break
+            k = self.successors[i]
+        path = self.leaves[i]
+        if not blocked >> path & 1:
+            return path
+        free = [i for i in range(len(self.paths)) if not blocked >> i & 1]
+        if not free:
+            return -1
+        return free[rng.next() % len(free)]
+
+    # moves the motors to the chosen path (used by SwitchMotor.move_random)
+    def move(self, blocked=0):
+        i = self.choose(self.current(), blocked)
+        if i >= 0:
+            self.root.move_path(self.paths[i])
+
+    """
+    Used by SwitchMotor.move_smart: a new path is chosen if a train arrived
+    (check) or if the current path is blocked. A blocked path is never chosen,
+    if all paths are blocked, the switch stays.
+    """
+    def move_smart(self, check, blocked_paths):
+        blocked = self.blocked(blocked_paths)
+        current = self.current()
+        if check or blocked >> current & 1:
+            i = self.choose(current, blocked)
+            if i >= 0:
+                self.root.move_path(self.paths[i])
+
+"""
+The random decisions of the RoutingPolicy (see RoutingPolicy.choose), under
+the name of the other policies.
+"""
+class RandomPolicy(RoutingPolicy):
+    __slots__ = ()
+
+"""
+Gives the trains the paths one after the other (in the order of all_paths of
+the root motor), blocked paths are skipped.
+"""
+class RoundRobinPolicy(RoutingPolicy):
+    __slots__ = ('next',)
+
+    def attach(self, root):
+        super().attach(root)
+        self.next = 0
+
+    def choose(self, current, blocked):
+        count = len(self.paths)
+        for step in range(count):
+            i = (self.next + step) % count
+            if not blocked >> i & 1:
+                self.next = (i + 1) % count
+                return i
+        return -1
+
+"""
+Gives the next train the free path which has not been used for the longest
+time. The paths are kept in a bytearray, the least recently used one first.
+"""
+class LeastRecentlyUsedPolicy(RoutingPolicy):
+    __slots__ = ('order',)
+
+    def attach(self, root):
+        super().attach(root)
+        self.order = bytearray(range(len(self.paths)))
+
+    def choose(self, current, blocked):
+        order = self.order
+        for k in range(len(order)):
+            i = order[k]
+            if not blocked >> i & 1:
+                # move the path to the end
+                for j in range(k, len(order) - 1):
+                    order[j] = order[j + 1]
+                order[-1] = i
+                return i
+        return -1
+
+"""
+Gives the paths the trains in the given shares (weights, in the order of
+all_paths of the root motor, equal shares by default). Every decision credits
+every path with its share and the free path with the largest credit (deficit)
+gets the train, which costs it one train (_ONE). So after n trains, every path
+got its share of the n trains up to one train. A blocked path keeps collecting
+credit and gets the next trains once it is free again (up to as many trains
+as the tree has paths).
+"""
+class FairSharePolicy(RoutingPolicy):
+    __slots__ = ('weights', 'shares', 'deficits')
+
+    def __init__(self, weights=None):
+        super().__init__()
+        self.weights = weights
+
+    def attach(self, root):
+        super().attach(root)
+        count = len(self.paths)
+        weights = self.weights if self.weights is not None else [1] * count
+        if len(weights) != count:
+            raise ValueError("Expected %s weights, one for every path, got %s" % (count, len(weights)))
+        total = sum(weights)
+        shares = [int(weight * _ONE / total) for weight in weights]
+        # the rounding error goes to the largest share, so the shares add up to _ONE
+        shares[shares.index(max(shares))] += _ONE - sum(shares)
+        self.shares = tuple(shares)
+        self.deficits = [0] * count
+
+    def choose(self, current, blocked):
+        deficits = self.deficits
+        if blocked == (1 << len(deficits)) - 1:
+            return -1 # all paths are blocked
+        limit = len(deficits) * _ONE # keeps the credits small integers
+        best = -1
+        for i in range(len(deficits)):
+            deficits[i] = min(deficits[i] + self.shares[i], limit)
+            if not blocked >> i & 1 and (best < 0 or deficits[i] > deficits[best]):
+                best = i
+        deficits[best] -= _ONE
+        return best
@@ -0,0 +1,83 @@
+from pybricks.parameters import Button
+from pybricks.tools import StopWatch
+from micropython import const
+
+# the phases of SwitchController.tick, in the order of the _PHASE_* values of
+# switch.py (the last one is the whole tick)
+PHASES = ('sensors', 'smart', 'motors', 'light', 'matrix', 'tick')
+
+_BUCKETS = const(10)
+_RING = const(16)
+
+"""
+Measures how long the phases of SwitchController.tick take. It is only used if
+_PROFILE is set to 1 in switch.py, otherwise the profiling code is compiled out.
+
+Every phase has a histogram with a fixed number of buckets: bucket 0 counts
+the phases which took less than 1 ms, bucket k the ones which took 2**(k-1) to
+2**k - 1 ms, and the last bucket all longer ones. The times of the last ticks
+are kept in a ring buffer, so a slow tick can be seen in its context. Only
+integers are used and nothing is allocated per tick.
+"""
+class TickProfiler():
+    __slots__ = ('watch', 'start_time', 'last', 'times', 'histograms',
+                 'maxima', 'ring', 'index', 'ticks', 'pressed')
+
+    def __init__(self):
+        self.watch = StopWatch()
+        self.start_time = 0
+        self.last = 0
+        self.times = [0] * len(PHASES) # the times of the phases of the current tick
+        self.histograms = [[0] * _BUCKETS for _ in PHASES]
+        self.maxima = [0] * len(PHASES)
+        self.ring = [0] * _RING # the times of the last ticks
+        self.index = 0
+        self.ticks = 0
+        self.pressed = False
+
+    def start(self):
+        self.start_time = self.watch.time()
+        self.last = self.start_time
+
+    # adds the time since the last lap to the given phase
+    def lap(self, phase):
+        now = self.watch.time()
+        self.times[phase] += now - self.last
+        self.last = now
+
+    def stop(self):
+        times = self.times
+        total = self.last - self.start_time
+        times[-1] = total
+        for phase in range(len(times)):
+            time = times[phase]
+            self.histograms[phase][self._bucket(time)] += 1
+            if time > self.maxima[phase]:
+                self.maxima[phase] = time
+            times[phase] = 0
+        self.ring[self.index] = total
+        self.index = (self.index + 1) % _RING
+        self.ticks += 1
+
+    def _bucket(self, time):
+        bucket = 0
+        while time and bucket < _BUCKETS - 1:
+            time >>= 1
+            bucket += 1
+        return bucket
+
+    # prints the histograms once when LEFT and RIGHT are pressed together
+    def buttons(self, pressed):
+        both = Button.LEFT in pressed and Button.RIGHT in pressed
+        if both and not self.pressed:
+            self.print()
+        self.pressed = both
+
+    def print(self):
+        print("Tick profile of %s ticks (ms)" % self.ticks)
+        limits = ['<%s' % (1 << k) for k in range(_BUCKETS - 1)] + ['>=%s' % (1 << (_BUCKETS - 2))]
+        print("%-8s %s %5s" % ('', ' '.join('%5s' % limit for limit in limits), 'max'))
+        for name, histogram, maximum in zip(PHASES, self.histograms, self.maxima):
+            print("%-8s %s %5s" % (name, ' '.join('%5s' % count for count in histogram), maximum))
+        last = [self.ring[(self.index + i) % _RING] for i in range(_RING)]
+        print("last ticks: %s" % ' '.join(str(time) for time in last))
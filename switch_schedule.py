@@ -0,0 +1,108 @@
+"""
+The next decisions of SwitchMotor.move_random for a motor tree, computed in
+advance. Without a SmartSensor, the path a train gets only depends on the
+random numbers and the current switch positions, so the decisions can be
+computed while the SwitchController waits for the next tick. When a train
+triggers the switch, apply() only moves the motors to the next precomputed
+positions, without drawing random numbers or looking at the probabilities.
+
+Every entry holds the state of the XorShift before the decision (2 bytes) and
+the positions of all motors of the tree after the decision (bit i is the
+position of motors[i]) in a ring of bytes. The tree has its own XorShift
+(seeded by the SwitchController), so the decisions do not depend on when the
+entries are computed.
+
+A motor of the tree might also be moved by another tree (e.g. a successor
+which is the root of the tree of another sensor). Then the entries have been
+computed from positions which are not valid anymore: apply() notices it,
+drops them and decides again from the current positions, with the random
+numbers of the dropped entries.
+"""
+class DecisionSchedule():
+    __slots__ = ('root', 'motors', 'index', 'rng', 'entries', 'width',
+                 'capacity', 'head', 'size', 'positions', 'applied')
+
+    def __init__(self, root, rng, capacity):
+        self.root = root
+        self.motors = []
+        self._add(root)
+        self.index = {motor: i for i, motor in enumerate(self.motors)}
+        self.rng = rng
+        self.width = 2 + ((len(self.motors) + 7) >> 3) # bytes per entry
+        self.capacity = capacity
+        self.entries = bytearray(capacity * self.width)
+        self.head = 0
+        self.size = 0
+        # the positions after the last computed entry
+        self.positions = self._current()
+        # the positions after the last applied entry
+        self.applied = self.positions
+
+    # the positions the motors have now
+    def _current(self):
+        positions = 0
+        for i, motor in enumerate(self.motors):
+            positions |= motor.switch_position << i
+        return positions
+
+    def _add(self, motor):
+        self.motors.append(motor)
+        for successor in motor.successors.values():
+            self._add(successor)
+
+    # the same decisions as SwitchMotor.move_random, starting at the positions
+    def _decide(self, positions):
+        motor = self.root
+        while motor is not None:
+            bit = self.index[motor]
+            position = (positions >> bit) & 1
+            if self.rng.next() < motor.thresholds[position]:
+                position ^= 1
+                positions ^= 1 << bit
+            motor = motor.successors.get(position)
+        return positions
+
+    # computes entries until the schedule is full (or count entries)
+    def fill(self, count=None):
+        free = self.capacity - self.size
+        if count is not None and count < free:
+            free = count
+        entries = self.entries
+        i = (self.head + self.size) % self.capacity * self.width
+        for _ in range(free):
+            state = self.rng.state
+            entries[i] = state >> 8
+            entries[i + 1] = state & 0xFF
+            positions = self.positions = self._decide(self.positions)
+            for j in range(2, self.width):
+                entries[i + j] = (positions >> ((j - 2) << 3)) & 0xFF
+            i = (i + self.width) % len(entries)
+        self.size += free
+
+    # moves the motors to the positions of the next entry
+    def apply(self):
+        current = self._current()
+        if current != self.applied:
+            # another tree moved a motor, decide again with the same numbers
+            if self.size:
+                i = self.head * self.width
+                self.rng.state = (self.entries[i] << 8) | self.entries[i + 1]
+                self.size = 0
+            self.positions = current
+        if not self.size:
+            # no time to compute the next entries since the last train
+            self.fill(1)
+        i = self.head * self.width
+        positions = 0
+        for j in range(2, self.width):
+            positions |= self.entries[i + j] << ((j - 2) << 3)
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+        self.applied = positions
+
+        motor = self.root
+        while motor is not None:
+            position = (positions >> self.index[motor]) & 1
+            if motor.switch_position != position:
+                motor.move()
+            motor = motor.successors.get(position)
@@ -0,0 +1,520 @@
+from micropython import const
+
+# the values of SwitchMode (see switch.py)
+_RISING_EDGE = const(0)
+_FALLING_EDGE = const(1)
+
+# the values of SensorEvent (see switch.py)
+_ARRIVED = const(0)
+_CLEARED = const(1)
+
+# the ms per tick of the tick-based timing parameters until the sensor is
+# registered with a SwitchController (the default dt of the SwitchController)
+_TICK_MS = const(50)
+
+# the number of learned gaps between wagons (see _learn_gap)
+_GAPS = const(16)
+_MIN_GAPS = const(4)
+
+# the size of the ring of the pending changes of a delayed post-sensor (see
+# _delay_state)
+_DELAY_SLOTS = const(8)
+
+# the time in ms a RISING_EDGE move must be done before the train arrives
+_MOVE_MARGIN_MS = const(200)
+
+"""
+The very basic sensor for a switch. Use the concrete implementations like 
+SwitchDistanceSensor (switch_distance.py, switch_ir.py, switch_ultrasonic.py and
+switch_color.py) to create a specific one or use the generic SwitchSensor()
+method of switch.py.
+All timeouts are counted in ms of measured time (the SwitchController passes the
+elapsed time to every tick), so they do not depend on the dt-value of the
+SwitchController. The default init_timeout_ms of 1000 means that after 1s
+without sensor detection a train is considered to be passed completely.
+"""
+class SwitchSensor_():
+    __slots__ = ('critical_distance', 'init_timeout', 'post_sensor_init_timeout',
+                 'post_sensor_timeout', 'switch_mode', 'timeout', 'state',
+                 'delay', 'delay_head', 'delay_size', 'delay_input', 'clock', 'post_sensor_delay', 'blocked',
+                 'distance', 'sensor', 'port', 'sample_interval',
+                 'max_sample_interval', 'countdown', 'window', 'window_index',
+                 'ema_shift', 'ema', 'leave_distance', 'threshold', 'gaps',
+                 'gap', 'gap_index', 'gap_count', 'min_init_timeout',
+                 'max_init_timeout', 'approach', 'move_time', 'deferred',
+                 'events', 'present', 'reported', 'pre_observers', 'post_observers',
+                 'ticks', 'tick_ms')
+
+    """
+    Creates a SwitchSensor.
+
+    params:
+    -switch_mode: If FALLING_EDGE, the switch moves after a train has passed,
+        if RISING_EDGE, the switch moves after a train has been detected and
+        (hopefully) before the train has reached the switch. Since the moving
+        takes a little bit, the distance between sensor and switch must be large
+        enough and the speed of the train must not be too fast. That's why,
+        FALLING_EDGE is recommended in general.
+    -init_timeout_ms: The initial timeout, which is the time in ms the sensor
+        needs to be unblocked, until a train is really considered to be passed.
+        This is necessary since the sensor may become unblocked during a train
+        passes (e.g. because of wagons).
+    -post_sensor_init_timeout_ms: if this sensor is used as post-sensor, then
+        this timeout refers to the time in ms the sensor stays additionally
+        blocked (after it becomes unblocked according to the usual timeouting).
+        If post_sensor_init_timeout_ms=5000 and init_timeout_ms=1000, then
+        after a train passed the sensor, the track is considered to be blocked
+        for another 1s+5s = 6 seconds.
+    -post_sensor_delay_ms: time in ms to delay the post_sensor_blocking 
+        signal. If the delay is 5000 and a train passes this sensor, the sensor
+        will be blocked first after 5s (as post-sensor).
+        This is especially useful if a train passing this post-sensor still 
+        needs to drive some seconds until it reaches a potential point of 
+        conflict with an output of another switch setup (where the post-sensor 
+        is used).
+    -init_timeout, post_sensor_init_timeout, post_sensor_delay: the same in
+        ticks, i.e. in multiples of the dt of the SwitchController the sensor
+        is registered with (50ms until then, the default dt), e.g.
+        init_timeout=20 is the same as init_timeout_ms=1000 with dt=50 and
+        init_timeout_ms=2000 with dt=100. If given, they are used instead of
+        the ms values.
+    -max_sample_interval: If larger than 1, the sensor is read adaptively: on
+        a quiet track, the interval between two readings doubles (up to
+        max_sample_interval ticks), while a train approaches (the distance
+        comes close to or moves toward the critical_distance), a train is
+        passing, or a neighbouring sensor of the same SmartSensor detects a
+        train, the sensor is read every tick. The timeouts are still counted
+        every tick (with the last reading), so they keep their meaning in ms.
+        Note that an incoming train is detected up to max_sample_interval-1
+        ticks later.
+    -median_window: If larger than 1, the distance is the median of the last
+        median_window readings (use an odd number like 3 or 5). This removes
+        single wrong readings (noise) and short gaps between wagons.
+    -ema_shift: If positive, the distance is smoothed by an exponential moving
+        average with a weight of 1/2**ema_shift for a new reading (after the
+        median), e.g. ema_shift=1 averages the new reading and the last value.
+    -leave_distance: Hysteresis of the detection. A train is detected if the
+        distance is below critical_distance, but is only considered to have
+        left if the distance is above leave_distance again (which must be at
+        least critical_distance). Defaults to critical_distance (no
+        hysteresis).
+    With these filters, a train is detected more reliably, so a much shorter
+    init_timeout is enough to bridge the gaps between wagons.
+    -learn_gaps: If True (only for SwitchMode.FALLING_EDGE), the sensor
+        measures the gaps between the wagons of the passing trains and adapts
+        the init_timeout to just above the longest usual gap (the largest of
+        the last gaps, the second largest once 16 gaps are known), between min_init_timeout_ms and
+        max_init_timeout_ms (default: init_timeout_ms). So the switch moves
+        sooner after trains with short gaps. The init_timeout_ms is used until
+        4 gaps have been measured. A gap longer than the current timeout is
+        still learned if the train is detected again within
+        max_init_timeout_ms, so the timeout grows again for such trains.
+    -approach_ms: The shortest time in ms a train needs from the sensor to the
+        switch (only for SwitchMode.RISING_EDGE). If given, a train only moves
+        the switch when it is detected if the measured move time of the motor
+        (see SwitchMotor.move_time) plus 200ms is not longer. Otherwise (and
+        as long as the motor has not moved yet), the switch moves after the
+        train has passed, like in the FALLING_EDGE mode. If None, the switch
+        always moves when a train is detected.
+    """
+    def __init__(self, critical_distance, 
+                switch_mode=_FALLING_EDGE, 
+                init_timeout=None, 
+                post_sensor_init_timeout=None, 
+                post_sensor_delay=None,
+                max_sample_interval=1,
+                init_timeout_ms=1000,
+                post_sensor_init_timeout_ms=1000,
+                post_sensor_delay_ms=0,
+                median_window=1,
+                ema_shift=0,
+                leave_distance=None,
+                learn_gaps=False,
+                min_init_timeout_ms=200,
+                max_init_timeout_ms=None,
+                approach_ms=None):
+        # the tick-based parameters, converted again with the dt of the
+        # SwitchController (see set_tick_ms)
+        self.ticks = None
+        if init_timeout is not None or post_sensor_init_timeout is not None or post_sensor_delay is not None:
+            self.ticks = [init_timeout, post_sensor_init_timeout, post_sensor_delay]
+        self.tick_ms = _TICK_MS
+        if init_timeout is not None:
+            init_timeout_ms = init_timeout * _TICK_MS
+        if post_sensor_init_timeout is not None:
+            post_sensor_init_timeout_ms = post_sensor_init_timeout * _TICK_MS
+        if post_sensor_delay is not None:
+            post_sensor_delay_ms = post_sensor_delay * _TICK_MS
+        self.critical_distance = critical_distance
+        self.init_timeout = init_timeout_ms
+        self.post_sensor_init_timeout = post_sensor_init_timeout_ms
+        self.post_sensor_timeout = -1
+        # the SmartSensors which count the state changes of this sensor
+        self.pre_observers = []
+        self.post_observers = [] # pairs of SmartSensor and bit mask of the paths
+        self.present = False # a train is in front of the sensor (timeout > 0)
+        self.reported = None # the timeout the pre_observers know
+        self.set_switch_mode(switch_mode) # initializes timeouts
+        self.state = False
+        # ring of the times of the pending changes of the blocked state
+        self.delay = [0] * _DELAY_SLOTS if post_sensor_delay_ms else None
+        self.delay_head = 0 # index of the oldest pending change
+        self.delay_size = 0
+        self.delay_input = False
+        self.clock = 0
+        self.post_sensor_delay = post_sensor_delay_ms
+        self.blocked = False
+        self.distance = 0
+        self.sample_interval = 1
+        self.max_sample_interval = max_sample_interval
+        self.countdown = 0 # ticks until the next reading
+        # the last readings for the median (None = no median filter)
+        self.window = [0] * median_window if median_window > 1 else None
+        self.window_index = -1 # -1 = the window is not filled yet
+        self.ema_shift = ema_shift
+        self.ema = None # the average scaled by 2**ema_shift
+        self.leave_distance = critical_distance if leave_distance is None else leave_distance
+        self.threshold = critical_distance # leave_distance while a train is detected
+        # the last gaps between wagons in ms (None = no gap learning)
+        self.gaps = [0] * _GAPS if learn_gaps else None
+        self.gap = -1 # the current gap in ms (-1 = no train)
+        self.gap_index = 0
+        self.gap_count = 0
+        self.min_init_timeout = min_init_timeout_ms
+        self.max_init_timeout = init_timeout_ms if max_init_timeout_ms is None else max_init_timeout_ms
+        self.approach = approach_ms
+        self.move_time = None # of the motor in ms, set by the SwitchController
+        self.deferred = False # the current train moves the switch after it has passed
+        self.events = None # the EventQueue of the SwitchController (None = not registered)
+
+    def __str__(self):
+        return "%s(%s)" % (str(type(self))[8:-2], self.port)
+
+    # dt is the time in ms since the last tick
+    def tick(self, dt=_TICK_MS):
+        self.countdown -= 1
+        if self.countdown <= 0:
+            last_distance = self.distance
+            self._distance()
+            if self.window or self.ema_shift:
+                self._filter()
+            if self.max_sample_interval > 1:
+                self._adapt(last_distance)
+            self.countdown = self.sample_interval
+        state = self._tick(dt)
+        if state != self.state:
+            self.state = state
+            for observer in self.pre_observers:
+                observer.pre_sensor_activated(1 if state else -1)
+        self._update_present()
+        if state and self.events is not None:
+            # a RISING_EDGE move (unless deferred) starts while the train is in front
+            self.events.push(self, _ARRIVED if self.timeout > 0 else _CLEARED)
+        self.is_blocked(dt)
+
+    # tells the observers if the timeout changed and if a train came in front
+    # of the sensor or left it
+    def _update_present(self):
+        timeout = self.timeout
+        if timeout == self.reported:
+            return
+        old = self.reported
+        self.reported = timeout
+        for observer in self.pre_observers:
+            observer.pre_sensor_timeout(old, timeout)
+        present = timeout > 0
+        if present != self.present:
+            self.present = present
+            for observer in self.pre_observers:
+                observer.pre_sensor_blocked(1 if present else -1)
+
+    # tells the observers that the init_timeout changed
+    def _update_init_timeout(self, init_timeout):
+        if init_timeout != self.init_timeout:
+            self.init_timeout = init_timeout
+            for observer in self.pre_observers:
+                observer.pre_sensor_init_timeout()
+
+    """
+    Adapts the sample interval to the last reading: a train in front of the
+    sensor (timeout running), a distance close to the critical_distance or a
+    distance moving toward it resets the interval to a single tick. Otherwise
+    the interval doubles up to max_sample_interval.
+    """
+    def _adapt(self, last_distance):
+        if self.is_near() or self.distance < last_distance - (self.critical_distance >> 3):
+            self.sample_interval = 1
+        elif self.sample_interval < self.max_sample_interval:
+            self.sample_interval = min(self.sample_interval << 1, self.max_sample_interval)
+
+    """
+    Filters the last reading (self.distance) by the median of the last
+    readings and the exponential moving average. No memory is allocated, the
+    median is found by counting in the fixed window.
+    """
+    def _filter(self):
+        distance = self.distance
+        window = self.window
+        if window:
+            if self.window_index < 0:
+                # fill the window with the first reading
+                for i in range(len(window)):
+                    window[i] = distance
+                self.window_index = 0
+            window[self.window_index] = distance
+            self.window_index = (self.window_index + 1) % len(window)
+            half = len(window) >> 1
+            for value in window:
+                less = equal = 0
+                for other in window:
+                    if other < value:
+                        less += 1
+                    elif other == value:
+                        equal += 1
+                if less <= half < less + equal:
+                    distance = value
+                    break
+        if self.ema_shift:
+            if self.ema is None:
+                self.ema = distance << self.ema_shift
+            else:
+                self.ema += distance - (self.ema >> self.ema_shift)
+            distance = self.ema >> self.ema_shift
+        self.distance = distance
+
+    # a train is in front of the sensor or the last reading is close to the critical_distance
+    def is_near(self):
+        critical = self.critical_distance
+        return self.timeout > 0 or self.distance < critical + (critical >> 2)
+
+    # reads the sensor in the next tick (e.g. a neighbouring sensor detected a train)
+    def wake(self):
+        self.sample_interval = 1
+        if self.countdown > 1:
+            self.countdown = 1
+
+    """
+    Performs a 'tick' of the sensor. 
+    
+    The 'timeout' is used as following: the timeout is resetted (i. e. set to a
+    positive number) if a train is currently detected in front of the train. If no
+    train can be detected this value is decremented by the time since the last
+    tick (dt in ms). The check is only successful
+    if the timout is not positive anymore (i. e. some time has been passed
+    since a train has been detected and we are not in between waggons by accident)
+    and the a train is currently in front the sensor.
+    """
+    def _tick(self, dt):
+        if self.switch_mode == _RISING_EDGE:
+            if self.distance < self.threshold:
+                # a train is in front the sensor
+                self.threshold = self.leave_distance
+                if self.timeout <= 0 and not self.deferred:
+                    self.reset()
+                    if self._in_time():
+                        return True
+                    # the switch would still be moving when the train arrives
+                    self.deferred = True
+                    return False
+                self.reset()
+            else:
+                self.threshold = self.critical_distance
+                self.decrement(dt)
+                if self.deferred and self.timeout == 0:
+                    # the train has passed (as in the FALLING_EDGE mode)
+                    self.deferred = False
+                    return True
+        else:
+            if self.distance > self.threshold:
+                self.threshold = self.critical_distance
+                if self.timeout >= 0:
+                    self.decrement(dt)
+                if self.gaps and self.gap >= 0:
+                    self.gap += dt
+                    if self.gap > self.max_init_timeout:
+                        # not a gap, the train has passed
+                        self.gap = -1
+            else:
+                self.threshold = self.leave_distance
+                if self.gaps:
+                    if self.gap > 0:
+                        self._learn_gap()
+                    self.gap = 0
+                self.reset()
+
+            if self.timeout == 0:
+                # a train is not anymore in front
+                self.timeout = -1
+                return True
+
+        return False
+
+    """
+    Stores the current gap and sets the init_timeout to half more than the
+    k-th largest stored gap (k = number of gaps / 16, i.e. the largest or the
+    second largest, about the 94th percentile), plus one tick. No memory is
+    allocated.
+    """
+    def _learn_gap(self):
+        gaps = self.gaps
+        gaps[self.gap_index] = self.gap
+        self.gap_index = (self.gap_index + 1) % _GAPS
+        if self.gap_count < _GAPS:
+            self.gap_count += 1
+        if self.gap_count < _MIN_GAPS:
+            return
+        rank = self.gap_count >> 4
+        for value in gaps:
+            larger = equal = 0
+            for other in gaps:
+                if other > value:
+                    larger += 1
+                elif other == value:
+                    equal += 1
+            if larger <= rank < larger + equal:
+                break
+        timeout = value + (value >> 1) + _TICK_MS
+        self._update_init_timeout(min(max(timeout, self.min_init_timeout), self.max_init_timeout))
+
+    # the switch can be moved before the train detected in RISING_EDGE mode arrives
+    def _in_time(self):
+        if self.approach is None:
+            return True
+        return self.move_time is not None and self.move_time + _MOVE_MARGIN_MS <= self.approach
+
+    # the time in ms the motor of this sensor needs to move (None = unknown)
+    def set_move_time(self, move_time):
+        self.move_time = move_time
+
+    def check(self):
+        return self.state
+
+    # called by the SwitchController for an event of this sensor
+    def move_motor(self, motor, kind):
+        motor.move_random()
+
+    # the last reading detected a train (the timeout has just been reset)
+    def sees_train(self):
+        return self.timeout == self.init_timeout
+
+    def is_currently_blocked(self):
+        return self.timeout > 0
+
+    def is_blocked(self, dt=_TICK_MS):
+        if self.is_currently_blocked():
+            self.post_sensor_timeout = self.post_sensor_init_timeout
+            blocked = True
+        else:
+            blocked = self.post_sensor_timeout > 0
+            if blocked:
+                self.post_sensor_timeout -= dt
+
+        # delay the blocked signal (if post_sensor_delay > 0)
+        if self.post_sensor_delay:
+            blocked = self._delay_state(blocked, dt)
+        if blocked != self.blocked:
+            self.blocked = blocked
+            for observer, mask in self.post_observers:
+                observer.post_sensor_blocked(mask, blocked)
+        return blocked
+
+    """
+    Delays the blocked state by post_sensor_delay ms. Only the times of the
+    changes of the state are kept in a fixed ring, so the memory does not depend
+    on the length of the delay. If the ring is full, a new change cancels the
+    last pending one, i.e. the shortest and latest pulse is dropped.
+    """
+    def _delay_state(self, blocked, dt):
+        self.clock += dt
+        delay = self.delay
+        if blocked != self.delay_input:
+            self.delay_input = blocked
+            if self.delay_size < _DELAY_SLOTS:
+                delay[(self.delay_head + self.delay_size) % _DELAY_SLOTS] = self.clock
+                self.delay_size += 1
+            else:
+                self.delay_size -= 1
+        state = self.blocked
+        while self.delay_size and self.clock - delay[self.delay_head] >= self.post_sensor_delay:
+            self.delay_head = (self.delay_head + 1) % _DELAY_SLOTS
+            self.delay_size -= 1
+            state = not state
+        return state
+
+    def _distance(self):
+        self.distance = self.sensor.distance()
+
+    def decrement(self, dt=_TICK_MS):
+        self.timeout = max(0, self.timeout - dt)
+
+    def reset(self):
+        self.timeout = self.init_timeout
+        self._update_present()
+
+    def reset2wait(self):
+        self.deferred = False
+        if self.switch_mode == _RISING_EDGE:
+            self.timeout = self.init_timeout
+        else:
+            self.timeout = -1
+        self._update_present()
+
+    # init_timeout in ticks (of tick_ms, see set_tick_ms), see set_init_timeout_ms
+    def set_init_timeout(self, init_timeout):
+        self.set_init_timeout_ms(init_timeout * self.tick_ms)
+        if self.ticks is None:
+            self.ticks = [None, None, None]
+        self.ticks[0] = init_timeout
+
+    def set_init_timeout_ms(self, init_timeout_ms):
+        if self.ticks:
+            self.ticks[0] = None
+        self._update_init_timeout(init_timeout_ms)
+        if self.gaps:
+            # learn again, bounded by the new timeout (the old gaps were
+            # measured with the old bounds)
+            self.max_init_timeout = init_timeout_ms
+            gaps = self.gaps
+            for index in range(_GAPS):
+                gaps[index] = 0
+            self.gap_index = 0
+            self.gap_count = 0
+
+    """
+    Sets the ms per tick, i.e. the dt of the SwitchController the sensor is
+    registered with, and converts the tick-based parameters (init_timeout,
+    post_sensor_init_timeout, post_sensor_delay and set_init_timeout) with it.
+    A maximum init_timeout of a learning sensor which defaulted to the
+    init_timeout is converted as well. Called by the SwitchController.
+    """
+    def set_tick_ms(self, tick_ms):
+        old_tick_ms = self.tick_ms
+        self.tick_ms = tick_ms
+        if self.ticks is None:
+            return
+        init_timeout, post_sensor_init_timeout, post_sensor_delay = self.ticks
+        if init_timeout is not None:
+            if self.max_init_timeout == init_timeout * old_tick_ms:
+                self.max_init_timeout = init_timeout * tick_ms
+            self._update_init_timeout(init_timeout * tick_ms)
+        if post_sensor_init_timeout is not None:
+            self.post_sensor_init_timeout = post_sensor_init_timeout * tick_ms
+        if post_sensor_delay is not None:
+            self.post_sensor_delay = post_sensor_delay * tick_ms
+
+    def set_switch_mode(self, switch_mode):
+        self.switch_mode = switch_mode
+        if self.switch_mode == _RISING_EDGE:
+            self.timeout = 0
+        else:
+            self.timeout = -1
+        self._update_present()
+
+    def sensors(self):
+        return {self}
+
+# a remote sensor i.e. a sensor that is connected to another hub
+class SwitchRemoteSensor(SwitchSensor_):
+    __slots__ = ()
+    # todo implement (placeholder so far) (Issue2)
+    pass
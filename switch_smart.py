@@ -0,0 +1,353 @@
+from micropython import const
+
+# the value of SwitchMode.FALLING_EDGE (see switch.py)
+_FALLING_EDGE = const(1)
+
+# the values of SensorEvent (see switch.py)
+_CLEARED = const(1)
+_POST_BLOCKED = const(2)
+_POST_FREED = const(3)
+
+# the time in ms the switch waits after the estimated end of a train (see
+# SmartSensor._estimate), for the errors of the speed measured in whole ticks
+_CLEAR_MARGIN_MS = const(100)
+
+"""
+The post-sensors of a SmartSensor as a trie of their paths, which follows the
+successor tree of the SwitchMotor: a node is a list [sensor, straight child,
+curved child, path], where the sensor and the path are only set at the end
+of a path. Since no path of a post-sensor may be the prefix of another one,
+a conflict is found while inserting a path, in O(length of the path).
+"""
+class PathTrie():
+    __slots__ = ('root',)
+
+    def __init__(self):
+        self.root = [None, None, None, None]
+
+    def insert(self, path, sensor):
+        node = self.root
+        for position in path:
+            if node[0] is not None:
+                self._conflict(path, node[3])
+            child = node[position + 1]
+            if child is None:
+                child = node[position + 1] = [None, None, None, None]
+            node = child
+        if node[1] is not None or node[2] is not None:
+            # a longer path has been inserted before, find one of them
+            while node[0] is None:
+                node = node[1] if node[1] is not None else node[2]
+            self._conflict(node[3], path)
+        node[0] = sensor
+        node[3] = path
+
+    def _conflict(self, path1, path2):
+        raise ValueError("The configuration of the post_sensors is invalid! Path <%s> and Path <%s> is a subpath/ superpath pair!" % (path1, path2))
+
+    # appends the paths of the blocked post-sensors below the node to paths
+    def blocked(self, paths, node=None):
+        if node is None:
+            node = self.root
+        if node[0] is not None:
+            if node[0].blocked:
+                paths.append(node[3])
+        else:
+            for child in (node[1], node[2]):
+                if child is not None:
+                    self.blocked(paths, child)
+        return paths
+
+"""
+A wrapper class for multiple sensors. 
+
+To type of sensors are distinguished: pre- and post-sensors.
+
+A pre-sensor can be any SwitchSensor and checks if the current switch is
+blocked or not. Compared to the SwitchSensor, multiple pre-sensors can be
+provided. This might be useful to prevent situations in which a train drives in
+front of the (single) sensor, just after the switch moving started. This might
+derail the train. This motivates to place the sensor as far away from the motor/
+switch as possible. On the other hand, this can lead to derailments if a train
+stops on the switch. That's why using multiple sensors might make your track
+saver and leads to less crashes.
+
+A post-sensor can also be any SwitchSensor which checks if an output of the
+switch leads to a currently blocked track. Those sensors can still be used 
+normally in another switch as well. You can even define the delay of such 
+switches (using the post_sensor_delay_ms option of the SwitchSensor) and a
+timeout (using the post_sensor_init_timeout_ms option of the SwitchSensor). The
+timeout extends the blocking state of a post-sensor by the given time
+(post_sensor_init_timeout_ms=2000 means the sensor stays 2s longer blocked -
+additionally to the init_timeout).   
+
+If the first two pre-sensors are placed one after the other in front of the
+switch (in the direction of the trains) and their distance is given by
+sensor_spacing_mm, the SmartSensor measures the speed of every train (the time
+between the fronts of the train at both sensors) and its length (the time the
+train is in front of the second sensor times the speed), see speed and length.
+Then the switch does not wait for the init_timeout of the sensors
+(SwitchMode.FALLING_EDGE) but only until the end of the train has passed the
+switch, which is clearance_mm behind the second sensor. The end of the train
+is expected (spacing + clearance) / speed after the last detection of the
+first sensor and clearance / speed after the last detection of the second
+sensor (plus one tick and a safety margin of 100ms). So the switch moves
+sooner after fast trains. The gaps between the wagons must be shorter than
+the spacing of the sensors. If a train does not reach the second sensor, the
+usual timeouts are used.
+"""
+class SmartSensor:
+    __slots__ = ('pre_sensors', 'post_sensors', 'post_trie', 'timeout', 'init_timeout',
+                 'state', 'blocked', 'post_sensors_blocked', 'spacing',
+                 'clearance', 'clock', 'front0', 'front1', 'seen0', 'seen1',
+                 'speed', 'length', 'events', 'free', 'activated',
+                 'blocked_paths', 'activated_count', 'blocked_count',
+                 'paths', 'post_bits', 'path_bits')
+
+    def __init__(self, *args, **kwargs):
+        self.pre_sensors = list(args) + kwargs.get('pre_sensors', [])
+        self.post_sensors = kwargs.get('post_sensors', {})
+        # raises a ValueError if a path is the prefix of another one
+        self.post_trie = PathTrie()
+        for path, sensor in self.post_sensors.items():
+            self.post_trie.insert(path, sensor)
+        self.update_timeout()
+        self.update_init_timeout()
+        self.state = (False, (False, []))  
+        self.blocked = []  
+        # the pre- and post-sensors update these counters when their state
+        # changes, so a tick does not need to look at all of them
+        self.activated_count = 0 # the pre-sensors which fired in this tick
+        self.blocked_count = 0 # the pre-sensors with a train in front
+        self.paths = [] # the paths of the post-sensors, bit i is paths[i]
+        # the blocked state per path, updated in place (the SwitchController
+        # keeps the list for the light matrix)
+        self.post_sensors_blocked = []
+        self.post_bits = 0 # the paths of the blocked post-sensors
+        self.path_bits = 0 # the post_bits of blocked_paths
+        for sensor in self.pre_sensors:
+            self._observe_pre_sensor(sensor)
+        for path, sensor in self.post_sensors.items():
+            self._observe_post_sensor(sensor, path)
+        # the estimation of speed and length (spacing=0 means no estimation)
+        self.spacing = kwargs.get('sensor_spacing_mm', 0) if len(self.pre_sensors) > 1 else 0
+        self.clearance = kwargs.get('clearance_mm', 0)
+        self.clock = 0 # in ms
+        self.front0 = None # the time the current train reached the first sensor
+        self.front1 = None # ... and the second sensor
+        self.seen0 = 0 # the time the first sensor detected the train the last time
+        self.seen1 = 0
+        self.speed = None # of the last train in mm/s
+        self.length = None # of the last train in mm
+        self.events = None # the EventQueue of the SwitchController (None = not registered)
+        self.free = True # no pre-sensor is blocked
+        self.activated = False # a pre-sensor fired in the last tick
+        self.blocked_paths = [] # the paths of the blocked post-sensors
+
+    def __str__(self):
+        pre_sensors = ", ".join([str(s) for s in self.pre_sensors])
+        return "SmartSensor\n-Pre-Sensors: %s" % (pre_sensors)
+
+    def add_pre_sensor(self, sensor):
+        self.pre_sensors.append(sensor)
+        self._observe_pre_sensor(sensor)
+        self.update_timeout()
+        self.update_init_timeout()
+
+    def add_post_sensor(self, sensor, path):
+        self.post_trie.insert(path, sensor)
+        if path in self.post_sensors:
+            # replace the sensor of this path
+            old = self.post_sensors[path]
+            mask = 1 << self.paths.index(path)
+            old.post_observers = [o for o in old.post_observers if o != (self, mask)]
+            if old.blocked:
+                self.post_bits &= ~mask
+        self.post_sensors[path] = sensor
+        self._observe_post_sensor(sensor, path)
+
+    def _observe_pre_sensor(self, sensor):
+        sensor.pre_observers.append(self)
+        if sensor.state:
+            self.activated_count += 1
+        if sensor.present:
+            self.blocked_count += 1
+
+    def _observe_post_sensor(self, sensor, path):
+        if path not in self.paths:
+            self.paths.append(path)
+            self.post_sensors_blocked.append(False)
+        mask = 1 << self.paths.index(path)
+        sensor.post_observers.append((self, mask))
+        if sensor.blocked:
+            self.post_bits |= mask
+
+    # called by a pre-sensor whose check() changed (delta is 1 or -1)
+    def pre_sensor_activated(self, delta):
+        self.activated_count += delta
+
+    # called by a pre-sensor which got or lost a train in front of it
+    def pre_sensor_blocked(self, delta):
+        self.blocked_count += delta
+
+    # called by a pre-sensor whose timeout changed from old
+    def pre_sensor_timeout(self, old, timeout):
+        if timeout >= self.timeout:
+            self.timeout = timeout
+        elif old == self.timeout:
+            # the largest timeout decreased, another pre-sensor might have it now
+            self.update_timeout()
+
+    # called by a pre-sensor whose init_timeout changed (e.g. learned by gaps)
+    def pre_sensor_init_timeout(self):
+        self.update_init_timeout()
+
+    # called by a post-sensor whose blocked state changed
+    def post_sensor_blocked(self, mask, blocked):
+        if blocked:
+            self.post_bits |= mask
+        else:
+            self.post_bits &= ~mask
+
+    # the pre-sensors keep timeout and init_timeout up to date (see
+    # pre_sensor_timeout), so these are only called when the maximum is unknown
+    def update_timeout(self):
+        self.timeout = max([s.timeout for s in self.pre_sensors])
+    
+    def update_init_timeout(self):
+        self.init_timeout = max([s.init_timeout for s in self.pre_sensors])
+
+    # the pre- and post-sensors are ticked (with dt) by the SwitchController
+    def tick(self, dt=None):
+        self.state = self._tick(dt)
+
+    """
+    The core function of the SmartSensor.
+
+    It checks for blocked paths and if any pre_sensor is activated (i.e. the 
+    corresponding motor should move in this tick randomly) or is blocked (i.e.
+    a train is in front of the sensor).
+
+    While no pre-sensor is blocked, an event is emitted if a pre-sensor is
+    activated or the pre-sensors just became free (SensorEvent.CLEARED), or if
+    the blocked paths changed (SensorEvent.POST_BLOCKED or POST_FREED). Then
+    the motor moves to a free path (see SwitchMotor.move_smart), otherwise its
+    path stays valid.
+    """
+    def _tick(self, dt=None):
+        bits = self.post_bits
+        added = bits & ~self.path_bits
+        if bits != self.path_bits:
+            self.path_bits = bits
+            self.blocked_paths = self.post_trie.blocked([])
+            blocked = self.post_sensors_blocked
+            for i in range(len(blocked)):
+                blocked[i] = bool(bits >> i & 1)
+            changed = True
+        else:
+            changed = False
+        # first check if any presensor fires
+        any_activated = self.activated_count > 0
+        if self.spacing and dt and self.pre_sensors[0].switch_mode == _FALLING_EDGE:
+            if self._estimate(dt):
+                any_activated = True
+            elif self.front1 is not None:
+                # the speed is known, wait for the estimated end instead of the timeouts
+                any_activated = False
+            elif any_activated:
+                # the train did not reach the second sensor, the usual timeouts are used
+                self.front0 = None
+        any_blocked = self.blocked_count > 0
+        if any_activated:
+            for s in self.pre_sensors:
+                s.reset2wait()
+        if any_activated or any_blocked:
+            self.wake()
+
+        free = not any_blocked
+        if free and self.events is not None:
+            if any_activated or not self.free:
+                self.events.push(self, _CLEARED)
+            elif changed:
+                self.events.push(self, _POST_BLOCKED if added else _POST_FREED)
+        self.free = free
+        self.activated = any_activated
+
+        return free, (any_activated, self.blocked_paths)
+
+    """
+    Measures the speed and length of the current train and returns True if
+    the end of the train is expected to have passed the switch. Then the
+    pre-sensors stop waiting for their timeouts.
+    """
+    def _estimate(self, dt):
+        self.clock += dt
+        clock = self.clock
+        first, second = self.pre_sensors[0], self.pre_sensors[1]
+        if first.sees_train():
+            if self.front0 is None:
+                self.front0 = clock
+                self.front1 = None
+            self.seen0 = clock
+        if second.sees_train() and self.front0 is not None:
+            if self.front1 is None:
+                self.front1 = clock
+                self.speed = self.spacing * 1000 // max(1, clock - self.front0)
+            self.seen1 = clock
+        if self.front1 is None or not self.speed:
+            return False
+
+        clearance = self.clearance * 1000
+        end = max(self.seen0 + (self.spacing * 1000 + clearance) // self.speed, self.seen1 + clearance // self.speed)
+        # the end might have passed up to one tick after the last detection,
+        # plus the safety margin
+        if clock < end + dt + _CLEAR_MARGIN_MS:
+            return False
+        self.length = (self.seen1 - self.front1 + dt) * self.speed // 1000
+        self.front0 = self.front1 = None
+        for s in self.pre_sensors:
+            s.reset2wait()
+        return True
+
+    def check(self):
+        return self.state
+
+    # called by the SwitchController for an event of this SmartSensor
+    def move_motor(self, motor, kind):
+        motor.move_smart(self.activated, self.blocked_paths)
+
+    # the sensors of this SmartSensor are ticked (and checked) by themselves
+    def is_near(self):
+        return self.timeout > 0
+
+    # reads all sensors in the next tick
+    def wake(self):
+        for sensor in self.sensors():
+            sensor.wake()
+        
+    def sensors(self):
+        return self.pre_sensors + list(self.post_sensors.values())
+
+    def reset(self):
+        for sensor in self.sensors():
+            sensor.reset()
+
+    def set_init_timeout(self, init_timeout):
+        for sensor in self.sensors():
+            sensor.set_init_timeout(init_timeout)
+
+    def set_init_timeout_ms(self, init_timeout_ms):
+        for sensor in self.sensors():
+            sensor.set_init_timeout_ms(init_timeout_ms)
+
+    def set_tick_ms(self, tick_ms):
+        for sensor in self.sensors():
+            sensor.set_tick_ms(tick_ms)
+
+    def set_move_time(self, move_time):
+        for sensor in self.pre_sensors:
+            sensor.set_move_time(move_time)
+
+    def set_switch_mode(self, switchMode):
+        for sensor in self.sensors():
+            sensor.set_switch_mode(switchMode)
@@ -0,0 +1,15 @@
+from pybricks.pupdevices import UltrasonicSensor
+from pybricks.parameters import Port
+from switch_sensor import SwitchSensor_
+
+"""
+The ultrasonic sensor known from LEGO Mindstorms 51515 (LEGO part 37316c01)
+"""
+class SwitchUltrasonicSensor(SwitchSensor_):
+    __slots__ = ()
+
+    # critical distance in mm
+    def __init__(self, port : Port, critical_distance=120, *args, **kwargs):
+        super().__init__(critical_distance, *args, **kwargs)
+        self.sensor = UltrasonicSensor(port)
+        self.port = port
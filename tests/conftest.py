@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+TOOLS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tools')
+sys.path.insert(0, TOOLS)
+
+import host # noqa: E402
+
+host.install()
+
+
+@pytest.fixture(autouse=True)
+def simulation():
+    """
+    Resets the simulated time, devices and sensor readings of tools/sim.
+    """
+    from pybricks import pupdevices
+    pupdevices.reset()
+    yield pupdevices
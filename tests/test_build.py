@@ -0,0 +1,46 @@
+import os
+import re
+
+import pytest
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Button, Port
+
+import build
+
+SUFFIXES = build.load_suffixes()
+# the device ids of the sensor classes (SwitchSensor detects the distance sensor)
+DEVICE_IDS = {'Ultrasonic': 62, 'IR': 35, 'Color': 61, 'Distance': 37, '': 37}
+TICKS = 500
+
+
+class Buttons:
+    # presses the center button after the given number of ticks
+    def __init__(self, ticks):
+        self.ticks = ticks
+
+    def pressed(self):
+        self.ticks -= 1
+        return {Button.CENTER} if self.ticks < 0 else set()
+
+
+@pytest.mark.parametrize('name', sorted(SUFFIXES))
+def test_minified_bundle_runs(name, tmp_path, monkeypatch):
+    monkeypatch.setattr(build, 'BUILD', str(tmp_path))
+    hub_name = build.TARGETS.get(name, 'PrimeHub')
+    report = build.build(name, SUFFIXES[name], hub_name, None)
+    with open(os.path.join(str(tmp_path), name + '.py')) as f:
+        source = f.read()
+    assert report['source'] == len(source.encode()) < report['original']
+
+    # trains pass every sensor of the layout
+    for port in 'ABCDEF':
+        pupdevices.IDS[getattr(Port, port)] = 37
+        pupdevices.READINGS[getattr(Port, port)] = ([100] * 20 + [10] * 5) * 20
+    for kind, port in re.findall(r'Switch(Ultrasonic|IR|Color|Distance|)Sensor\(Port\.([A-F])', source):
+        pupdevices.IDS[getattr(Port, port)] = DEVICE_IDS[kind]
+    hub = hubs.ThisHub(display='display' in build.HUB_FEATURES[hub_name])
+    hub.buttons = Buttons(TICKS)
+    monkeypatch.setattr(hubs, 'ThisHub', lambda: hub)
+    exec(compile(source, name, 'exec'), {'__name__': '__main__'})
+    assert pupdevices.MOVES
+    assert hub.buttons.ticks < 0
@@ -0,0 +1,115 @@
+import random
+
+import pytest
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Button, Color, Port
+from pybricks.tools import StopWatch, wait
+
+from compile_layout import compile_layout
+from layout import normalize, pack
+
+TICKS = 600
+# the device ids of the sensor types other than distance
+DEVICE_IDS = {'ir': 35, 'ultrasonic': 62, 'color': 61}
+
+PLAIN = {
+    'dt': 50,
+    'sensors': {'A': {'init_timeout': 10}, 'E': {'switch_mode': 'RISING_EDGE', 'init_timeout': 15}, 'F': {'type': 'color'}},
+    'motors': {'B': {'probability_straight_to_curved': 0.3, 'probability_curved_to_straight': 0.9,
+                     'successors': {'CURVED': 'C'}, 'turn_degrees': 90},
+               'C': {'probability_straight_to_curved': 0.6, 'probability_curved_to_straight': 0.4,
+                     'switch_position': 'CURVED', 'turn_degrees': 60},
+               'D': {'probability_straight_to_curved': 0.7, 'probability_curved_to_straight': 0.5, 'turn_degrees': 60}},
+    'switches': [{'sensors': ['A'], 'motor': 'B'}, {'sensors': ['E'], 'motor': 'D'}],
+}
+
+FILTERED = dict(PLAIN, sensors={
+    'A': {'init_timeout': 10, 'median_window': 3, 'ema_shift': 0, 'leave_distance': 45},
+    'E': {'switch_mode': 'RISING_EDGE', 'init_timeout': 15, 'median_window': 1, 'ema_shift': 1},
+    'F': {'type': 'color', 'median_window': 5, 'ema_shift': 2, 'leave_distance': 110},
+})
+
+SMART = {
+    'dt': 50,
+    'sensors': {'A': {'init_timeout': 10}, 'E': {'init_timeout': 15},
+                'F': {'post_sensor_init_timeout': 30, 'post_sensor_delay': 13}, 'D': {'post_sensor_init_timeout': 5}},
+    'motors': {'B': {'probability_straight_to_curved': 0.3, 'probability_curved_to_straight': 0.9,
+                     'successors': {'CURVED': 'C'}, 'turn_degrees': 90},
+               'C': {'probability_straight_to_curved': 0.6, 'probability_curved_to_straight': 0.4, 'turn_degrees': 60}},
+    'switches': [{'sensors': ['A', 'E'], 'motor': 'B',
+                  'post_sensors': [[['STRAIGHT'], 'F'], [['CURVED', 'CURVED'], 'D']]}],
+}
+
+
+def replay(layout, seed):
+    """
+    Connects a distance sensor to every port of the layout and lets it read a
+    random trace of trains (far readings) and wagons with gaps (near readings).
+    """
+    pupdevices.reset()
+    trace = random.Random(seed)
+    for port in layout['sensors']:
+        readings = []
+        while len(readings) < TICKS:
+            if trace.random() < 0.5:
+                readings += [100] * trace.randint(5, 80)
+            else:
+                readings += ([10] * trace.randint(1, 8) + [100] * trace.randint(0, 6)) * trace.randint(1, 6)
+        pupdevices.READINGS[getattr(Port, port)] = readings[:TICKS]
+    for port in 'ABCDEF':
+        pupdevices.IDS[getattr(Port, port)] = 37 # a ColorDistanceSensor
+    for port, config in layout['sensors'].items():
+        if config.get('type') in DEVICE_IDS:
+            pupdevices.IDS[getattr(Port, port)] = DEVICE_IDS[config['type']]
+
+
+class Buttons:
+    # presses the center button after the given number of ticks
+    def __init__(self, ticks):
+        self.ticks = ticks
+
+    def pressed(self):
+        self.ticks -= 1
+        return {Button.CENTER} if self.ticks < 0 else set()
+
+
+def run_controller(layout, seed):
+    import switch
+    replay(layout, seed)
+    hub = hubs.ThisHub(display=False)
+    controller = switch.SwitchController(hub, seed=normalize(layout)['seed'])
+    controller.load(pack(layout))
+    # the loop of SwitchController.run()
+    watch = StopWatch()
+    last = watch.time() - controller.dt
+    for _ in range(TICKS - 1):
+        now = watch.time()
+        controller.tick(now - last)
+        last = now
+        slack = controller.dt - (watch.time() - now)
+        if slack > 0:
+            wait(slack)
+    controller.color(Color.BLUE)
+    controller.reset()
+    return list(pupdevices.MOVES), hub.light.colors
+
+
+def run_compiled(layout, seed, monkeypatch):
+    program = compile_layout(layout)
+    replay(layout, seed)
+    hub = hubs.ThisHub(display=False)
+    hub.buttons = Buttons(TICKS - 1)
+    monkeypatch.setattr(hubs, 'ThisHub', lambda: hub)
+    exec(compile(program, 'compiled', 'exec'), {'__name__': 'compiled'})
+    return list(pupdevices.MOVES), hub.light.colors
+
+
+@pytest.mark.parametrize('layout', [PLAIN, FILTERED, SMART], ids=['plain', 'filtered', 'smart'])
+@pytest.mark.parametrize('seed', range(5))
+def test_compiled_program_moves_like_controller(layout, seed, monkeypatch):
+    layout = dict(layout, seed=seed + 1)
+    moves, colors = run_controller(layout, seed)
+    compiled_moves, compiled_colors = run_compiled(layout, seed, monkeypatch)
+    assert len(moves) > 0
+    assert compiled_moves == moves
+    assert compiled_colors == colors
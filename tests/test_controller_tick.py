@@ -0,0 +1,56 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Color, Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+from switch_smart import SmartSensor
+
+DT = 50
+
+
+def connect(*ports):
+    for port in ports:
+        pupdevices.IDS[port] = 37 # a ColorDistanceSensor
+
+
+def motor(port=Port.B):
+    return switch.SwitchMotor(port, probability_straight_to_curved=1, probability_curved_to_straight=1, turn_degrees=90)
+
+
+def test_status_light_follows_the_timeouts():
+    connect(Port.A)
+    hub = hubs.ThisHub(display=False)
+    controller = switch.SwitchController(hub, seed=1)
+    sensor = SwitchDistanceSensor(Port.A, init_timeout_ms=200)
+    controller.register_sensor(sensor, motor())
+    pupdevices.READINGS[Port.A] = [100] * 2 + [10] * 2 + [100] * 8
+    lights = []
+    for _ in range(12):
+        controller.tick(DT)
+        lights.append(controller.current_color)
+    # seen in the ticks 2 and 3, the timeout runs out in tick 7
+    assert lights == [Color.GREEN] * 2 + [Color.ORANGE] * 2 + [Color.YELLOW] * 3 + [Color.GREEN] * 5
+    # the move is shown in between
+    assert hub.light.colors == [Color.GREEN, Color.ORANGE, Color.YELLOW, Color.RED, Color.GREEN]
+
+
+def test_light_matrix_gets_the_blocked_states_of_the_post_sensors():
+    connect(Port.A, Port.C, Port.D)
+    hub = hubs.ThisHub()
+    controller = switch.SwitchController(hub, seed=1)
+    first = SwitchDistanceSensor(Port.A)
+    post = SwitchDistanceSensor(Port.D)
+    smart = SmartSensor(first, SwitchDistanceSensor(Port.C))
+    smart.add_post_sensor(post, (switch.SwitchPosition.STRAIGHT,))
+    controller.register_sensor(smart, motor())
+    # the controller keeps the list of the SmartSensor instead of building one per tick
+    blocked = smart.post_sensors_blocked
+    assert controller.blocked == (blocked,)
+    assert controller.smart == {smart}
+    pupdevices.READINGS[Port.D] = [10] * 3
+    for _ in range(3):
+        controller.tick(DT)
+    assert smart.post_sensors_blocked is blocked
+    assert blocked == [True]
+    # the first row of the matrix shows the blocked path
+    assert controller.display.shown[1] == ((True,),)
@@ -0,0 +1,119 @@
+import pytest
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch import EventQueue, SensorEvent
+from switch_distance import SwitchDistanceSensor
+from switch_smart import SmartSensor
+
+DT = 50
+# a train in front of the sensor in the ticks 2 to 4
+TRAIN = [100] * 2 + [10] * 3 + [100] * 30
+
+
+def connect(*ports):
+    for port in ports:
+        pupdevices.IDS[port] = 37 # a ColorDistanceSensor
+
+
+def motor(port):
+    return switch.SwitchMotor(port, probability_straight_to_curved=1, probability_curved_to_straight=1, turn_degrees=90)
+
+
+# the index of the current tick of run
+TICK = [0]
+
+
+def record(controller, sensor):
+    # subscribes a handler which records the (tick, kind) of the events of sensor
+    events = []
+    controller.events.subscribe(sensor, lambda s, kind: events.append((TICK[0], kind)))
+    return events
+
+
+def run(controller, ticks):
+    for tick in range(ticks):
+        TICK[0] = tick
+        controller.tick(DT)
+
+
+def test_queue_dispatches_in_order_and_wraps():
+    queue = EventQueue(2)
+    seen = []
+    queue.subscribe('a', lambda s, kind: seen.append((s, kind)))
+    queue.subscribe('b', lambda s, kind: seen.append((s, kind)))
+    for _ in range(3):
+        queue.push('a', SensorEvent.ARRIVED)
+        queue.push('b', SensorEvent.CLEARED)
+        with pytest.raises(RuntimeError):
+            queue.push('a', SensorEvent.CLEARED)
+        queue.dispatch()
+    assert seen == [('a', SensorEvent.ARRIVED), ('b', SensorEvent.CLEARED)] * 3
+    assert queue.sources == [None, None]
+
+
+def test_events_of_unsubscribed_sensors_are_dropped():
+    queue = EventQueue()
+    queue.push('a', SensorEvent.ARRIVED)
+    queue.dispatch()
+    assert queue.size == 0
+
+
+def test_sensors_emit_arrived_and_cleared():
+    connect(Port.A, Port.C)
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=1)
+    rising = SwitchDistanceSensor(Port.A, switch_mode=switch.SwitchMode.RISING_EDGE, init_timeout_ms=200)
+    falling = SwitchDistanceSensor(Port.C, init_timeout_ms=200)
+    controller.register_sensor(rising, motor(Port.B))
+    controller.register_sensor(falling, motor(Port.D))
+    arrived = record(controller, rising)
+    cleared = record(controller, falling)
+    # the own handlers are called after the controller moved the switch
+    moves = []
+    controller.events.subscribe(rising, lambda s, kind: moves.append(len(pupdevices.MOVES)))
+    pupdevices.READINGS[Port.A] = list(TRAIN)
+    pupdevices.READINGS[Port.C] = list(TRAIN)
+    run(controller, len(TRAIN))
+    # the train is detected in tick 2 and has passed 200ms after tick 4
+    assert arrived == [(2, SensorEvent.ARRIVED)]
+    assert cleared == [(8, SensorEvent.CLEARED)]
+    assert moves == [1]
+    assert [port for port, _ in pupdevices.MOVES] == [Port.B, Port.D]
+
+
+def test_smart_sensor_emits_post_blocked_and_post_freed():
+    connect(Port.A, Port.C, Port.D)
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=1)
+    smart = SmartSensor(SwitchDistanceSensor(Port.A), SwitchDistanceSensor(Port.C))
+    post = SwitchDistanceSensor(Port.D, init_timeout_ms=200, post_sensor_init_timeout_ms=300)
+    smart.add_post_sensor(post, (switch.SwitchPosition.STRAIGHT,))
+    controller.register_sensor(smart, motor(Port.B))
+    events = record(controller, smart)
+    pupdevices.READINGS[Port.D] = list(TRAIN)
+    run(controller, len(TRAIN))
+    # the post-sensor is blocked from tick 2 until its timeouts (200ms + 300ms)
+    # ran out after tick 4, the SmartSensor sees both changes one tick later
+    assert events == [(3, SensorEvent.POST_BLOCKED), (15, SensorEvent.POST_FREED)]
+    # every change moves the switch to a free path
+    assert len(pupdevices.MOVES) == 2
+
+
+def test_queue_has_room_for_every_sensor_of_a_tick():
+    ports = (Port.A, Port.B, Port.C, Port.D)
+    connect(*ports)
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=1)
+    sensors = []
+    for port in ports:
+        sensor = SwitchDistanceSensor(port, switch_mode=switch.SwitchMode.RISING_EDGE, init_timeout_ms=200)
+        controller.register_sensor(sensor, motor(Port.E))
+        sensors.append(sensor)
+        pupdevices.READINGS[port] = list(TRAIN)
+    assert len(controller.events.sources) == len(ports)
+    events = []
+    for sensor in sensors:
+        events.append(record(controller, sensor))
+    run(controller, len(TRAIN))
+    # all sensors fire in the same tick
+    assert events == [[(2, SensorEvent.ARRIVED)]] * len(ports)
+    assert controller.events.size == 0
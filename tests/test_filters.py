@@ -0,0 +1,98 @@
+import random
+
+from pybricks import pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+
+DT = 50
+
+
+def sensor(**kwargs):
+    pupdevices.IDS[Port.A] = 37 # a ColorDistanceSensor
+    return SwitchDistanceSensor(Port.A, 30, **kwargs)
+
+
+def run(sensor, readings):
+    # returns the filtered distances and the ticks in which the sensor fires
+    pupdevices.READINGS[Port.A] = list(readings)
+    distances = []
+    fired = []
+    for tick in range(len(readings)):
+        sensor.tick(DT)
+        distances.append(sensor.distance)
+        if sensor.check():
+            fired.append(tick)
+    return distances, fired
+
+
+def segment(trace, value, length):
+    # equal readings with single wrong readings (not at the ends of the segment)
+    readings = [value] * length
+    i = 2
+    while i < length - 2:
+        if trace.random() < 0.1:
+            readings[i] = 110 - value
+            i += 2
+        i += 1
+    return readings
+
+
+def noisy_trains(seed, trains=5):
+    """
+    Trains of 3-6 wagons with gaps of up to 4 ticks between them, and single
+    wrong readings (far while a wagon passes, near on the empty track).
+    """
+    trace = random.Random(seed)
+    readings = []
+    for _ in range(trains):
+        readings += segment(trace, 100, 60)
+        for _ in range(trace.randint(3, 6)):
+            readings += segment(trace, 10, trace.randint(6, 10)) + [100] * trace.randint(1, 4)
+    return readings + segment(trace, 100, 60)
+
+
+def test_median_is_the_median_of_the_window():
+    trace = random.Random(1)
+    readings = [trace.randint(0, 200) for _ in range(200)]
+    distances, _ = run(sensor(median_window=5), readings)
+    window = [readings[0]] * 5
+    for reading, distance in zip(readings, distances):
+        window = window[1:] + [reading]
+        assert distance == sorted(window)[2]
+
+
+def test_median_removes_single_wrong_readings():
+    readings = ([100] * 20 + [10]) * 5 + [100] * 20
+    assert len(run(sensor(init_timeout_ms=200), readings)[1]) == 5
+    assert run(sensor(init_timeout_ms=200, median_window=3), readings)[1] == []
+
+
+def test_ema_smooths_a_spike():
+    distances, fired = run(sensor(ema_shift=2, init_timeout_ms=200), [100] * 10 + [10] + [100] * 10)
+    # 100 - (100 - 10) / 4
+    assert min(distances) == 77
+    assert fired == []
+    # a train is still detected after a few readings
+    distances, fired = run(sensor(ema_shift=1, init_timeout_ms=200), [100] * 10 + [10] * 5 + [100] * 20)
+    assert distances[10:13] == [55, 32, 21]
+    # the average leaves the train in tick 15, the timeout of 200ms runs out in tick 18
+    assert fired == [18]
+
+
+def test_hysteresis_keeps_a_train_near_the_critical_distance():
+    readings = [100] * 10 + [28, 35] * 10 + [100] * 20
+    # without hysteresis, every reading of 35 is a gap
+    assert len(run(sensor(init_timeout_ms=DT), readings)[1]) == 10
+    assert run(sensor(init_timeout_ms=DT, leave_distance=45), readings)[1] == [30]
+
+
+def test_filtered_noisy_trains_fire_once_with_a_short_timeout():
+    for seed in range(20):
+        readings = noisy_trains(seed)
+        # the raw readings split the trains and count wrong readings as trains
+        assert len(run(sensor(init_timeout_ms=400), readings)[1]) > 5
+        # the filtered readings count every train once with the short timeout
+        filtered = sensor(init_timeout_ms=400, median_window=3, ema_shift=1, leave_distance=45)
+        assert len(run(filtered, readings)[1]) == 5
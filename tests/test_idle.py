@@ -0,0 +1,72 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port, Stop
+
+import switch
+from switch_distance import SwitchDistanceSensor
+
+DT = 50
+IDLE_DT = 500
+
+
+def setup(idle_timeout_ms=1000, **kwargs):
+    pupdevices.IDS[Port.A] = 37 # a ColorDistanceSensor
+    hub = hubs.ThisHub()
+    controller = switch.SwitchController(hub, idle_timeout_ms=idle_timeout_ms, idle_dt=IDLE_DT, seed=1)
+    sensor = SwitchDistanceSensor(Port.A, init_timeout_ms=200, **kwargs)
+    motor = switch.SwitchMotor(Port.B, probability_straight_to_curved=1, probability_curved_to_straight=1,
+                               turn_degrees=90, stop_mode=Stop.HOLD)
+    controller.register_sensor(sensor, motor)
+    # records the calls of the (simulated) motor
+    calls = []
+    motor.motor.stop = lambda: calls.append('stop')
+    motor.motor.hold = lambda: calls.append('hold')
+    return hub, controller, calls
+
+
+def run(controller, readings):
+    # ticks with dt while active and with idle_dt while idle, like run()
+    pupdevices.READINGS[Port.A] = list(readings)
+    idle = []
+    for _ in range(len(readings)):
+        controller.tick(IDLE_DT if controller.idle else DT)
+        idle.append(controller.idle)
+    return idle
+
+
+def test_quiet_layout_becomes_idle_and_wakes_up_for_a_train():
+    hub, controller, calls = setup()
+    # idle after 1s without a train, i.e. in the 20th tick
+    assert run(controller, [100] * 22) == [False] * 19 + [True] * 3
+    assert calls == ['stop']
+    assert hub.display.icons[-1] is None
+    # the matrix is not refreshed while idle
+    icons = len(hub.display.icons)
+    run(controller, [100] * 5)
+    assert len(hub.display.icons) == icons
+    # a reading close to the critical distance (30) ends the idle mode in the same tick
+    assert run(controller, [35, 10, 10]) == [False] * 3
+    assert calls == ['stop', 'hold']
+    assert hub.display.icons[-1] is not None
+    assert controller.quiet == 0
+
+
+def test_quiet_time_restarts_with_every_train():
+    _, controller, calls = setup()
+    # the train keeps the controller active, the quiet time counts after the timeout
+    assert not any(run(controller, ([100] * 15 + [10]) * 4))
+    assert run(controller, [100] * 24)[-1]
+    assert calls == ['stop']
+
+
+def test_every_sensor_is_read_in_an_idle_tick():
+    _, controller, _ = setup(max_sample_interval=8)
+    run(controller, [100] * 25)
+    assert controller.idle
+    # the train is read in the first idle tick it is in front of the sensor
+    assert run(controller, [100, 10]) == [True, False]
+
+
+def test_idle_mode_is_off_by_default():
+    _, controller, calls = setup(idle_timeout_ms=0)
+    assert not any(run(controller, [100] * 200))
+    assert calls == []
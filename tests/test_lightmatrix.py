@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from bench_lightmatrix import Sensor, integer_bar, load_light_matrix, reference_bar
+
+LightMatrix = load_light_matrix()
+
+
+@pytest.mark.parametrize('width', range(1, 6))
+@pytest.mark.parametrize('height', range(1, 6))
+def test_bars_match_float_reference(width, height):
+    # the integer bars are pixel-identical to the former float algorithm
+    light_matrix = LightMatrix(None, width=width, height=height, cache_size=1)
+    light_matrix.register([Sensor(1)])
+    total_pixel = len(light_matrix.bars[0])
+    for init_timeout in range(1, 101):
+        for timeout in range(-1, init_timeout + 1):
+            assert integer_bar(light_matrix, timeout, init_timeout) == reference_bar(total_pixel, timeout, init_timeout)
+
+
+def test_levels_clamp_negative_timeouts():
+    light_matrix = LightMatrix(None, cache_size=1)
+    light_matrix.register([Sensor(20), Sensor(20)])
+    assert light_matrix._levels([-5, 20], [20, 20]) == (0, light_matrix.scales[1])
+
+
+class Display:
+    def __init__(self):
+        self.icons = []
+
+    def icon(self, matrix):
+        self.icons.append(matrix)
+
+
+class Hub:
+    def __init__(self):
+        self.display = Display()
+
+
+@pytest.mark.parametrize('dim_steps', [1, 2, 4])
+def test_bars_dim_in_steps(dim_steps):
+    light_matrix = LightMatrix(None, dim_steps=dim_steps, cache_size=1)
+    light_matrix.register([Sensor(1000)])
+    for timeout in range(0, 1001):
+        bar = integer_bar(light_matrix, timeout, 1000)
+        assert all(brightness * dim_steps % 100 == 0 for brightness in bar)
+        assert sum(bar) * dim_steps // 100 == light_matrix._levels([timeout], [1000])[0]
+
+
+@pytest.mark.parametrize('sensors', [1, 2, 3, 6])
+def test_jittered_countdowns_hit_the_prebuilt_frames(sensors):
+    # with whole pixels, a countdown with jittered ticks only shows prebuilt frames
+    hub = Hub()
+    light_matrix = LightMatrix(hub, dim_steps=1)
+    init_timeouts = [1000] * sensors
+    light_matrix.register([Sensor(t) for t in init_timeouts])
+    prebuilt = set(light_matrix.frames)
+    assert len(prebuilt) == sum(light_matrix.scales) + 1
+    jitter = random.Random(sensors)
+    for index in range(sensors):
+        timeouts = [0] * sensors
+        timeout = init_timeouts[index]
+        while timeout > -50:
+            timeouts[index] = timeout
+            light_matrix.update(timeouts, init_timeouts)
+            timeout -= jitter.randint(40, 60)
+    assert set(light_matrix.frames) == prebuilt
+    # the matrix is only written when the quantized level changes
+    assert len(hub.display.icons) <= sum(scale + 1 for scale in light_matrix.scales)
+
+
+def test_prebuilt_frames_are_bounded_by_the_cache():
+    light_matrix = LightMatrix(None, dim_steps=4, cache_size=10)
+    light_matrix.register([Sensor(1000)])
+    assert len(light_matrix.frames) == 10
+    # the idle matrix and the full bar are built first
+    assert ((0,), ((),)) in light_matrix.frames
+    assert ((light_matrix.scales[0],), ((),)) in light_matrix.frames
+
+
+def test_cache_drops_the_least_recently_used_frame():
+    light_matrix = LightMatrix(Hub(), cache_size=4)
+    light_matrix.register([Sensor(1000)])
+    trace = random.Random(2)
+    for _ in range(500):
+        light_matrix.update([trace.randint(1, 1000)], [1000])
+        assert len(light_matrix.frames) <= 4
+    full = ((light_matrix.scales[0],), ((),))
+    keys = [((level,), ((),)) for level in (10, 20, 30)]
+    for key in [full] + keys:
+        light_matrix._frame(key)
+    light_matrix._frame(full) # used again, so keys[0] is the oldest
+    light_matrix._frame(((40,), ((),)))
+    assert set(light_matrix.frames) == {full, keys[1], keys[2], ((40,), ((),))}
@@ -0,0 +1,90 @@
+import pytest
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+from switch_ir import SwitchIRSensor
+
+
+@pytest.fixture(autouse=True)
+def forget_devices():
+    # the device ids are module state of switch.py
+    switch._devices.clear()
+    switch._devices_changed = False
+
+
+def test_scan_is_stored_with_magic_and_version():
+    pupdevices.IDS[Port.A] = 37
+    pupdevices.IDS[Port.C] = 35
+    hub = hubs.ThisHub(display=False)
+    assert switch.scan_ports(hub)[Port.C] == 35
+    assert hub.system.data[:8] == bytes([switch._STORAGE_MAGIC, switch._STORAGE_VERSION, 37, 0, 35, 0, 0, 0])
+    switch._devices.clear()
+    assert switch.load_ports(hub)
+    assert switch._devices[Port.A] == 37 and switch._devices[Port.C] == 35
+
+
+def test_scan_of_another_version_is_not_loaded():
+    hub = hubs.ThisHub(display=False)
+    # the format without version byte: magic + one byte per port
+    hub.system.storage(0, write=bytes([switch._STORAGE_MAGIC, 37, 0, 0, 0, 0, 0]))
+    assert not switch.load_ports(hub)
+    assert switch._devices == {}
+
+
+def test_controller_keeps_the_scan_at_the_storage_offset():
+    pupdevices.IDS[Port.A] = 37
+    hub = hubs.ThisHub(display=False)
+    hub.system.storage(0, write=b'user data')
+    switch.SwitchController(hub, storage_offset=16)
+    assert hub.system.storage(0, read=9) == b'user data'
+    switch._devices.clear()
+    assert not switch.load_ports(hub)
+    assert switch.load_ports(hub, 16)
+    assert switch._devices[Port.A] == 37
+
+
+def test_stale_cached_id_queries_the_port_again():
+    hub = hubs.ThisHub(display=False)
+    pupdevices.IDS[Port.A] = 37
+    switch.scan_ports(hub)
+    # an IR sensor has been connected instead of the distance sensor
+    pupdevices.IDS[Port.A] = 35
+    switch._devices.clear()
+    assert switch.load_ports(hub)
+    sensor = switch.SwitchSensor(Port.A)
+    assert type(sensor) is SwitchIRSensor
+    assert switch._devices[Port.A] == 35 and switch._devices_changed
+    switch.save_ports(hub)
+    assert hub.system.data[2] == 35
+    assert not switch._devices_changed
+
+
+def test_factory_creates_ir_sensors_from_the_scan_and_the_query():
+    pupdevices.IDS[Port.B] = 35
+    # queried, no scan yet
+    sensor = switch.SwitchSensor(Port.B, init_timeout_ms=700)
+    assert type(sensor) is SwitchIRSensor
+    assert (sensor.critical_distance, sensor.init_timeout) == (60, 700)
+    # from the scan
+    switch.scan_ports()
+    sensor = switch.SwitchSensor(Port.B, 40)
+    assert type(sensor) is SwitchIRSensor
+    assert sensor.critical_distance == 40
+
+
+def test_factory_uses_the_cached_id_without_query(monkeypatch):
+    pupdevices.IDS[Port.A] = 37
+    switch.scan_ports()
+
+    def query(port):
+        raise AssertionError("port %s queried again" % port)
+    monkeypatch.setattr(switch, '_query_device', query)
+    assert type(switch.SwitchSensor(Port.A)) is SwitchDistanceSensor
+
+
+def test_unknown_device_is_rejected():
+    pupdevices.IDS[Port.A] = 49 # a motor
+    with pytest.raises(ValueError):
+        switch.SwitchSensor(Port.A)
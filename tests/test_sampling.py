@@ -0,0 +1,77 @@
+from switch_sensor import _RISING_EDGE, SwitchSensor_
+from switch_smart import SmartSensor
+
+DT = 50
+
+
+class Trace:
+    # a sensor which reads the distance of the current tick and counts the reads
+    def __init__(self, distances):
+        self.distances = distances
+        self.tick = 0
+        self.reads = 0
+
+    def distance(self):
+        self.reads += 1
+        return self.distances[self.tick]
+
+
+def sampled(max_sample_interval, distances, **kwargs):
+    sensor = SwitchSensor_(50, switch_mode=_RISING_EDGE, init_timeout_ms=200,
+                           max_sample_interval=max_sample_interval, **kwargs)
+    sensor.sensor = Trace(distances)
+    return sensor
+
+
+def fired(sensor, ticks):
+    fired = []
+    for tick in range(ticks):
+        sensor.sensor.tick = tick
+        sensor.tick(DT)
+        if sensor.check():
+            fired.append(tick)
+    return fired
+
+
+def test_quiet_track_is_read_less_often():
+    sensor = sampled(8, [100] * 100)
+    fired(sensor, 100)
+    assert sensor.sample_interval == 8
+    # 1 + 2 + 4 ticks until the interval is 8
+    assert sensor.sensor.reads <= 3 + 100 // 8 + 1
+    # without adaptive sampling, every tick reads the sensor
+    sensor = sampled(1, [100] * 100)
+    fired(sensor, 100)
+    assert sensor.sensor.reads == 100
+
+
+def test_sudden_train_is_detected_within_the_max_sample_interval():
+    for max_sample_interval in (2, 4, 8):
+        for arrival in range(20, 40):
+            sensor = sampled(max_sample_interval, [100] * arrival + [10] * 10 + [100] * 30)
+            detected = fired(sensor, arrival + 40)[0]
+            assert arrival <= detected <= arrival + max_sample_interval - 1
+
+
+def test_approaching_train_is_detected_without_delay():
+    for quiet in range(40, 48):
+        # the distance decreases by 7 per tick before the train is in front of the sensor
+        approach = [100] * quiet + list(range(100, 50, -7)) + [10] * 5 + [100] * 30
+        sensor = sampled(8, approach)
+        assert fired(sensor, len(approach))[0] == quiet + 8
+
+
+def test_neighbour_of_a_smart_sensor_is_woken():
+    first = sampled(8, [100] * 40 + [10] * 20)
+    second = sampled(8, [100] * 60)
+    smart = SmartSensor(first, second)
+    for tick in range(60):
+        for sensor in (first, second):
+            sensor.sensor.tick = tick
+            sensor.tick(DT)
+        smart.tick(DT)
+        if first.timeout > 0:
+            break
+    assert 40 <= tick < 48
+    # the second sensor is read in the next tick
+    assert second.sample_interval == 1 and second.countdown <= 1
@@ -0,0 +1,94 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+from switch_schedule import DecisionSchedule
+
+STRAIGHT, CURVED = switch.SwitchPosition.STRAIGHT, switch.SwitchPosition.CURVED
+
+
+def tree():
+    # B with C behind its curved and D behind its straight track
+    root = switch.SwitchMotor(Port.B, probability_straight_to_curved=0.4, probability_curved_to_straight=0.7, turn_degrees=90)
+    root.register_successor(switch.SwitchMotor(Port.C, probability_straight_to_curved=0.8,
+                                               probability_curved_to_straight=0.3, turn_degrees=60), CURVED)
+    root.register_successor(switch.SwitchMotor(Port.D, probability_straight_to_curved=0.5,
+                                               probability_curved_to_straight=0.5, turn_degrees=60), STRAIGHT)
+    return root
+
+
+def moves(decide, count):
+    # the moves of count decisions
+    pupdevices.MOVES.clear()
+    for _ in range(count):
+        decide()
+    return list(pupdevices.MOVES)
+
+
+def test_schedule_decides_like_move_random():
+    plain = tree()
+    plain.set_rng(switch.XorShift(5))
+    expected = moves(plain.move_random, 300)
+    root = tree()
+    schedule = DecisionSchedule(root, switch.XorShift(5), 8)
+    schedule.fill()
+    filled = []
+    def apply():
+        schedule.apply()
+        # computes a varying number of entries between the trains
+        schedule.fill(len(pupdevices.MOVES) % 3)
+        filled.append(schedule.size)
+    assert moves(apply, 300) == expected
+    assert 0 in filled and max(filled) > 1
+    assert root.current_path() == plain.current_path()
+
+
+def test_empty_schedule_decides_when_applied():
+    plain = tree()
+    plain.set_rng(switch.XorShift(9))
+    expected = moves(plain.move_random, 100)
+    schedule = DecisionSchedule(tree(), switch.XorShift(9), 4)
+    def apply():
+        assert schedule.size == 0
+        schedule.apply()
+    assert moves(apply, 100) == expected
+
+
+def test_motor_moved_by_another_tree_is_decided_from_its_position():
+    """
+    C is a successor of B and the root of the tree of another sensor, so it
+    is moved behind the back of the schedule of B.
+    """
+    rng = switch.XorShift(3)
+    plain = tree()
+    plain.set_rng(rng)
+    root = tree()
+    schedule = DecisionSchedule(root, switch.XorShift(3), 8)
+    shared, plain_shared = root.successors[CURVED], plain.successors[CURVED]
+    for step in range(60):
+        schedule.fill()
+        if step % 3 == 0:
+            shared.move()
+            plain_shared.move()
+        assert moves(schedule.apply, 1) == moves(plain.move_random, 1)
+        assert root.current_path() == plain.current_path()
+
+
+def test_controller_with_a_shared_motor():
+    # the first sensor moves B (and C behind it), the second sensor moves C
+    pupdevices.IDS[Port.A] = pupdevices.IDS[Port.E] = 37 # ColorDistanceSensors
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=3, schedule=8)
+    first, second = SwitchDistanceSensor(Port.A), SwitchDistanceSensor(Port.E)
+    root = tree()
+    shared = root.successors[CURVED]
+    controller.register_sensor(first, root)
+    controller.register_sensor(second, shared)
+    assert set(controller.schedules) == {root, shared}
+    for step in range(100):
+        controller._fill_schedules(controller.watch.time() + 1000)
+        sensor, motor = (second, shared) if step % 3 else (first, root)
+        controller._on_event(sensor, switch.SensorEvent.CLEARED)
+        # the schedule of the moved tree knows the positions of its motors
+        schedule = controller.schedules[motor]
+        assert schedule.applied == schedule._current()
@@ -0,0 +1,81 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+
+DT = 50
+# a train in front of the sensor in the ticks 5 to 10
+TRAIN = [100] * 5 + [10] * 6 + [100] * 20
+
+
+def connect(*ports):
+    for port in ports:
+        pupdevices.IDS[port] = 37 # a ColorDistanceSensor
+
+
+def fired(sensor, readings):
+    # the ticks in which the sensor fires
+    pupdevices.READINGS[sensor.port] = list(readings)
+    ticks = []
+    for tick in range(len(readings)):
+        sensor.tick(DT)
+        if sensor.check():
+            ticks.append(tick)
+    return ticks
+
+
+def rising(**kwargs):
+    connect(Port.A)
+    return SwitchDistanceSensor(Port.A, switch_mode=switch.SwitchMode.RISING_EDGE, init_timeout_ms=200, **kwargs)
+
+
+def test_without_approach_the_train_fires_when_detected():
+    sensor = rising()
+    sensor.set_move_time(5000) # not looked at without approach_ms
+    assert fired(sensor, TRAIN) == [5]
+
+
+def test_unknown_move_time_defers_to_the_passed_train():
+    sensor = rising(approach_ms=1000)
+    # the last detection is in tick 10, then the timeout of 200 ms runs out
+    assert fired(sensor, TRAIN) == [14]
+    assert not sensor.deferred
+
+
+def test_move_in_time_fires_when_detected():
+    sensor = rising(approach_ms=500)
+    sensor.set_move_time(300) # 300 + 200 ms margin <= 500
+    assert fired(sensor, TRAIN) == [5]
+    sensor = rising(approach_ms=499)
+    sensor.set_move_time(300)
+    assert fired(sensor, TRAIN) == [14]
+
+
+def test_deferred_train_fires_exactly_once():
+    sensor = rising(approach_ms=1000)
+    # the train is detected again during the timeout, but only fires once
+    readings = [100] * 5 + [10] * 3 + [100] * 2 + [10] * 3 + [100] * 20
+    assert fired(sensor, readings) == [16]
+    assert not sensor.deferred
+    # the next train is deferred again
+    assert fired(sensor, TRAIN) == [14]
+
+
+def test_controller_measures_the_move_time_for_the_next_train():
+    connect(Port.A)
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=1)
+    sensor = SwitchDistanceSensor(Port.A, switch_mode=switch.SwitchMode.RISING_EDGE, init_timeout_ms=200, approach_ms=600)
+    motor = switch.SwitchMotor(Port.B, probability_straight_to_curved=1, probability_curved_to_straight=1, turn_degrees=90)
+    controller.register_sensor(sensor, motor)
+    assert sensor.move_time is None
+    pupdevices.READINGS[Port.A] = TRAIN * 2
+    moved = []
+    for tick in range(2 * len(TRAIN)):
+        moves = len(pupdevices.MOVES)
+        controller.tick(DT)
+        if len(pupdevices.MOVES) > moves:
+            moved.append(tick)
+    # the first train is deferred, the second one moves the switch when detected
+    assert moved == [14, len(TRAIN) + 5]
+    assert sensor.move_time == pupdevices.MOVE_TIME
@@ -0,0 +1,34 @@
+import random
+
+from switch_sensor import _DELAY_SLOTS, SwitchSensor_
+
+DT = 10
+DELAY = 100
+
+
+def delayed(signal):
+    sensor = SwitchSensor_(50, post_sensor_delay_ms=DELAY)
+    states = []
+    for blocked in signal:
+        sensor.blocked = sensor._delay_state(blocked, DT)
+        states.append(sensor.blocked)
+    return sensor, states
+
+
+def test_delay_shifts_the_signal():
+    trace = random.Random(1)
+    signal = []
+    while len(signal) < 1000:
+        # at most DELAY // 30 + 1 < _DELAY_SLOTS changes are pending
+        signal += [trace.random() < 0.5] * trace.randint(3, 20)
+    sensor, states = delayed(signal)
+    shift = DELAY // DT
+    assert states[shift:] == signal[:len(signal) - shift]
+
+
+def test_full_ring_drops_the_latest_pulse():
+    signal = [i % 2 == 0 for i in range(4 * _DELAY_SLOTS)] + [False] * (2 * DELAY // DT)
+    sensor, states = delayed(signal)
+    assert sensor.delay_size == 0
+    assert states[-1] is False
+    assert len(sensor.delay) == _DELAY_SLOTS
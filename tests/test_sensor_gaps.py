@@ -0,0 +1,26 @@
+from switch_sensor import SwitchSensor_
+
+
+def learn(sensor, gaps):
+    for gap in gaps:
+        sensor.gap = gap
+        sensor._learn_gap()
+
+
+def test_gaps_are_learned_within_the_bounds():
+    sensor = SwitchSensor_(50, init_timeout_ms=2000, learn_gaps=True)
+    learn(sensor, [100] * 3)
+    assert sensor.init_timeout == 2000
+    learn(sensor, [100])
+    assert sensor.init_timeout == 200 # 100 + 50 + one tick
+
+
+def test_new_init_timeout_forgets_the_old_gaps():
+    sensor = SwitchSensor_(50, init_timeout_ms=2000, learn_gaps=True)
+    learn(sensor, [800] * 20)
+    assert sensor.init_timeout == 1250
+    sensor.set_init_timeout_ms(1000)
+    assert sensor.gaps == [0] * len(sensor.gaps)
+    assert sensor.gap_index == 0
+    learn(sensor, [100] * 4)
+    assert sensor.init_timeout == 200
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+from switch_sensor import _RISING_EDGE, SwitchSensor_
+from switch_smart import _CLEAR_MARGIN_MS, SmartSensor
+
+
+def test_timeout_follows_the_pre_sensors():
+    trace = random.Random(3)
+    pre_sensors = [SwitchSensor_(50, init_timeout_ms=t) for t in (300, 500, 500)]
+    pre_sensors[2].set_switch_mode(_RISING_EDGE)
+    smart = SmartSensor(*pre_sensors)
+    for _ in range(2000):
+        sensor = trace.choice(pre_sensors)
+        action = trace.random()
+        if action < 0.1:
+            sensor.reset()
+        elif action < 0.15:
+            sensor.reset2wait()
+        else:
+            sensor.decrement(trace.choice((20, 50, 70)))
+            sensor._update_present()
+        assert smart.timeout == max(s.timeout for s in pre_sensors)
+        assert smart.blocked_count == sum(s.timeout > 0 for s in pre_sensors)
+
+
+def test_init_timeout_follows_the_learned_gaps():
+    first = SwitchSensor_(50, init_timeout_ms=2000, learn_gaps=True)
+    second = SwitchSensor_(50, init_timeout_ms=400)
+    smart = SmartSensor(first, second)
+    assert smart.init_timeout == 2000
+    for _ in range(4):
+        first.gap = 100
+        first._learn_gap()
+    assert smart.init_timeout == 400
+    smart.set_init_timeout_ms(600)
+    assert smart.init_timeout == 600
+
+
+DT = 50
+SPACING = 300
+CLEARANCE = 100
+INIT_TIMEOUT = 1000
+
+
+def passing(position, length, speed, start, ticks):
+    # the readings of a sensor at position (in mm) while a train passes, whose
+    # front is at the first sensor at start ms (the ticks are every DT ms)
+    readings = []
+    for tick in range(ticks):
+        front = speed * (tick * DT - start) / 1000
+        readings.append(10 if front >= position and front - length < position else 100)
+    return readings
+
+
+def run_train(length, speed, start, second=True, ticks=300):
+    """
+    Lets a train pass both pre-sensors of a SmartSensor with speed
+    estimation and returns the SmartSensor and the time of the move.
+    """
+    pupdevices.reset()
+    for port in (Port.A, Port.C):
+        pupdevices.IDS[port] = 37 # a ColorDistanceSensor
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=1)
+    first = SwitchDistanceSensor(Port.A, init_timeout_ms=INIT_TIMEOUT)
+    second_sensor = SwitchDistanceSensor(Port.C, init_timeout_ms=INIT_TIMEOUT)
+    smart = SmartSensor(first, second_sensor, sensor_spacing_mm=SPACING, clearance_mm=CLEARANCE)
+    motor = switch.SwitchMotor(Port.B, probability_straight_to_curved=1, probability_curved_to_straight=1, turn_degrees=90)
+    controller.register_sensor(smart, motor)
+    pupdevices.READINGS[Port.A] = passing(0, length, speed, start, ticks)
+    if second:
+        pupdevices.READINGS[Port.C] = passing(SPACING, length, speed, start, ticks)
+    for tick in range(ticks):
+        controller.tick(DT)
+        if pupdevices.MOVES:
+            return smart, tick * DT
+    return smart, None
+
+
+@pytest.mark.parametrize('speed', [200, 300, 500])
+@pytest.mark.parametrize('length', [300, 570, 900])
+def test_speed_and_length_of_the_train(speed, length):
+    for start in range(0, DT, 10):
+        smart, _ = run_train(length, speed, start)
+        assert abs(smart.speed - speed) <= 0.2 * speed
+        assert abs(smart.length - length) <= 0.15 * length
+
+
+@pytest.mark.parametrize('speed', [150, 300, 500, 800, 1200, 2000])
+def test_estimate_never_moves_before_the_end_has_passed(speed):
+    # the front of the train meets the ticks at every phase, also exactly
+    for start in range(DT):
+        for length in (300, 570):
+            _, moved = run_train(length, speed, start)
+            clear = start + (SPACING + CLEARANCE + length) * 1000 / speed
+            assert moved - clear >= _CLEAR_MARGIN_MS
+            # but sooner than the timeout after the last detection
+            last = start + (SPACING + length) * 1000 / speed
+            assert moved < last + INIT_TIMEOUT
+
+
+def test_train_which_does_not_reach_the_second_sensor_waits_for_the_timeouts():
+    smart, moved = run_train(570, 300, 0, second=False)
+    # the train leaves the first sensor at 1900 ms, the last detection is the
+    # tick at 1850 ms
+    assert moved == 1850 + INIT_TIMEOUT
+    assert smart.front1 is None
@@ -0,0 +1,30 @@
+from pybricks.parameters import Port
+
+import switch
+
+
+def tree():
+    root = switch.SwitchMotor(Port.B, probability_straight_to_curved=0.3, turn_degrees=90)
+    successor = switch.SwitchMotor(Port.C, probability_straight_to_curved=0.8, turn_degrees=60)
+    root.register_successor(successor, switch.SwitchPosition.CURVED)
+    return root
+
+
+def test_path_thresholds_are_cumulative_integers():
+    root = tree()
+    thresholds = root._get_path_probabilities(root.all_paths)
+    assert all(isinstance(t, int) for t in thresholds)
+    assert thresholds == sorted(thresholds)
+    assert thresholds[-1] == switch._ONE
+
+
+def test_random_paths_follow_the_thresholds():
+    # a full period of the XorShift draws every number below _ONE once
+    root = tree()
+    root.set_rng(switch.XorShift(7))
+    paths = root.all_paths
+    thresholds = root._get_path_probabilities(paths)
+    counts = dict.fromkeys(paths, 0)
+    for _ in range(switch._ONE):
+        counts[root._get_random_path(paths, thresholds)] += 1
+    assert [counts[path] for path in paths] == [b - a for a, b in zip([0] + thresholds, thresholds)]
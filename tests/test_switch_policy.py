@@ -0,0 +1,61 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+from switch_policy import RoundRobinPolicy, RoutingPolicy
+
+STRAIGHT, CURVED = switch.SwitchPosition.STRAIGHT, switch.SwitchPosition.CURVED
+
+
+def tree(rng=None):
+    root = switch.SwitchMotor(Port.B, turn_degrees=90)
+    root.register_successor(switch.SwitchMotor(Port.C, turn_degrees=60), CURVED)
+    if rng is not None:
+        root.set_rng(rng)
+    return root
+
+
+def test_routing_policy_makes_the_random_decisions():
+    plain, policy = tree(switch.XorShift(5)), tree(switch.XorShift(5))
+    policy.set_policy(RoutingPolicy())
+    for _ in range(500):
+        plain.move_random()
+        policy.move_random()
+        assert policy.current_path() == plain.current_path()
+
+
+def test_policy_set_after_the_schedule_decides():
+    pupdevices.IDS[Port.A] = 37 # a ColorDistanceSensor
+    controller = switch.SwitchController(hubs.ThisHub(display=False), seed=3, schedule=8)
+    sensor = SwitchDistanceSensor(Port.A)
+    root = tree()
+    controller.register_sensor(sensor, root)
+    controller._fill_schedules(controller.watch.time() + 1000)
+    root.set_policy(RoundRobinPolicy())
+    paths = []
+    for _ in range(2 * len(root.all_paths)):
+        controller._on_event(sensor, switch.SensorEvent.CLEARED)
+        paths.append(root.current_path())
+    assert paths == root.all_paths * 2
+
+
+def test_blocked_post_sensor_blocks_the_paths_behind_it():
+    # (CURVED,) is the path of a post-sensor behind the first motor
+    for policy in (None, RoundRobinPolicy()):
+        root = tree(switch.XorShift(9))
+        root.set_policy(policy)
+        root.move_path((CURVED, CURVED))
+        root.move_smart(False, [(CURVED,)])
+        assert root.current_path() == (STRAIGHT,)
+        for _ in range(20):
+            root.move_smart(True, [(CURVED,)])
+            assert root.current_path() == (STRAIGHT,)
+
+
+def test_policy_and_motor_block_the_same_paths():
+    root = tree()
+    policy = RoundRobinPolicy()
+    root.set_policy(policy)
+    for blocked_paths in ([], [(STRAIGHT,)], [(CURVED,)], [(CURVED, STRAIGHT)], [(STRAIGHT,), (CURVED, CURVED)]):
+        assert policy.blocked(blocked_paths) == root.blocked_mask(blocked_paths)
@@ -0,0 +1,70 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Button, Color, Port
+from pybricks.tools import wait
+
+import switch
+from switch_distance import SwitchDistanceSensor
+
+DT = 50
+
+
+class Buttons:
+    # presses the center button after the given number of ticks
+    def __init__(self, ticks):
+        self.ticks = ticks
+
+    def pressed(self):
+        self.ticks -= 1
+        return {Button.CENTER} if self.ticks < 0 else set()
+
+
+def setup(ticks, readings, read_ms=0):
+    pupdevices.IDS[Port.A] = 37 # a ColorDistanceSensor
+    pupdevices.READINGS[Port.A] = list(readings)
+    hub = hubs.ThisHub(display=False)
+    hub.buttons = Buttons(ticks)
+    controller = switch.SwitchController(hub, dt=DT, seed=1)
+    sensor = SwitchDistanceSensor(Port.A, init_timeout_ms=200)
+    motor = switch.SwitchMotor(Port.B, probability_straight_to_curved=1, probability_curved_to_straight=1, turn_degrees=90)
+    controller.register_sensor(sensor, motor)
+    if read_ms:
+        # every reading of the sensor takes read_ms
+        read = sensor.sensor.distance
+        def slow():
+            wait(read_ms)
+            return read()
+        sensor.sensor.distance = slow
+    return hub, controller, sensor, motor
+
+
+def test_quiet_ticks_have_the_whole_dt_as_slack():
+    _, controller, _, _ = setup(20, [])
+    controller.run()
+    assert controller.telemetry() == (20, 0, DT, 0, None)
+
+
+def test_move_of_a_motor_is_an_overrun_but_not_too_slow():
+    hub, controller, _, motor = setup(30, [100] * 2 + [10] * 3 + [100] * 30)
+    controller.run()
+    ticks, overruns, min_slack, worst_overrun, worst_cause = controller.telemetry()
+    # the move takes pupdevices.MOVE_TIME in one tick
+    assert (ticks, overruns) == (30, 1)
+    assert min_slack == -worst_overrun == DT - pupdevices.MOVE_TIME
+    assert worst_cause is motor
+    assert Color.MAGENTA not in hub.light.colors
+
+
+def test_slow_sensor_overruns_every_tick_and_shows_magenta(capsys):
+    hub, controller, sensor, _ = setup(10, [], read_ms=DT + 20)
+    controller.run()
+    assert controller.telemetry() == (10, 10, -20, 20, sensor)
+    assert Color.MAGENTA in hub.light.colors
+    assert "Ticks: 10, overruns: 10, min slack: -20 ms, worst overrun: 20 ms" in capsys.readouterr().out
+
+
+def test_reset_telemetry_starts_again():
+    _, controller, _, _ = setup(5, [], read_ms=DT + 20)
+    controller.run()
+    controller.reset_telemetry()
+    assert controller.telemetry() == (0, 0, None, 0, None)
+    assert not controller.too_slow
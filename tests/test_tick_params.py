@@ -0,0 +1,86 @@
+from pybricks import hubs, pupdevices
+from pybricks.parameters import Port
+
+import switch
+from switch_distance import SwitchDistanceSensor
+from switch_sensor import SwitchSensor_
+from switch_smart import SmartSensor
+
+# a train in front of the sensor in the ticks 5 to 10
+TRAIN = [100] * 5 + [10] * 6 + [100] * 60
+
+
+def controller_with(sensor, dt):
+    controller = switch.SwitchController(hubs.ThisHub(display=False), dt=dt, seed=1)
+    motor = switch.SwitchMotor(Port.B, probability_straight_to_curved=1, probability_curved_to_straight=1, turn_degrees=90)
+    controller.register_sensor(sensor, motor)
+    return controller
+
+
+def moved(controller, readings):
+    # the ticks in which the motor moves (every tick takes the dt of the controller)
+    pupdevices.READINGS[Port.A] = list(readings)
+    ticks = []
+    for tick in range(len(readings)):
+        moves = len(pupdevices.MOVES)
+        controller.tick()
+        if len(pupdevices.MOVES) > moves:
+            ticks.append(tick)
+    return ticks
+
+
+def test_ticks_are_50ms_until_the_sensor_is_registered():
+    sensor = SwitchSensor_(50, init_timeout=20, post_sensor_init_timeout=4, post_sensor_delay=2)
+    assert (sensor.init_timeout, sensor.post_sensor_init_timeout, sensor.post_sensor_delay) == (1000, 200, 100)
+
+
+def test_ticks_are_converted_with_the_dt_of_the_controller():
+    for dt in (50, 100):
+        pupdevices.reset()
+        pupdevices.IDS[Port.A] = 37 # a ColorDistanceSensor
+        sensor = SwitchDistanceSensor(Port.A, init_timeout=20)
+        controller = controller_with(sensor, dt)
+        assert sensor.init_timeout == 20 * dt
+        # the train leaves the sensor after tick 10 and the switch moves 20
+        # ticks later, i.e. after 1s with dt=50 and after 2s with dt=100
+        assert moved(controller, TRAIN) == [30]
+
+
+def test_ms_parameters_do_not_depend_on_dt():
+    pupdevices.IDS[Port.A] = 37
+    sensor = SwitchDistanceSensor(Port.A, init_timeout_ms=1000, post_sensor_init_timeout_ms=300)
+    controller_with(sensor, 100)
+    assert (sensor.init_timeout, sensor.post_sensor_init_timeout) == (1000, 300)
+
+
+def test_post_sensors_of_a_smart_sensor_are_converted():
+    first = SwitchSensor_(50, init_timeout=10)
+    second = SwitchSensor_(50, init_timeout=10)
+    post = SwitchSensor_(50, post_sensor_init_timeout=4, post_sensor_delay=2)
+    smart = SmartSensor(first, second)
+    smart.add_post_sensor(post, (switch.SwitchPosition.STRAIGHT,))
+    controller_with(smart, 100)
+    assert smart.init_timeout == 1000
+    assert (post.post_sensor_init_timeout, post.post_sensor_delay) == (400, 200)
+
+
+def test_set_init_timeout_follows_the_dt_and_ms_win():
+    sensor = SwitchSensor_(50)
+    sensor.set_init_timeout(10)
+    assert sensor.init_timeout == 500
+    sensor.set_tick_ms(100)
+    assert sensor.init_timeout == 1000
+    sensor.set_init_timeout(3)
+    assert sensor.init_timeout == 300
+    sensor.set_init_timeout_ms(700)
+    sensor.set_tick_ms(50)
+    assert sensor.init_timeout == 700
+
+
+def test_learned_maximum_follows_the_ticks():
+    sensor = SwitchSensor_(50, init_timeout=20, learn_gaps=True)
+    sensor.set_tick_ms(100)
+    assert (sensor.init_timeout, sensor.max_init_timeout) == (2000, 2000)
+    sensor = SwitchSensor_(50, init_timeout=20, learn_gaps=True, max_init_timeout_ms=3000)
+    sensor.set_tick_ms(100)
+    assert (sensor.init_timeout, sensor.max_init_timeout) == (2000, 3000)
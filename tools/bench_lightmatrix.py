@@ -0,0 +1,108 @@
+"""
+Host benchmark of the LightMatrix math.
+
+Measures the integer-only progress bar math of the LightMatrix in
+switch_display.py against the float math it replaced (reference implementation
+below): the levels computed every tick and a frame built on a cache miss.
+
+tests/test_lightmatrix.py checks with the reference below that both produce
+pixel-for-pixel identical bars for every bar size, init_timeout and timeout,
+with the default dim_steps=100 (1% steps) of the LightMatrix.
+The float reference is evaluated with exact fractions there. With floats, it
+is sometimes 1% darker on a dimmed pixel (e.g. 5 * 6 / 25 - 1 gives
+0.19999... instead of 0.2).
+
+The LightMatrix class is taken from switch_display.py as it is (the PyBricks
+modules are not available on the host, so the rest of the module is not
+executed).
+
+Usage: python tools/bench_lightmatrix.py
+"""
+import ast
+import os
+from fractions import Fraction
+from timeit import timeit
+
+SWITCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'switch_display.py')
+
+
+def load_light_matrix():
+    with open(SWITCH) as f:
+        tree = ast.parse(f.read())
+    classes = [node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == 'LightMatrix']
+    namespace = {'Matrix': list}
+    exec(compile(ast.Module(body=classes, type_ignores=[]), SWITCH, 'exec'), namespace)
+    return namespace['LightMatrix']
+
+
+# the float implementation used before the integer math
+def reference_convert(pixel_number, total_pixel, proportion):
+    if pixel_number / total_pixel <= proportion:
+        return 100
+    elif (pixel_number - 1) / total_pixel <= proportion:
+        return int(100 * (total_pixel * proportion - (pixel_number - 1)))
+    else:
+        return 0
+
+
+def reference_bar(total_pixel, timeout, init_timeout, exact=True):
+    proportion = Fraction(timeout, init_timeout) if exact else timeout / init_timeout
+    return [reference_convert(k + 1, total_pixel, proportion) for k in range(total_pixel)]
+
+
+class Sensor:
+    def __init__(self, init_timeout):
+        self.init_timeout = init_timeout
+
+
+def reference_levels(timeouts, init_timeouts, total_pixels):
+    return tuple(max(0, int(100 * total_pixel * timeout / init_timeout)) for timeout, init_timeout, total_pixel in zip(timeouts, init_timeouts, total_pixels))
+
+
+# the frame building before the integer math, on the geometry of light_matrix
+def reference_frame(light_matrix, timeouts, init_timeouts):
+    total_pixels = [len(bar) for bar in light_matrix.bars]
+    key = (reference_levels(timeouts, init_timeouts, total_pixels), ((),) * len(timeouts))
+    pixels = [0] * (light_matrix.width * light_matrix.height)
+    for timeout, init_timeout, bar in zip(timeouts, init_timeouts, light_matrix.bars):
+        proportion = timeout / init_timeout
+        total_pixel = len(bar)
+        for pixel_number, pixel in enumerate(bar):
+            pixels[pixel] = reference_convert(pixel_number + 1, total_pixel, proportion)
+    width = light_matrix.width
+    return key, [pixels[row:row + width] for row in range(0, len(pixels), width)]
+
+
+def integer_frame(light_matrix, timeouts, init_timeouts):
+    light_matrix.frames.clear()
+    return light_matrix._frame((light_matrix._levels(timeouts, init_timeouts), ((),) * len(timeouts)))
+
+
+def integer_bar(light_matrix, timeout, init_timeout):
+    light_matrix.frames.clear()
+    key = (light_matrix._levels([timeout], [init_timeout]), ((),))
+    frame = light_matrix._frame(key)
+    pixels = [value for row in frame for value in row]
+    return [pixels[pixel] for pixel in light_matrix.bars[0]]
+
+
+def main():
+    LightMatrix = load_light_matrix()
+    light_matrix = LightMatrix(None, cache_size=1)
+    light_matrix.register([Sensor(20), Sensor(20), Sensor(20)])
+    number = 20000
+    timeouts, init_timeouts, total_pixels = [13, 0, 7], [20, 20, 20], [5, 5, 5]
+    t_float = timeit(lambda: reference_levels(timeouts, init_timeouts, total_pixels), number=number)
+    t_int = timeit(lambda: light_matrix._levels(timeouts, init_timeouts), number=number)
+    print("Levels of 3 sensors (every tick): float %.2f us, integer %.2f us" % (1e6 * t_float / number, 1e6 * t_int / number))
+
+    for sensors in (1, 3):
+        light_matrix = LightMatrix(None, cache_size=1)
+        light_matrix.register([Sensor(20)] * sensors)
+        t_float = timeit(lambda: reference_frame(light_matrix, timeouts[:sensors], init_timeouts[:sensors]), number=number)
+        t_int = timeit(lambda: integer_frame(light_matrix, timeouts[:sensors], init_timeouts[:sensors]), number=number)
+        print("Frame of %s sensor(s) (cache miss): float %.2f us, integer %.2f us" % (sensors, 1e6 * t_float / number, 1e6 * t_int / number))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Host comparison of the memory a sensor, a SmartSensor and a motor take before
+and after the runtime classes got __slots__ and tuples instead of dicts.
+
+"before" are the classes of switch.py of an older revision of the repository
+(by default the first commit, where all classes are still in switch.py),
+"after" are the classes of the working tree, or of switch.py of the second
+revision (which must be older than the split of switch.py into modules). So
+the change of a single commit is measured with its parent and the commit
+(e.g. the __slots__ commit), while the working tree includes the state the
+later features added to the classes. Both run with the simulated
+PyBricks modules of tools/sim, and every object is measured with tracemalloc
+(the bytes which stay allocated after creating the object, including its
+lists, dicts and tuples).
+
+The numbers are CPython numbers from the host, not from the hub: MicroPython
+ignores __slots__ and has other object sizes, so the saving on the hub is
+smaller. Measure the hub with examples/memory_report.py.
+
+Usage: python tools/bench_memory.py [BEFORE [AFTER]]
+"""
+import gc
+import subprocess
+import sys
+import tracemalloc
+
+from host import ROOT, install, load_source
+
+OBJECTS = 20 # objects per measurement, the result is the mean
+
+
+def git(*args):
+    return subprocess.run(('git',) + args, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+
+
+def load_revision(revision):
+    module = load_source('switch_%s' % revision, git('show', '%s:switch.py' % revision), 'switch.py@%s' % revision)
+    if not hasattr(module, 'SwitchDistanceSensor'):
+        raise SystemExit("switch.py of %s has no sensor classes (use a revision before the split into modules)" % revision)
+    return module
+
+
+def measure(factory):
+    factory() # imports and caches are not counted
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    objects = [factory() for _ in range(OBJECTS)]
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before - sys.getsizeof(objects)
+    tracemalloc.stop()
+    return size // OBJECTS
+
+
+def sizes(classes):
+    from pybricks.parameters import Port
+    sensor_class, smart_class, motor_class = classes
+    return {
+        'sensor': measure(lambda: sensor_class(Port.A)),
+        'SmartSensor': measure(lambda: smart_class(sensor_class(Port.A), sensor_class(Port.C))),
+        'motor': measure(lambda: motor_class(Port.B, turn_degrees=90)),
+    }
+
+
+def main():
+    revision = sys.argv[1] if len(sys.argv) > 1 else git('rev-list', '--max-parents=0', 'HEAD').split()[0]
+    after_revision = sys.argv[2] if len(sys.argv) > 2 else None
+    install()
+    from pybricks import pupdevices
+    from pybricks.parameters import Port
+    for port in 'ABCDEF':
+        pupdevices.IDS[getattr(Port, port)] = 37 # a ColorDistanceSensor
+
+    old = load_revision(revision)
+    before = sizes((old.SwitchDistanceSensor, old.SmartSensor, old.SwitchMotor))
+    if after_revision is None:
+        import switch
+        from switch_distance import SwitchDistanceSensor
+        from switch_smart import SmartSensor
+        after = sizes((SwitchDistanceSensor, SmartSensor, switch.SwitchMotor))
+    else:
+        new = load_revision(after_revision)
+        after = sizes((new.SwitchDistanceSensor, new.SmartSensor, new.SwitchMotor))
+
+    print("Bytes per object on the host (CPython), before: %s, after: %s" % (
+        git('rev-parse', '--short', revision).strip(),
+        git('rev-parse', '--short', after_revision).strip() if after_revision else 'working tree'))
+    print("%-12s %8s %8s %8s" % ('', 'before', 'after', 'saved'))
+    for name in before:
+        saved = before[name] - after[name]
+        print("%-12s %8s %8s %7.0f%%" % (name, before[name], after[name], 100 * saved / before[name]))
+
+
+if __name__ == '__main__':
+    main()
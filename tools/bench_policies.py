@@ -0,0 +1,213 @@
+"""
+Host benchmark of the routing policies of switch_policy.py.
+
+Simulates a switch tree in front of a station with one track per path: a
+train routed to a path occupies its track for some time (until it left the
+station again), the trains arrive with random gaps and wait in front of the
+switch, and only one train passes the switch at a time. Every policy runs on
+the same arrivals in two modes:
+- plain: the switch only has a sensor in front of it (SwitchMotor.move_random),
+  so the policy does not know which tracks are occupied. A train routed to an
+  occupied track waits until the track is free (blocked-path wait).
+- smart: a SmartSensor with a post-sensor per track (SwitchMotor.move_smart),
+  so the policy only chooses free tracks. If all tracks are occupied, the
+  train waits and the switch moves as soon as a track is free again.
+
+Reported are the throughput (trains per hour), the mean and the longest wait
+of a train in front of the switch, the mean blocked-path wait, the motor moves
+per train, the share of every path, the largest distance (in trains) from the
+target shares of the FairSharePolicy at any time and the time per decision
+on the host.
+
+Without a policy (move_random), the switch must make the same decisions as
+the RandomPolicy, this is checked first.
+
+The policy classes are taken from switch_policy.py and the path methods of
+SwitchMotor from switch.py as they are (the PyBricks modules are not
+available on the host, so the rest of the modules is not executed).
+
+Usage: python tools/bench_policies.py [TRAINS]
+"""
+import ast
+import os
+import random
+import sys
+from timeit import timeit
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SWITCH = os.path.join(ROOT, 'switch.py')
+POLICY = os.path.join(ROOT, 'switch_policy.py')
+
+ONE = 65535
+POLICIES = ['RandomPolicy', 'RoundRobinPolicy', 'LeastRecentlyUsedPolicy', 'FairSharePolicy']
+
+# the simulated layout: B has the successor C in CURVED direction, so the
+# paths are (STRAIGHT,), (CURVED, STRAIGHT) and (CURVED, CURVED)
+PROBABILITIES = {'B': (0.3, 0.9), 'C': (0.6, 0.4)}
+OCCUPY_MS = [40000, 60000, 90000] # the time a train occupies the track of a path
+GAP_MS = 30000 # the mean gap between two arriving trains
+PASS_MS = 4000 # the time a train needs to pass the switch
+# the FairSharePolicy gives a track the more trains the sooner it is free again
+WEIGHTS = [1 / occupy for occupy in OCCUPY_MS]
+
+
+def load(path, names, namespace):
+    """
+    Executes the given top level definitions of a module (classes, or methods
+    of a class given as 'Class.method'), without their annotations.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read())
+    nodes = []
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef) and node.name in names:
+            nodes.append(node)
+        elif isinstance(node, ast.ClassDef):
+            nodes += [method for method in node.body if isinstance(method, ast.FunctionDef)
+                      and '%s.%s' % (node.name, method.name) in names]
+    for node in ast.walk(ast.Module(body=nodes, type_ignores=[])):
+        if isinstance(node, ast.arguments):
+            for arg in node.args:
+                arg.annotation = None
+    exec(compile(ast.Module(body=nodes, type_ignores=[]), path, 'exec'), namespace)
+    return namespace
+
+
+class SimMotor:
+    """
+    A SwitchMotor without the motor, with the path methods of switch.py.
+    """
+    def __init__(self, probabilities, rng):
+        self.thresholds = tuple(int(p * ONE + 0.5) for p in probabilities)
+        self.rng = rng
+        self.switch_position = 0
+        self.successors = {}
+        self.policy = None
+        self.moves = 0
+        self._update()
+
+    def move(self):
+        self.switch_position ^= 1
+        self.moves += 1
+
+    def register_successor(self, successor, switch_position):
+        self.successors[switch_position] = successor
+        self._update()
+
+    def count_moves(self):
+        return self.moves + sum(motor.count_moves() for motor in self.successors.values())
+
+
+MOTOR_METHODS = ('_all_paths', '_update', 'current_path', 'move_path', 'move_random',
+                 'move_successor_random', 'move_smart', 'blocked_mask', 'set_policy')
+_namespace = load(SWITCH, {'XorShift'} | {'SwitchMotor.' + name for name in MOTOR_METHODS},
+                  {'_STRAIGHT': 0, '_CURVED': 1})
+XorShift = _namespace['XorShift']
+for _name in MOTOR_METHODS:
+    setattr(SimMotor, _name, _namespace[_name])
+_policies = load(POLICY, set(POLICIES) | {'RoutingPolicy'}, {'_ONE': ONE})
+
+
+def tree(seed):
+    rng = XorShift(seed)
+    root = SimMotor(PROBABILITIES['B'], rng)
+    root.register_successor(SimMotor(PROBABILITIES['C'], rng), 1)
+    return root
+
+
+def make_policy(name):
+    if name == 'FairSharePolicy':
+        return _policies[name](WEIGHTS)
+    return _policies[name]()
+
+
+def check_random(seed, count=10000):
+    """
+    Compares the paths of move_random with the ones of the RandomPolicy.
+    """
+    plain, policy = tree(seed), tree(seed)
+    policy.set_policy(make_policy('RandomPolicy'))
+    for _ in range(count):
+        plain.move_random()
+        policy.move_random()
+        if plain.current_path() != policy.current_path():
+            return False
+    return True
+
+
+def simulate(name, smart, trains, seed):
+    root = tree(seed)
+    root.set_policy(make_policy(name))
+    paths = root.all_paths
+    arrivals = random.Random(seed)
+    free_at = [0] * len(paths) # the time the track of a path is free again
+    counts = [0] * len(paths)
+    deviation = 0 # the largest distance from the target shares (in trains)
+    target = [weight / sum(WEIGHTS) for weight in WEIGHTS]
+    arrival = 0
+    switch_free = 0 # the time the last train passed the switch
+    waits = []
+    blocked_waits = []
+    for n in range(trains):
+        arrival += int(arrivals.expovariate(1 / GAP_MS))
+        now = max(arrival, switch_free)
+
+        def blocked_paths():
+            return [path for path, free in zip(paths, free_at) if free > now]
+
+        if smart:
+            root.move_smart(True, blocked_paths())
+            decided = now
+            while free_at[paths.index(root.current_path())] > now:
+                # all tracks are occupied, wait for the next free track
+                now = min(free for free in free_at if free > now)
+                root.move_smart(False, blocked_paths())
+        else:
+            root.move_random()
+            decided = now
+        i = paths.index(root.current_path())
+        now = max(now, free_at[i])
+        blocked_waits.append(now - decided)
+        waits.append(now - arrival)
+        switch_free = now + PASS_MS
+        free_at[i] = now + OCCUPY_MS[i]
+        counts[i] += 1
+        deviation = max(deviation, max(abs(count - share * (n + 1)) for count, share in zip(counts, target)))
+
+    moves = root.count_moves()
+    # the time per decision, without blocked paths
+    decide = timeit(root.move_random, number=10000) / 10000 * 1e6
+    return {
+        'throughput': trains / (switch_free / 3600000),
+        'wait': sum(waits) / trains / 1000,
+        'max_wait': max(waits) / 1000,
+        'blocked_wait': sum(blocked_waits) / trains / 1000,
+        'moves': moves / trains,
+        'shares': [count / trains for count in counts],
+        'deviation': deviation,
+        'decide': decide,
+    }
+
+
+def main():
+    trains = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = 42
+    print("move_random and RandomPolicy choose the same paths: %s" % check_random(seed))
+    print("%s trains, mean gap %ss, tracks free after %s s, target shares %s" % (
+        trains, GAP_MS / 1000, ', '.join('%g' % (t / 1000) for t in OCCUPY_MS),
+        ', '.join('%.2f' % (w / sum(WEIGHTS)) for w in WEIGHTS)))
+    header = "%-24s %-5s %8s %8s %8s %8s %6s %16s %6s %8s" % (
+        'policy', 'mode', 'trains/h', 'wait s', 'max s', 'block s', 'moves', 'shares', 'dev', 'us/dec')
+    print(header)
+    print('-' * len(header))
+    for smart in (False, True):
+        for name in POLICIES:
+            r = simulate(name, smart, trains, seed)
+            print("%-24s %-5s %8.1f %8.1f %8.1f %8.1f %6.2f %16s %6.1f %8.2f" % (
+                name, 'smart' if smart else 'plain', r['throughput'], r['wait'], r['max_wait'],
+                r['blocked_wait'], r['moves'], ' '.join('%.2f' % s for s in r['shares']),
+                r['deviation'], r['decide']))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,313 @@
+"""
+Builds a compact single-file bundle of switch.py for each example layout.
+
+switch.py and its modules (the sensor classes, the SmartSensor, the
+LightMatrix and the optional profiler, schedule and policies, see MODULES) are
+merged into one program. For every layout of
+examples/_generate_examples.py, the bundle contains only the parts that the
+layout (and the target hub) actually needs:
+- unused classes and functions are removed (e.g. the LightMatrix on hubs
+  without a light matrix like the City Hub, or SwitchController.load() if the
+  layout is not loaded from a packed layout),
+- docstrings, comments, __slots__ (ignored by MicroPython) and __all__ are
+  removed,
+- unused imports are removed and the code is indented by a single space,
+- the tick profiler (switch_profile.py) and the `if _PROFILE:` blocks are
+  removed, unless --profile is given, which enables the profiler instead.
+
+The minified source is written to build/<layout>.py. If mpy-cross is available
+(on the PATH or given by --mpy-cross), it is compiled to build/<layout>.mpy, so
+the hub does not need to compile the source itself, which saves RAM and
+startup time. Use the mpy-cross version matching the firmware of your hub.
+
+At the end, a report shows the bundle sizes and the estimated heap use per
+layout and target hub. The bytes of a sensor and a motor depend on the
+firmware; measure them with examples/memory_report.py on the hub and pass them
+with --sensor-bytes and --motor-bytes to include them in the estimate.
+
+Usage: python tools/build.py [--mpy-cross PATH] [--sensor-bytes N] [--motor-bytes N] [--profile] [layout ...]
+"""
+import argparse
+import ast
+import importlib.util
+import os
+import shutil
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# the modules of switch.py, in the order they are merged into a bundle
+MODULES = ['switch_sensor', 'switch_distance', 'switch_ir', 'switch_ultrasonic',
+           'switch_color', 'switch_smart', 'switch_display', 'switch_profile',
+           'switch_schedule', 'switch_policy', 'switch']
+BUILD = os.path.join(ROOT, 'build')
+
+# the hub each example layout is made for
+TARGETS = {
+    '1sensor_1motor': 'CityHub',
+    '1sensor_3motors(1.1.1)': 'TechnicHub',
+    '1sensor_3motors(1.2)': 'TechnicHub',
+    '2sensor_1motor': 'TechnicHub',
+    'mindstorms_51515_1_1': 'InventorHub',
+    'mindstorms_51515_1_1_1': 'InventorHub',
+}
+
+# the classes which are never used on a hub without the given feature
+FEATURES = {
+    'display': {'LightMatrix'},
+}
+
+HUB_FEATURES = {
+    'MoveHub': set(),
+    'CityHub': set(),
+    'TechnicHub': set(),
+    'EssentialHub': set(),
+    'PrimeHub': {'display'},
+    'InventorHub': {'display'},
+}
+
+# methods which are only kept if the layout calls them (they reference many
+# otherwise unused names, e.g. load() references every sensor class)
+OPTIONAL_METHODS = {'load'}
+
+SENSOR_NAMES = {'SwitchSensor', 'SwitchDistanceSensor', 'SwitchIRSensor', 'SwitchUltrasonicSensor', 'SwitchColorSensor'}
+
+
+def load_suffixes():
+    path = os.path.join(ROOT, 'examples', '_generate_examples.py')
+    spec = importlib.util.spec_from_file_location('_generate_examples', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.suffixes
+
+
+def used_names(node):
+    return {n.id for n in ast.walk(node) if isinstance(n, ast.Name)}
+
+
+def defined_names(node):
+    if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+        return {node.name}
+    if isinstance(node, ast.Assign):
+        return {n.id for target in node.targets for n in ast.walk(target) if isinstance(n, ast.Name)}
+    return set()
+
+
+def remove_module_imports(body):
+    """
+    Removes the imports of the modules of switch.py (recursively, including the
+    lazy imports in functions), since all of them are merged into the bundle.
+    """
+    result = []
+    for node in body:
+        if isinstance(node, ast.ImportFrom) and node.module in MODULES:
+            continue
+        for field in ('body', 'orelse', 'finalbody'):
+            if isinstance(getattr(node, field, None), list):
+                setattr(node, field, remove_module_imports(getattr(node, field)) or ([ast.Pass()] if field == 'body' else []))
+        result.append(node)
+    return result
+
+
+def set_profile(body, enabled):
+    """
+    Enables the profiler (sets _PROFILE to 1) or removes the `if _PROFILE:`
+    blocks (recursively), so the profiler is not even parsed on the hub.
+    """
+    result = []
+    for node in body:
+        if isinstance(node, ast.Assign) and defined_names(node) == {'_PROFILE'}:
+            node.value.args = [ast.Constant(int(enabled))]
+        if not enabled and isinstance(node, ast.If) and isinstance(node.test, ast.Name) and node.test.id == '_PROFILE':
+            result.extend(set_profile(node.orelse, enabled))
+            continue
+        for field in ('body', 'orelse', 'finalbody'):
+            if isinstance(getattr(node, field, None), list):
+                setattr(node, field, set_profile(getattr(node, field), enabled) or ([ast.Pass()] if field == 'body' else []))
+        result.append(node)
+    return result
+
+
+def load_modules():
+    """
+    Returns the merged statements and the total source size of all modules.
+    The imports are moved to the top, and imports and constants used by more
+    than one module are only kept once.
+    """
+    imports, body, size, seen = [], [], 0, set()
+    for module in MODULES:
+        with open(os.path.join(ROOT, module + '.py')) as f:
+            source = f.read()
+        size += len(source.encode())
+        for node in remove_module_imports(ast.parse(source).body):
+            if isinstance(node, (ast.Import, ast.ImportFrom, ast.Assign)):
+                if ast.dump(node) in seen:
+                    continue
+                seen.add(ast.dump(node))
+            (imports if isinstance(node, (ast.Import, ast.ImportFrom)) else body).append(node)
+    return imports + body, size
+
+
+def is_docstring(node):
+    return isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+
+
+def strip(body):
+    """
+    Removes docstrings, __slots__ and type annotations of the given statements
+    (recursively).
+    """
+    result = []
+    for node in body:
+        if is_docstring(node):
+            continue
+        if isinstance(node, ast.Assign) and defined_names(node) == {'__slots__'}:
+            continue
+        if isinstance(node, ast.FunctionDef):
+            for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs:
+                arg.annotation = None
+            node.returns = None
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            node.body = strip(node.body) or [ast.Pass()]
+        result.append(node)
+    return result
+
+
+def remove_methods(body, names):
+    for node in body:
+        if isinstance(node, ast.ClassDef):
+            node.body = [n for n in node.body if not (isinstance(n, ast.FunctionDef) and n.name in names)] or [ast.Pass()]
+    return body
+
+
+def remove_unused(body, roots, excluded):
+    """
+    Keeps only the top-level definitions reachable from the roots (ignoring
+    references to excluded names) and the imports which are still used.
+    """
+    definitions = {}
+    for node in body:
+        for name in defined_names(node):
+            definitions.setdefault(name, []).append(node)
+
+    reachable = set()
+    todo = [name for name in roots if name not in excluded]
+    while todo:
+        name = todo.pop()
+        if name in reachable:
+            continue
+        reachable.add(name)
+        for node in definitions.get(name, []):
+            todo.extend(n for n in used_names(node) if n not in excluded and n not in reachable)
+
+    kept = [node for node in body
+            if isinstance(node, (ast.Import, ast.ImportFrom))
+            or (defined_names(node) and defined_names(node) & reachable and '__all__' not in defined_names(node))]
+
+    used = set(roots)
+    for node in kept:
+        if not isinstance(node, (ast.Import, ast.ImportFrom)):
+            used |= used_names(node)
+    result = []
+    for node in kept:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            node.names = [alias for alias in node.names if (alias.asname or alias.name) in used]
+            if not node.names:
+                continue
+        result.append(node)
+    return result
+
+
+def minify(tree):
+    source = ast.unparse(tree)
+    lines = []
+    for line in source.split('\n'):
+        if not line.strip():
+            continue
+        stripped = line.lstrip(' ')
+        lines.append(' ' * ((len(line) - len(stripped)) // 4) + stripped)
+    return '\n'.join(lines) + '\n'
+
+
+def build(name, suffix, hub, mpy_cross, profile=False):
+    modules, modules_size = load_modules()
+    modules = set_profile(modules, profile)
+    all_names = defined_names_of(modules)
+    layout = '\n'.join(suffix) + '\n'
+    layout_tree = ast.parse(layout)
+    layout_tree.body = remove_module_imports(layout_tree.body)
+
+    excluded = set()
+    for feature, names in FEATURES.items():
+        if feature not in HUB_FEATURES[hub]:
+            excluded |= names
+
+    called = {n.attr for n in ast.walk(layout_tree) if isinstance(n, ast.Attribute)}
+    body = remove_methods(strip(modules), OPTIONAL_METHODS - called)
+    body = remove_unused(body, used_names(layout_tree), excluded)
+    tree = ast.Module(body=body + layout_tree.body, type_ignores=[])
+    source = minify(tree)
+
+    os.makedirs(BUILD, exist_ok=True)
+    py_path = os.path.join(BUILD, name + '.py')
+    with open(py_path, 'w') as f:
+        f.write(source)
+
+    mpy_size = None
+    if mpy_cross:
+        mpy_path = os.path.join(BUILD, name + '.mpy')
+        subprocess.run([mpy_cross, '-o', mpy_path, py_path], check=True)
+        mpy_size = os.path.getsize(mpy_path)
+
+    calls = [n.func.id for n in ast.walk(layout_tree) if isinstance(n, ast.Call) and isinstance(n.func, ast.Name)]
+    removed = sorted(all_names - defined_names_of(body))
+    return {
+        'original': modules_size + len(layout.encode()),
+        'source': len(source.encode()),
+        'mpy': mpy_size,
+        'sensors': sum(1 for c in calls if c in SENSOR_NAMES),
+        'motors': calls.count('SwitchMotor'),
+        'removed': removed,
+    }
+
+
+def defined_names_of(body):
+    names = set()
+    for node in body:
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)):
+            names.add(node.name)
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('layouts', nargs='*', help='the layouts to build (default: all)')
+    parser.add_argument('--mpy-cross', default=shutil.which('mpy-cross'), help='path of the mpy-cross compiler')
+    parser.add_argument('--sensor-bytes', type=int, help='heap bytes per sensor (see examples/memory_report.py)')
+    parser.add_argument('--motor-bytes', type=int, help='heap bytes per motor (see examples/memory_report.py)')
+    parser.add_argument('--profile', action='store_true', help='enable the tick profiler (see switch_profile.py)')
+    args = parser.parse_args()
+
+    suffixes = load_suffixes()
+    layouts = args.layouts or list(suffixes)
+    if not args.mpy_cross:
+        print("mpy-cross not found, only the minified sources are built")
+
+    print("%-24s %-12s %9s %9s %9s %9s" % ('layout', 'hub', 'original', 'source', 'mpy', 'heap'))
+    for name in layouts:
+        hub = TARGETS.get(name, 'PrimeHub')
+        report = build(name, suffixes[name], hub, args.mpy_cross, args.profile)
+
+        # the bytecode of an .mpy file stays on the heap, a .py file is
+        # compiled on the hub (which needs at least the same amount)
+        heap = report['mpy'] if report['mpy'] is not None else report['source']
+        if args.sensor_bytes is not None:
+            heap += report['sensors'] * args.sensor_bytes
+        if args.motor_bytes is not None:
+            heap += report['motors'] * args.motor_bytes
+        print("%-24s %-12s %9s %9s %9s %9s" % (name, hub, report['original'], report['source'], report['mpy'] or '-', heap))
+        print("  %s sensor(s), %s motor(s), removed: %s" % (report['sensors'], report['motors'], ', '.join(report['removed']) or '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,598 @@
+"""
+Compiles a declarative switch layout into a specialized PyBricks program.
+
+The generated program works like the generic SwitchController of switch.py for
+this layout, but like CityHub.py it is a flat loop without the object graph:
+the state machine of every sensor is unrolled into the tick, the dispatch from
+sensors to motors is hard-wired, and the probability tables of the SmartSensor
+path choice are precomputed. This makes the program smaller and faster, which
+matters most on hubs with little RAM.
+
+The layout format is described in tools/layout.py. Sensors of type auto are
+not supported, because the compiled program needs to know the sensor class,
+and neither are sensors which learn their init_timeout (learn_gaps) or check
+the time of a RISING_EDGE move (approach_ms), nor switches which estimate the
+speed of the trains (sensor_spacing_mm), nor decisions computed in advance
+(schedule).
+
+The compiled program only drives the status light, not the light matrix.
+
+Usage: python tools/compile_layout.py LAYOUT.json [OUTPUT.py]
+"""
+import ast
+import json
+import os
+import sys
+
+from layout import POSITIONS, SWITCH_MODES, normalize, validate
+
+SWITCH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'switch.py')
+
+# sensor type -> (PyBricks class, distance expression)
+SENSOR_TYPES = {
+    'distance': ('ColorDistanceSensor', '%s.distance()'),
+    'ir': ('InfraredSensor', '%s.distance()'),
+    'ultrasonic': ('UltrasonicSensor', '%s.distance()'),
+    'color': ('ColorSensor', '100 - %s.reflection()'),
+}
+
+# the largest precomputed table of a SmartSensor path choice
+MAX_TABLE_SIZE = 256
+# the probabilities are compared as integers in 1/ONE (see XorShift in switch.py)
+ONE = 65535
+# the size of the ring of a delayed post-sensor (_DELAY_SLOTS of switch_sensor.py)
+DELAY_SLOTS = 8
+
+
+def load_motor_methods():
+    """
+    Returns the path methods of SwitchMotor (taken from switch.py), so the
+    compiler enumerates and weights the paths exactly as the SwitchMotor does.
+    """
+    with open(SWITCH) as f:
+        tree = ast.parse(f.read())
+    names = {'_all_paths', '_get_transition_probability', '_cumulative_thresholds', 'blocked_mask', 'current_path'}
+    motor = next(node for node in tree.body if isinstance(node, ast.ClassDef) and node.name == 'SwitchMotor')
+    methods = [node for node in motor.body if isinstance(node, ast.FunctionDef) and node.name in names]
+    for method in methods:
+        for arg in method.args.args:
+            arg.annotation = None
+    namespace = {'_STRAIGHT': 0, '_CURVED': 1, '_ONE': ONE}
+    exec(compile(ast.Module(body=methods, type_ignores=[]), SWITCH, 'exec'), namespace)
+    return {name: namespace[name] for name in names}
+
+
+class Tree:
+    """
+    The positions and probabilities of a motor (and its successors) at compile
+    time. Uses the path methods of SwitchMotor.
+    """
+    def __init__(self, port, motors):
+        config = motors[port]
+        self.port = port
+        self.thresholds = thresholds(config)
+        self.switch_position = POSITIONS[config['switch_position']]
+        self.successors = {POSITIONS[p]: Tree(m, motors) for p, m in config['successors'].items()}
+
+    def motors(self):
+        yield self
+        for motor in self.successors.values():
+            yield from motor.motors()
+
+
+for _name, _method in load_motor_methods().items():
+    setattr(Tree, _name, _method)
+
+
+def thresholds(config):
+    """
+    The probabilities of a motor in 1/ONE, like SwitchMotor.thresholds.
+    """
+    return (int(config['probability_straight_to_curved'] * ONE + 0.5), int(config['probability_curved_to_straight'] * ONE + 0.5))
+
+
+def path_weights(root, paths, num_steps=5):
+    """
+    Same as SwitchMotor._determine_path_probabilities (without the PyBricks
+    Matrix).
+    """
+    if len(paths) == 1:
+        return [1]
+    state = [1.0 / len(paths)] * len(paths)
+    transition = [[root._get_transition_probability(p1, p2) for p2 in paths] for p1 in paths]
+    for _ in range(num_steps):
+        state = [sum(state[i] * transition[i][j] for i in range(len(paths))) for j in range(len(paths))]
+    return state
+
+
+class Compiler:
+
+    def __init__(self, layout):
+        self.layout = normalize(layout)
+        validate(self.layout)
+        if self.layout['schedule']:
+            # the compiled program draws its decisions when a train arrives
+            raise ValueError("A layout with a schedule can not be compiled")
+        for port, config in self.layout['sensors'].items():
+            if config['type'] not in SENSOR_TYPES:
+                raise ValueError("Sensor <%s> of type <%s> can not be compiled" % (port, config['type']))
+            if config['learn_gaps']:
+                raise ValueError("Sensor <%s> with learn_gaps can not be compiled" % port)
+            if config['approach_ms'] is not None:
+                raise ValueError("Sensor <%s> with approach_ms can not be compiled" % port)
+        for switch in self.layout['switches']:
+            if switch['sensor_spacing_mm']:
+                raise ValueError("Switch with motor <%s> and sensor_spacing_mm can not be compiled" % switch['motor'])
+        self.lines = []
+        self.sensors = self.layout['sensors']
+        self.motors = self.layout['motors']
+        self.switches = self.layout['switches']
+        self.trees = [Tree(switch['motor'], self.motors) for switch in self.switches]
+        self.post_sensors = {port for switch in self.switches for _, port in switch['post_sensors']}
+
+    def emit(self, line='', depth=0):
+        self.lines.append('    ' * depth + line if line else '')
+
+    def is_smart(self, switch):
+        return len(switch['sensors']) > 1 or len(switch['post_sensors']) > 0
+
+    def name(self, index):
+        switch = self.switches[index]
+        return 'smart%s' % index if self.is_smart(switch) else switch['sensors'][0]
+
+    def tick_order(self):
+        """
+        The order the SwitchController ticks the sensors (and SmartSensors).
+        """
+        order = []
+        for index, switch in enumerate(self.switches):
+            name = self.name(index)
+            sensors = switch['sensors'] + [port for _, port in switch['post_sensors']] if self.is_smart(switch) else [name]
+            for sensor in sensors:
+                if sensor not in order:
+                    order.append(sensor)
+                if name not in order:
+                    order.append(name)
+        return order
+
+    def compile(self):
+        self.header()
+        self.devices()
+        self.motor_functions()
+        self.smart_tables()
+        self.loop()
+        return '\n'.join(self.lines) + '\n'
+
+    def header(self):
+        classes = sorted({SENSOR_TYPES[c['type']][0] for c in self.sensors.values()})
+        self.emit('# generated by tools/compile_layout.py, do not edit')
+        self.emit('from pybricks.hubs import ThisHub')
+        self.emit('from pybricks.pupdevices import Motor, %s' % ', '.join(classes))
+        self.emit('from pybricks.parameters import Port, Direction, Button, Color, Stop')
+        self.emit('from pybricks.tools import wait, StopWatch')
+        self.emit('from urandom import getrandbits')
+        self.emit()
+        self.emit('hub = ThisHub()')
+        self.emit('hub.system.set_stop_button(None)')
+        self.emit("buttons = hub.buttons if hasattr(hub, 'buttons') else hub.button")
+        self.emit('shown = None')
+        self.emit()
+        # the XorShift of switch.py, so a seed gives the same paths as there
+        seed = self.layout['seed']
+        self.emit('rng = %s' % ('(getrandbits(16) & 0xFFFF) or 1' if seed is None else ((seed & 0xFFFF) or 1)))
+        self.emit()
+        self.emit('def rand16():')
+        for line in ['global rng',
+                'x = rng',
+                'x ^= (x << 7) & 0xFFFF',
+                'x ^= x >> 9',
+                'x ^= (x << 8) & 0xFFFF',
+                'rng = x',
+                'return x - 1']:
+            self.emit(line, 1)
+        self.emit()
+        self.emit('def light(color):')
+        self.emit('global shown', 1)
+        self.emit('if color != shown:', 1)
+        self.emit('shown = color', 2)
+        self.emit('hub.light.on(color)', 2)
+        self.emit()
+        self.emit('light(Color.GREEN)')
+        self.emit()
+
+    def devices(self):
+        for port, config in self.sensors.items():
+            mode = SWITCH_MODES[config['switch_mode']]
+            self.emit('sensor_%s = %s(Port.%s)' % (port, SENSOR_TYPES[config['type']][0], port))
+            self.emit('timeout_%s = %s' % (port, 0 if mode == 0 else -1))
+            self.emit('state_%s = False' % port)
+            if config['median_window'] > 1:
+                self.emit('window_%s = [0] * %s' % (port, config['median_window']))
+                self.emit('window_index_%s = -1' % port)
+            if config['ema_shift']:
+                self.emit('ema_%s = None' % port)
+            if self.hysteresis(port):
+                self.emit('threshold_%s = %s' % (port, config['critical_distance']))
+            if port in self.post_sensors:
+                self.emit('post_timeout_%s = -1' % port)
+                self.emit('blocked_%s = False' % port)
+                if config['post_sensor_delay_ms'] > 0:
+                    # the ring of the pending changes, like SwitchSensor_._delay_state
+                    self.emit('delay_%s = [0] * %s' % (port, DELAY_SLOTS))
+                    self.emit('delay_head_%s = 0' % port)
+                    self.emit('delay_size_%s = 0' % port)
+                    self.emit('delay_input_%s = False' % port)
+                    self.emit('clock_%s = 0' % port)
+
+        self.emit()
+        if any(config['median_window'] > 1 for config in self.sensors.values()):
+            # the median of SwitchSensor_._filter
+            self.emit('def median(window):')
+            for line in [
+                    'half = len(window) >> 1',
+                    'for value in window:',
+                    '    less = equal = 0',
+                    '    for other in window:',
+                    '        if other < value:',
+                    '            less += 1',
+                    '        elif other == value:',
+                    '            equal += 1',
+                    '    if less <= half < less + equal:',
+                    '        return value']:
+                self.emit(line, 1)
+            self.emit()
+
+        self.emit('def calibrate(motor, power, position):')
+        for line in [
+                'motor.reset_angle(0)',
+                'angle1 = motor.run_until_stalled(power / 5)',
+                'angle2 = motor.run_until_stalled(-power / 5)',
+                'diff = angle1 - angle2',
+                'if diff > 100:',
+                '    angle1 = int(angle1 - diff / 5)',
+                '    angle2 = int(angle2 + diff / 5)',
+                'if angle1 >= -angle2:',
+                '    angle1, angle2 = angle2, angle1',
+                'motor.run_target(power, angle1)',
+                'motor.stop()',
+                'return (angle1, angle2) if position == 0 else (angle2, angle1)']:
+            self.emit(line, 1)
+        self.emit()
+
+        for port, config in self.motors.items():
+            position = POSITIONS[config['switch_position']]
+            self.emit('motor_%s = Motor(Port.%s, Direction.%s)' % (port, port, config['direction']))
+            self.emit('motor_%s.reset_angle(0)' % port)
+            self.emit('motor_%s.stop()' % port)
+            if config['turn_degrees'] is None:
+                self.emit('angle_%s = calibrate(motor_%s, %s, %s)' % (port, port, config['power'], position))
+            else:
+                angles = (0, config['turn_degrees']) if position == 0 else (config['turn_degrees'], 0)
+                self.emit('angle_%s = %s' % (port, angles))
+            self.emit('pos_%s = %s' % (port, position))
+            # the thresholds of SwitchMotor in 1/65535
+            self.emit('P_%s = %r' % (port, thresholds(config)))
+        self.emit()
+
+    def motor_functions(self):
+        for port, config in self.motors.items():
+            successors = {POSITIONS[p]: m for p, m in config['successors'].items()}
+            self.emit('def move_%s():' % port)
+            self.emit('global pos_%s' % port, 1)
+            self.emit('pos_%s ^= 1' % port, 1)
+            self.emit('motor_%s.run_target(%s, angle_%s[pos_%s], then=Stop.%s, wait=True)' % (port, config['power'], port, port, config['stop_mode']), 1)
+            self.emit()
+            self.emit('def random_%s():' % port)
+            self.emit('if rand16() < P_%s[pos_%s]:' % (port, port), 1)
+            self.emit('move_%s()' % port, 2)
+            keyword = 'if'
+            for position, successor in successors.items():
+                self.emit('%s pos_%s == %s:' % (keyword, port, position), 1)
+                self.emit('random_%s()' % successor, 2)
+                keyword = 'elif'
+            self.emit()
+            self.emit('def reset_%s():' % port)
+            self.emit('if pos_%s != %s:' % (port, POSITIONS[config['switch_position']]), 1)
+            self.emit('move_%s()' % port, 2)
+            for successor in successors.values():
+                self.emit('reset_%s()' % successor, 1)
+            self.emit()
+
+    def smart_tables(self):
+        """
+        For every SmartSensor, precomputes the result of the path selection of
+        SwitchMotor.move_smart for all motor positions and blocked post-sensor
+        paths: the current path, the candidate paths, their cumulative
+        thresholds and if the switch needs to move.
+        """
+        for index, switch in enumerate(self.switches):
+            if not self.is_smart(switch):
+                continue
+            root = self.trees[index]
+            motors = list(root.motors())
+            post_paths = [tuple(POSITIONS[p] for p in path) for path, _ in switch['post_sensors']]
+            size = 2 ** (len(motors) + len(post_paths))
+            if size > MAX_TABLE_SIZE:
+                raise ValueError("The layout of switch %s is too large to compile (%s table entries)" % (switch['motor'], size))
+
+            table = []
+            for key in range(size):
+                positions, blocked_bits = key >> len(post_paths), key & ((1 << len(post_paths)) - 1)
+                for bit, motor in enumerate(motors):
+                    motor.switch_position = (positions >> bit) & 1
+                blocked = [path for bit, path in enumerate(post_paths) if (blocked_bits >> bit) & 1]
+                all_paths = root.all_paths = [tuple(p) for p in root._all_paths()]
+                current = root.current_path()
+                mask = root.blocked_mask(blocked)
+                candidates = [p for i, p in enumerate(all_paths) if not mask >> i & 1 and p != current]
+                cumulative = root._cumulative_thresholds(path_weights(root, candidates)) if candidates else []
+                table.append((all_paths.index(current), tuple(all_paths.index(p) for p in candidates),
+                              tuple(cumulative), bool(mask >> all_paths.index(current) & 1)))
+
+            port = switch['motor']
+            self.emit('# (current path, candidate paths, cumulative thresholds, needs to move) of SmartSensor %s' % index)
+            self.emit('TABLE_%s = (' % index)
+            for entry in table:
+                self.emit('%r,' % (entry,), 1)
+            self.emit(')')
+            self.emit('next_%s = -1' % index)
+            self.emit()
+
+            self.emit('def move_path_%s(path):' % index)
+            keyword = 'if'
+            for path_index, path in enumerate(all_paths):
+                self.emit('%s path == %s:' % (keyword, path_index), 1)
+                motor = root
+                for position in path:
+                    self.emit('if pos_%s != %s:' % (motor.port, position), 2)
+                    self.emit('move_%s()' % motor.port, 3)
+                    motor = motor.successors.get(position)
+                keyword = 'elif'
+            self.emit()
+
+            positions = ' | '.join('pos_%s << %s' % (m.port, len(post_paths) + bit) for bit, m in enumerate(motors))
+            self.emit('def smart_%s(check, blocked):' % index)
+            self.emit('global next_%s' % index, 1)
+            self.emit('current, candidates, thresholds, needs2move = TABLE_%s[%s | blocked]' % (index, positions), 1)
+            self.emit('if next_%s in candidates:' % index, 1)
+            self.emit('move_path_%s(next_%s)' % (index, index), 2)
+            self.emit('next_%s = -1' % index, 2)
+            self.emit('elif ((check and rand16() < P_%s[pos_%s]) or needs2move) and candidates:' % (port, port), 1)
+            self.emit('rand = rand16()', 2)
+            self.emit('for path, threshold in zip(candidates, thresholds):', 2)
+            self.emit('if rand < threshold:', 3)
+            self.emit('move_path_%s(path)' % index, 4)
+            self.emit('break', 4)
+            self.emit('next_%s = current if needs2move else -1' % index, 2)
+            self.emit()
+
+    def hysteresis(self, port):
+        config = self.sensors[port]
+        return config['leave_distance'] not in (None, config['critical_distance'])
+
+    def sensor_filter(self, port, depth):
+        """
+        The median and moving average of SwitchSensor_._filter.
+        """
+        config = self.sensors[port]
+        size, shift = config['median_window'], config['ema_shift']
+        if size > 1:
+            self.emit('if window_index_%s < 0:' % port, depth)
+            self.emit('for i in range(%s):' % size, depth + 1)
+            self.emit('window_%s[i] = d_%s' % (port, port), depth + 2)
+            self.emit('window_index_%s = 0' % port, depth + 1)
+            self.emit('window_%s[window_index_%s] = d_%s' % (port, port, port), depth)
+            self.emit('window_index_%s = (window_index_%s + 1) %% %s' % (port, port, size), depth)
+            self.emit('d_%s = median(window_%s)' % (port, port), depth)
+        if shift:
+            self.emit('if ema_%s is None:' % port, depth)
+            self.emit('ema_%s = d_%s << %s' % (port, port, shift), depth + 1)
+            self.emit('else:', depth)
+            self.emit('ema_%s += d_%s - (ema_%s >> %s)' % (port, port, port, shift), depth + 1)
+            self.emit('d_%s = ema_%s >> %s' % (port, port, shift), depth)
+
+    def sensor_tick(self, port, depth):
+        config = self.sensors[port]
+        cd = config['critical_distance']
+        init = config['init_timeout_ms']
+        hysteresis = self.hysteresis(port)
+        threshold = 'threshold_%s' % port if hysteresis else cd
+        self.emit('d_%s = %s' % (port, SENSOR_TYPES[config['type']][1] % ('sensor_' + port)), depth)
+        self.sensor_filter(port, depth)
+        self.emit('state_%s = False' % port, depth)
+        if SWITCH_MODES[config['switch_mode']] == 0:
+            self.emit('if d_%s < %s:' % (port, threshold), depth)
+            if hysteresis:
+                self.emit('threshold_%s = %s' % (port, config['leave_distance']), depth + 1)
+            self.emit('if timeout_%s <= 0:' % port, depth + 1)
+            self.emit('state_%s = True' % port, depth + 2)
+            self.emit('timeout_%s = %s' % (port, init), depth + 1)
+            self.emit('else:', depth)
+            if hysteresis:
+                self.emit('threshold_%s = %s' % (port, cd), depth + 1)
+            self.emit('timeout_%s = timeout_%s - elapsed if timeout_%s > elapsed else 0' % (port, port, port), depth + 1)
+        else:
+            self.emit('if d_%s > %s:' % (port, threshold), depth)
+            if hysteresis:
+                self.emit('threshold_%s = %s' % (port, cd), depth + 1)
+            self.emit('if timeout_%s > 0:' % port, depth + 1)
+            self.emit('timeout_%s = timeout_%s - elapsed if timeout_%s > elapsed else 0' % (port, port, port), depth + 2)
+            self.emit('else:', depth)
+            if hysteresis:
+                self.emit('threshold_%s = %s' % (port, config['leave_distance']), depth + 1)
+            self.emit('timeout_%s = %s' % (port, init), depth + 1)
+            self.emit('if timeout_%s == 0:' % port, depth)
+            self.emit('timeout_%s = -1' % port, depth + 1)
+            self.emit('state_%s = True' % port, depth + 1)
+
+        if port in self.post_sensors:
+            self.emit('if timeout_%s > 0:' % port, depth)
+            self.emit('post_timeout_%s = %s' % (port, config['post_sensor_init_timeout_ms']), depth + 1)
+            self.emit('b = True', depth + 1)
+            self.emit('else:', depth)
+            self.emit('b = post_timeout_%s > 0' % port, depth + 1)
+            self.emit('if b:', depth + 1)
+            self.emit('post_timeout_%s -= elapsed' % port, depth + 2)
+            if config['post_sensor_delay_ms'] > 0:
+                self.emit('clock_%s += elapsed' % port, depth)
+                self.emit('if b != delay_input_%s:' % port, depth)
+                self.emit('delay_input_%s = b' % port, depth + 1)
+                self.emit('if delay_size_%s < %s:' % (port, DELAY_SLOTS), depth + 1)
+                self.emit('delay_%s[(delay_head_%s + delay_size_%s) %% %s] = clock_%s' % (port, port, port, DELAY_SLOTS, port), depth + 2)
+                self.emit('delay_size_%s += 1' % port, depth + 2)
+                self.emit('else:', depth + 1)
+                self.emit('delay_size_%s -= 1' % port, depth + 2)
+                self.emit('while delay_size_%s and clock_%s - delay_%s[delay_head_%s] >= %s:' % (port, port, port, port, config['post_sensor_delay_ms']), depth)
+                self.emit('delay_head_%s = (delay_head_%s + 1) %% %s' % (port, port, DELAY_SLOTS), depth + 1)
+                self.emit('delay_size_%s -= 1' % port, depth + 1)
+                self.emit('blocked_%s = not blocked_%s' % (port, port), depth + 1)
+            else:
+                self.emit('blocked_%s = b' % port, depth)
+
+    def smart_tick(self, index, depth):
+        switch = self.switches[index]
+        pre = switch['sensors']
+        self.emit('# SmartSensor %s' % index, depth)
+        self.emit('activated_%s = %s' % (index, ' or '.join('state_%s' % s for s in pre)), depth)
+        self.emit('free_%s = not (%s)' % (index, ' or '.join('timeout_%s > 0' % s for s in pre)), depth)
+        self.emit('if activated_%s:' % index, depth)
+        for s in pre:
+            wait_timeout = self.sensors[s]['init_timeout_ms'] if SWITCH_MODES[self.sensors[s]['switch_mode']] == 0 else -1
+            self.emit('timeout_%s = %s' % (s, wait_timeout), depth + 1)
+        bits = ' | '.join('(%s if blocked_%s else 0)' % (1 << bit, port) for bit, (_, port) in enumerate(switch['post_sensors'])) or '0'
+        self.emit('blocked_smart%s = %s' % (index, bits), depth)
+        # the events of SmartSensor._tick
+        self.emit('event_%s = free_%s and (activated_%s or not was_free_%s or blocked_smart%s != last_smart%s)'
+                  % (index, index, index, index, index, index), depth)
+        self.emit('was_free_%s = free_%s' % (index, index), depth)
+        self.emit('last_smart%s = blocked_smart%s' % (index, index), depth)
+
+    def smart_timeout(self, index, depth):
+        # the pre-sensors keep the timeout of the SmartSensor up to date, so it
+        # is the largest one after all sensors have ticked
+        pre = self.switches[index]['sensors']
+        if len(pre) > 1:
+            self.emit('timeout_smart%s = max(%s)' % (index, ', '.join('timeout_%s' % s for s in pre)), depth)
+        else:
+            self.emit('timeout_smart%s = timeout_%s' % (index, pre[0]), depth)
+
+    def idle(self, idle_timeout):
+        """
+        The idle mode of SwitchController._update_idle: no activity for
+        idle_timeout ms slows down the loop and releases the held motors.
+        """
+        near = ['fired']
+        for port in self.tick_order():
+            if port.startswith('smart'):
+                continue
+            cd = self.sensors[port]['critical_distance']
+            near.append('d_%s < %s or timeout_%s > 0' % (port, cd + (cd >> 2), port))
+        held = [port for port, config in self.motors.items() if config['stop_mode'] == 'HOLD']
+        self.emit('if %s:' % ' or '.join(near), 1)
+        self.emit('quiet = 0', 2)
+        self.emit('if idle:', 2)
+        self.emit('idle = False', 3)
+        for port in held:
+            self.emit('motor_%s.hold()' % port, 3)
+        self.emit('else:', 1)
+        self.emit('quiet += elapsed', 2)
+        self.emit('if not idle and quiet >= %s:' % idle_timeout, 2)
+        self.emit('idle = True', 3)
+        for port in held:
+            self.emit('motor_%s.stop()' % port, 3)
+        self.emit()
+
+    def loop(self):
+        order = self.tick_order()
+        inits = []
+        for index, switch in enumerate(self.switches):
+            if self.is_smart(switch):
+                pre = [self.sensors[s] for s in switch['sensors']]
+                inits.append(('smart%s' % index, max(c['init_timeout_ms'] for c in pre)))
+                self.emit('timeout_smart%s = %s' % (index, max(0 if SWITCH_MODES[c['switch_mode']] == 0 else -1 for c in pre)))
+                self.emit('was_free_%s = True' % index)
+                self.emit('last_smart%s = 0' % index)
+            else:
+                inits.append((switch['sensors'][0], self.sensors[switch['sensors'][0]]['init_timeout_ms']))
+        self.emit()
+
+        # the timeouts are counted in ms of measured time, like SwitchController.run
+        idle_timeout = self.layout['idle_timeout_ms']
+        if idle_timeout > 0:
+            self.emit('idle = False')
+            self.emit('quiet = 0')
+        self.emit('watch = StopWatch()')
+        self.emit('last = watch.time() - %s' % self.layout['dt'])
+        self.emit('while Button.CENTER not in buttons.pressed():')
+        self.emit('now = watch.time()', 1)
+        self.emit('elapsed = now - last', 1)
+        self.emit('last = now', 1)
+        if idle_timeout > 0:
+            self.emit('fired = False', 1)
+        for name in order:
+            if name.startswith('smart'):
+                self.smart_tick(int(name[5:]), 1)
+            else:
+                self.sensor_tick(name, 1)
+        for name in order:
+            if name.startswith('smart'):
+                self.smart_timeout(int(name[5:]), 1)
+        self.emit()
+
+        for index, switch in enumerate(self.switches):
+            port = switch['motor']
+            if self.is_smart(switch):
+                self.emit('if event_%s:' % index, 1)
+                self.emit('light(Color.RED)', 2)
+                self.emit('smart_%s(activated_%s, blocked_smart%s)' % (index, index, index), 2)
+            else:
+                self.emit('if state_%s:' % switch['sensors'][0], 1)
+                self.emit('light(Color.RED)', 2)
+                self.emit('random_%s()' % port, 2)
+            if idle_timeout > 0:
+                self.emit('fired = True', 2)
+        self.emit()
+        if idle_timeout > 0:
+            self.idle(idle_timeout)
+
+        self.emit('if %s:' % ' and '.join('timeout_%s <= 0' % name for name, _ in inits), 1)
+        self.emit('light(Color.GREEN)', 2)
+        self.emit('elif %s:' % ' or '.join('timeout_%s == %s' % (name, init) for name, init in inits), 1)
+        self.emit('light(Color.ORANGE)', 2)
+        self.emit('else:', 1)
+        self.emit('light(Color.YELLOW)', 2)
+        # wait for the slack of the tick, so a tick starts every dt ms
+        if idle_timeout > 0:
+            self.emit('slack = (%s if idle else %s) - (watch.time() - now)' % (self.layout['idle_dt'], self.layout['dt']), 1)
+        else:
+            self.emit('slack = %s - (watch.time() - now)' % self.layout['dt'], 1)
+        self.emit('if slack > 0:', 1)
+        self.emit('wait(slack)', 2)
+        self.emit()
+
+        self.emit('light(Color.BLUE)')
+        for switch in self.switches:
+            self.emit('reset_%s()' % switch['motor'])
+        self.emit('hub.system.shutdown()')
+
+
+def compile_layout(layout):
+    return Compiler(layout).compile()
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        layout = json.load(f)
+    program = compile_layout(layout)
+    if len(sys.argv) > 2:
+        with open(sys.argv[2], 'w') as f:
+            f.write(program)
+    else:
+        print(program, end='')
+
+
+if __name__ == '__main__':
+    main()
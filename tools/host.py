@@ -0,0 +1,64 @@
+"""
+Runs switch.py and its modules on the host, with the simulated PyBricks
+modules of tools/sim (see tools/sim/pybricks/__init__.py).
+
+The modules are compiled with postponed evaluation of annotations, like
+MicroPython which ignores them (e.g. SwitchMotor.register_successor names
+SwitchMotor in its own class body). Call install() before importing switch.
+"""
+import __future__
+import os
+import sys
+import types
+from importlib.abc import MetaPathFinder
+from importlib.machinery import SourceFileLoader
+from importlib.util import spec_from_file_location
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+SIM = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sim')
+
+_FLAGS = __future__.annotations.compiler_flag
+
+
+def compile_module(source, path):
+    return compile(source, path, 'exec', flags=_FLAGS, dont_inherit=True)
+
+
+class _Loader(SourceFileLoader):
+    # always compiles the source, a cached .pyc has been compiled without the flag
+    def get_code(self, fullname):
+        path = self.get_filename(fullname)
+        return compile_module(self.get_data(path), path)
+
+
+class _Finder(MetaPathFinder):
+    def find_spec(self, fullname, path=None, target=None):
+        if not fullname.startswith('switch'):
+            return None
+        filename = os.path.join(ROOT, fullname + '.py')
+        if not os.path.exists(filename):
+            return None
+        return spec_from_file_location(fullname, filename, loader=_Loader(fullname, filename))
+
+
+def install():
+    """
+    Puts the simulated PyBricks modules on the path and imports the modules of
+    switch.py with the annotations postponed.
+    """
+    if SIM not in sys.path:
+        sys.path.insert(0, SIM)
+    if not any(isinstance(finder, _Finder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _Finder())
+
+
+def load_source(name, source, path=None):
+    """
+    Executes the source of a module (e.g. an older switch.py) as a new module
+    with the given name, which is not added to sys.modules.
+    """
+    install()
+    module = types.ModuleType(name)
+    module.__file__ = path or name + '.py'
+    exec(compile_module(source, module.__file__), module.__dict__)
+    return module
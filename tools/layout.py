@@ -0,0 +1,280 @@
+"""
+The declarative layout format, shared by the host tools.
+
+A layout is a dict (or a JSON file) like
+{
+    "dt": 50,
+    "idle_timeout_ms": 60000,
+    "sensors": {
+        "A": {"type": "distance", "critical_distance": 40, "init_timeout_ms": 1000},
+        "C": {"post_sensor_init_timeout_ms": 2500, "post_sensor_delay_ms": 5000}
+    },
+    "motors": {
+        "B": {"probability_straight_to_curved": 0.5,
+              "probability_curved_to_straight": 0.8,
+              "successors": {"CURVED": "D"}},
+        "D": {}
+    },
+    "switches": [
+        {"sensors": ["A"], "motor": "B", "post_sensors": [[["STRAIGHT"], "C"]]}
+    ]
+}
+The keys of sensors and motors are the ports. Sensors and motors take the same
+options as SwitchSensor and SwitchMotor (the sensor "type" is one of auto,
+distance, ir, ultrasonic, color and defaults to distance; auto uses the
+SwitchSensor factory on the hub). Every switch registers its sensors with its
+motor. A switch with more than one sensor or with post-sensors uses a
+SmartSensor. The timeouts are given in ms (init_timeout_ms,
+post_sensor_init_timeout_ms, post_sensor_delay_ms); the old keys without _ms
+are still accepted and counted in ticks of dt. idle_timeout_ms and idle_dt
+are the options of the SwitchController (the idle mode is off by default),
+like seed (the seed of its random number generator, random if not given) and
+schedule (the number of decisions computed in advance, see DecisionSchedule).
+A switch with two sensors may give sensor_spacing_mm and clearance_mm to
+estimate the speed of the trains (see SmartSensor).
+
+On the hub, the layout is loaded from a packed binary blob (see pack()) by
+SwitchController.load(). All checks are done here on the host, so the hub can
+build the layout in a single pass.
+"""
+
+PORTS = 'ABCDEF'
+POSITIONS = {'STRAIGHT': 0, 'CURVED': 1}
+SWITCH_MODES = {'RISING_EDGE': 0, 'FALLING_EDGE': 1}
+SENSOR_TYPES = ['auto', 'distance', 'ir', 'ultrasonic', 'color']
+DIRECTIONS = ['CLOCKWISE', 'COUNTERCLOCKWISE']
+STOP_MODES = ['COAST', 'BRAKE', 'HOLD']
+
+# default critical distance per sensor type
+CRITICAL_DISTANCES = {
+    'distance': 30,
+    'ir': 60,
+    'ultrasonic': 120,
+    'color': 95,
+}
+
+SENSOR_DEFAULTS = {
+    'type': 'distance',
+    'switch_mode': 'FALLING_EDGE',
+    'init_timeout_ms': 1000,
+    'post_sensor_init_timeout_ms': 1000,
+    'post_sensor_delay_ms': 0,
+    'median_window': 1,
+    'ema_shift': 0,
+    'leave_distance': None,
+    'learn_gaps': False,
+    'min_init_timeout_ms': 200,
+    'max_init_timeout_ms': None,
+    'approach_ms': None,
+}
+
+MOTOR_DEFAULTS = {
+    'switch_position': 'STRAIGHT',
+    'direction': 'CLOCKWISE',
+    'probability_straight_to_curved': 0.5,
+    'probability_curved_to_straight': 0.5,
+    'turn_degrees': None,
+    'power': 750,
+    'stop_mode': 'COAST',
+    'successors': {},
+}
+
+VERSION = 6
+NONE = 0xFF # marks a missing index or value in a byte
+NONE16 = 0xFFFF # marks a missing value in two bytes
+
+# the timeouts of the sensors in ticks of dt, replaced by the ones in ms
+TICK_TIMEOUTS = ['init_timeout', 'post_sensor_init_timeout', 'post_sensor_delay']
+
+
+def normalize(layout):
+    """
+    Returns a copy of the layout with all defaults filled in.
+    """
+    layout = dict(layout)
+    layout.setdefault('dt', 50)
+    layout.setdefault('idle_timeout_ms', 0)
+    layout.setdefault('idle_dt', 500)
+    layout.setdefault('seed', None)
+    layout.setdefault('schedule', 0)
+    layout['sensors'] = {port: dict(SENSOR_DEFAULTS, **config) for port, config in layout['sensors'].items()}
+    for config in layout['sensors'].values():
+        for key in TICK_TIMEOUTS:
+            if key in config:
+                config[key + '_ms'] = config.pop(key) * layout['dt']
+        config.setdefault('critical_distance', CRITICAL_DISTANCES.get(config['type']))
+    layout['motors'] = {port: dict(MOTOR_DEFAULTS, **config) for port, config in layout['motors'].items()}
+    layout['switches'] = [dict({'post_sensors': [], 'sensor_spacing_mm': 0, 'clearance_mm': 0}, **switch) for switch in layout['switches']]
+    return layout
+
+
+def validate(layout):
+    """
+    Raises a ValueError if the (normalized) layout is invalid. This includes
+    the check of the post-sensor paths of a SmartSensor (see PathTrie), so a
+    layout fails here and not on the hub.
+    """
+    if layout['seed'] is not None and not 0 <= layout['seed'] < 0x10000:
+        raise ValueError("The seed must be between 0 and 65535")
+    if layout['schedule'] < 0:
+        raise ValueError("The schedule must not be negative")
+    sensors, motors = layout['sensors'], layout['motors']
+    for port in list(sensors) + list(motors):
+        if port not in PORTS:
+            raise ValueError("Unknown port <%s>" % port)
+    for port in set(sensors) & set(motors):
+        raise ValueError("Port <%s> is used by a sensor and a motor" % port)
+
+    for port, config in sensors.items():
+        if config['type'] not in SENSOR_TYPES:
+            raise ValueError("Unknown type <%s> of sensor <%s>" % (config['type'], port))
+        if config['switch_mode'] not in SWITCH_MODES:
+            raise ValueError("Unknown switch mode <%s> of sensor <%s>" % (config['switch_mode'], port))
+        if config['init_timeout_ms'] < 1:
+            raise ValueError("The init_timeout_ms of sensor <%s> must be positive" % port)
+        if not 1 <= config['median_window'] < NONE or not 0 <= config['ema_shift'] < 16:
+            raise ValueError("Invalid median_window or ema_shift of sensor <%s>" % port)
+        if config['leave_distance'] is not None and config['critical_distance'] is not None and config['leave_distance'] < config['critical_distance']:
+            raise ValueError("The leave_distance of sensor <%s> must be at least the critical_distance" % port)
+        if config['learn_gaps'] and not 1 <= config['min_init_timeout_ms'] <= (config['max_init_timeout_ms'] or config['init_timeout_ms']) < NONE16:
+            raise ValueError("Invalid bounds of the learned init_timeout of sensor <%s>" % port)
+        if config['approach_ms'] is not None and not 0 <= config['approach_ms'] < NONE16:
+            raise ValueError("The approach_ms of sensor <%s> must be between 0 and %s" % (port, NONE16 - 1))
+        for key in TICK_TIMEOUTS:
+            if not 0 <= config[key + '_ms'] < NONE16:
+                raise ValueError("The %s_ms of sensor <%s> must be between 0 and %s" % (key, port, NONE16 - 1))
+
+    parents = {}
+    for port, config in motors.items():
+        if config['direction'] not in DIRECTIONS or config['stop_mode'] not in STOP_MODES:
+            raise ValueError("Unknown direction or stop mode of motor <%s>" % port)
+        for position, successor in config['successors'].items():
+            if position not in POSITIONS or successor not in motors:
+                raise ValueError("Invalid successor <%s: %s> of motor <%s>" % (position, successor, port))
+            if successor in parents:
+                raise ValueError("Motor <%s> is the successor of more than one motor" % successor)
+            parents[successor] = port
+    for port in motors:
+        seen = set()
+        while port in parents:
+            if port in seen:
+                raise ValueError("The successors of motor <%s> form a cycle" % port)
+            seen.add(port)
+            port = parents[port]
+
+    for switch in layout['switches']:
+        if switch['motor'] not in motors or switch['motor'] in parents:
+            raise ValueError("Switch motor <%s> is unknown or the successor of another motor" % switch['motor'])
+        if not switch['sensors']:
+            raise ValueError("Switch with motor <%s> has no sensors" % switch['motor'])
+        for sensor in switch['sensors'] + [port for _, port in switch['post_sensors']]:
+            if sensor not in sensors:
+                raise ValueError("Unknown sensor <%s>" % sensor)
+        for key in ('sensor_spacing_mm', 'clearance_mm'):
+            if not 0 <= switch[key] < 0x10000:
+                raise ValueError("Invalid %s <%s> of switch with motor <%s>" % (key, switch[key], switch['motor']))
+        if switch['sensor_spacing_mm'] and len(switch['sensors']) < 2:
+            raise ValueError("Switch with motor <%s> needs two sensors to estimate the speed" % switch['motor'])
+
+        paths = [tuple(path) for path, _ in switch['post_sensors']]
+        for path in paths:
+            motor = switch['motor']
+            for position in path:
+                if position not in POSITIONS:
+                    raise ValueError("Unknown position <%s> in path <%s>" % (position, path))
+                if motor is None:
+                    raise ValueError("Path <%s> is longer than the motor tree" % (path,))
+                motor = motors[motor]['successors'].get(position)
+        for path1 in paths:
+            for path2 in paths:
+                if path1 != path2 and path1 == path2[:len(path1)]:
+                    raise ValueError("The configuration of the post_sensors is invalid! Path <%s> and Path <%s> is a subpath/ superpath pair!" % (path2, path1))
+
+
+def pack(layout):
+    """
+    Packs the layout into the binary blob read by SwitchController.load():
+    - version, dt (2 bytes)
+    - number of sensors, per sensor: port, type, switch mode,
+      critical_distance (2 bytes, 0xFFFF = default of the type),
+      init_timeout_ms, post_sensor_init_timeout_ms and post_sensor_delay_ms
+      (2 bytes each), median_window, ema_shift, leave_distance (2 bytes,
+      0xFFFF = critical_distance), min_init_timeout_ms and
+      max_init_timeout_ms (2 bytes each, both 0 = no gap learning),
+      approach_ms (2 bytes, 0xFFFF = None)
+    - number of motors, per motor: port, switch position, direction, stop
+      mode, both probabilities (2 bytes each, in 1/10000), turn_degrees (2
+      bytes, signed, 0x7FFF = auto calibration), power (2 bytes), motor index
+      of the STRAIGHT and of the CURVED successor (0xFF = none)
+    - number of switches, per switch: motor index, number of pre-sensors, the
+      pre-sensor indices, number of post-sensors, per post-sensor: path
+      length, path (bit i is the position of the i-th switch), sensor index,
+      sensor_spacing_mm and clearance_mm (2 bytes each, 0 = no speed
+      estimation)
+    Multi-byte values are little endian. Motors are packed with successors
+    first, so the hub can build every motor tree in a single pass.
+    """
+    layout = normalize(layout)
+    validate(layout)
+    sensors, motors = layout['sensors'], layout['motors']
+    data = bytearray([VERSION])
+
+    def u16(value):
+        data.extend([value & 0xFF, (value >> 8) & 0xFF])
+
+    u16(layout['dt'])
+    sensor_ports = list(sensors)
+    data.append(len(sensor_ports))
+    for port in sensor_ports:
+        config = sensors[port]
+        data.extend([PORTS.index(port), SENSOR_TYPES.index(config['type']), SWITCH_MODES[config['switch_mode']]])
+        u16(NONE16 if config['critical_distance'] is None else config['critical_distance'])
+        for key in TICK_TIMEOUTS:
+            u16(config[key + '_ms'])
+        data.extend([config['median_window'], config['ema_shift']])
+        u16(NONE16 if config['leave_distance'] is None else config['leave_distance'])
+        if config['learn_gaps']:
+            u16(config['min_init_timeout_ms'])
+            u16(config['max_init_timeout_ms'] or config['init_timeout_ms'])
+        else:
+            u16(0)
+            u16(0)
+        u16(NONE16 if config['approach_ms'] is None else config['approach_ms'])
+
+    motor_ports = []
+
+    def add_motor(port):
+        for successor in motors[port]['successors'].values():
+            add_motor(successor)
+        motor_ports.append(port)
+
+    for port in motors:
+        if port not in motor_ports and not any(port in m['successors'].values() for m in motors.values()):
+            add_motor(port)
+    data.append(len(motor_ports))
+    for port in motor_ports:
+        config = motors[port]
+        data.extend([PORTS.index(port), POSITIONS[config['switch_position']],
+                     DIRECTIONS.index(config['direction']), STOP_MODES.index(config['stop_mode'])])
+        u16(round(config['probability_straight_to_curved'] * 10000))
+        u16(round(config['probability_curved_to_straight'] * 10000))
+        u16(0x7FFF if config['turn_degrees'] is None else config['turn_degrees'] & 0xFFFF)
+        u16(config['power'])
+        for position in ('STRAIGHT', 'CURVED'):
+            successor = config['successors'].get(position)
+            data.append(NONE if successor is None else motor_ports.index(successor))
+
+    data.append(len(layout['switches']))
+    for switch in layout['switches']:
+        data.append(motor_ports.index(switch['motor']))
+        data.append(len(switch['sensors']))
+        data.extend(sensor_ports.index(port) for port in switch['sensors'])
+        data.append(len(switch['post_sensors']))
+        for path, port in switch['post_sensors']:
+            bits = 0
+            for i, position in enumerate(path):
+                bits |= POSITIONS[position] << i
+            data.extend([len(path), bits, sensor_ports.index(port)])
+        u16(switch['sensor_spacing_mm'])
+        u16(switch['clearance_mm'])
+    return bytes(data)
@@ -0,0 +1,53 @@
+"""
+Packs a declarative switch layout into a hub program for switch.py.
+
+The layout (see tools/layout.py) is checked on the host and packed into a
+small binary blob. The generated program only loads this blob with
+SwitchController.load(), so the hub does not need to run (and keep) the Python
+setup code of the layout. Upload the program together with switch.py and its
+modules.
+
+Usage: python tools/pack_layout.py LAYOUT.json [OUTPUT.py]
+"""
+import json
+import sys
+
+from layout import normalize, pack
+
+
+def pack_program(layout):
+    layout = normalize(layout)
+    options = []
+    if layout['idle_timeout_ms'] > 0:
+        options.append('idle_timeout_ms=%s, idle_dt=%s' % (layout['idle_timeout_ms'], layout['idle_dt']))
+    if layout['seed'] is not None:
+        options.append('seed=%s' % layout['seed'])
+    if layout['schedule'] > 0:
+        options.append('schedule=%s' % layout['schedule'])
+    return '\n'.join([
+        '# generated by tools/pack_layout.py, do not edit',
+        'from switch import SwitchController',
+        '',
+        'LAYOUT = %r' % pack(layout),
+        '',
+        'controller = SwitchController(%s)' % ', '.join(options),
+        'controller.load(LAYOUT)',
+        'controller.run()',
+    ]) + '\n'
+
+
+def main():
+    if len(sys.argv) not in (2, 3):
+        print(__doc__)
+        sys.exit(1)
+    with open(sys.argv[1]) as f:
+        program = pack_program(json.load(f))
+    if len(sys.argv) == 3:
+        with open(sys.argv[2], 'w') as f:
+            f.write(program)
+    else:
+        print(program, end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""
+A small simulation of the PyBricks modules used by switch.py, so the tools and
+tests can run the controller on the host. Time only passes in wait() and in
+the moves of the motors (see pybricks.tools.CLOCK), and the sensors read the
+distances given in pybricks.pupdevices.READINGS.
+"""
@@ -0,0 +1,69 @@
+class _Light:
+    def __init__(self):
+        self.colors = []
+
+    def on(self, color):
+        self.colors.append(color)
+
+    def off(self):
+        self.colors.append(None)
+
+
+class _Display:
+    def __init__(self):
+        self.icons = []
+
+    def icon(self, matrix):
+        self.icons.append(matrix)
+
+    def off(self):
+        self.icons.append(None)
+
+    def orientation(self, side):
+        pass
+
+
+class _Buttons:
+    def __init__(self):
+        self.pressed_buttons = set()
+
+    def pressed(self):
+        return self.pressed_buttons
+
+
+class _System:
+    def __init__(self):
+        self.data = bytearray(512)
+
+    def set_stop_button(self, button):
+        pass
+
+    def shutdown(self):
+        pass
+
+    def storage(self, offset, write=None, read=None):
+        if write is not None:
+            self.data[offset:offset + len(write)] = write
+        else:
+            return bytes(self.data[offset:offset + read])
+
+
+class ThisHub:
+    def __init__(self, display=True):
+        self.light = _Light()
+        self.buttons = _Buttons()
+        self.button = self.buttons
+        self.system = _System()
+        if display:
+            self.display = _Display()
+
+
+PrimeHub = InventorHub = ThisHub
+
+
+class CityHub(ThisHub):
+    def __init__(self):
+        super().__init__(display=False)
+
+
+TechnicHub = MoveHub = CityHub
@@ -0,0 +1,11 @@
+from pybricks.pupdevices import IDS
+
+
+class PUPDevice:
+    def __init__(self, port):
+        if port not in IDS:
+            raise OSError(19) # ENODEV
+        self.port = port
+
+    def info(self):
+        return {'id': IDS[self.port]}
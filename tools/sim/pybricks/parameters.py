@@ -0,0 +1,48 @@
+class _Constant:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+class Port:
+    pass
+
+
+for _port in 'ABCDEF':
+    setattr(Port, _port, _Constant('Port.' + _port))
+
+
+class Direction:
+    CLOCKWISE = 0
+    COUNTERCLOCKWISE = 1
+
+
+class Button:
+    CENTER = 'CENTER'
+    LEFT = 'LEFT'
+    RIGHT = 'RIGHT'
+    BLUETOOTH = 'BLUETOOTH'
+
+
+class Color:
+    RED = 'RED'
+    ORANGE = 'ORANGE'
+    YELLOW = 'YELLOW'
+    GREEN = 'GREEN'
+    BLUE = 'BLUE'
+    MAGENTA = 'MAGENTA'
+    WHITE = 'WHITE'
+    NONE = 'NONE'
+
+
+class Stop:
+    COAST = 'COAST'
+    BRAKE = 'BRAKE'
+    HOLD = 'HOLD'
+
+
+class Side:
+    TOP = 'TOP'
+    BOTTOM = 'BOTTOM'
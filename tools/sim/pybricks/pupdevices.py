@@ -0,0 +1,76 @@
+from pybricks.tools import CLOCK
+
+# the device id of every connected port (see pybricks.iodevices.PUPDevice)
+IDS = {}
+# the distances every sensor reads, one per call (100 when the list is empty)
+READINGS = {}
+# the time in ms a motor needs for a move
+MOVE_TIME = 300
+# every move of a motor as (port, target angle)
+MOVES = []
+
+
+def reset():
+    IDS.clear()
+    READINGS.clear()
+    MOVES.clear()
+    CLOCK[0] = 0
+
+
+class _Sensor:
+    ID = None # the device id of the sensor type
+
+    def __init__(self, port, *args, **kwargs):
+        if IDS.get(port) != self.ID:
+            raise OSError(19) # ENODEV
+        self.port = port
+
+    def distance(self):
+        readings = READINGS.get(self.port)
+        return readings.pop(0) if readings else 100
+
+    def reflection(self):
+        return 100 - self.distance()
+
+
+class ColorDistanceSensor(_Sensor):
+    ID = 37
+
+
+class InfraredSensor(_Sensor):
+    ID = 35
+
+
+class UltrasonicSensor(_Sensor):
+    ID = 62
+
+
+class ColorSensor(_Sensor):
+    ID = 61
+
+
+class Motor:
+    def __init__(self, port, positive_direction=0, *args, **kwargs):
+        self.port = port
+        self.current_angle = 0
+
+    def reset_angle(self, angle):
+        self.current_angle = angle
+
+    def angle(self):
+        return self.current_angle
+
+    def stop(self):
+        pass
+
+    def hold(self):
+        pass
+
+    def run_until_stalled(self, speed, *args, **kwargs):
+        self.current_angle = 200 if speed > 0 else -200
+        return self.current_angle
+
+    def run_target(self, speed, target_angle, then=None, wait=True):
+        CLOCK[0] += MOVE_TIME
+        MOVES.append((self.port, target_angle))
+        self.current_angle = target_angle
@@ -0,0 +1,52 @@
+# the simulated time in ms
+CLOCK = [0]
+
+
+def wait(time):
+    CLOCK[0] += time
+
+
+class StopWatch:
+    def __init__(self):
+        self.start = CLOCK[0]
+
+    def time(self):
+        return CLOCK[0] - self.start
+
+    def reset(self):
+        self.start = CLOCK[0]
+
+
+class Matrix:
+    def __init__(self, rows):
+        self.rows = [list(row) for row in rows]
+
+    def __mul__(self, other):
+        return Matrix([[sum(a * b for a, b in zip(row, column)) for column in zip(*other.rows)] for row in self.rows])
+
+    def __iter__(self):
+        for row in self.rows:
+            yield from row
+
+    def __len__(self):
+        return len(self.rows) * len(self.rows[0])
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return list(self)[key]
+        row, column = key
+        return self.rows[row][column]
+
+    def __eq__(self, other):
+        return isinstance(other, Matrix) and other.rows == self.rows
+
+    def __repr__(self):
+        return 'Matrix(%r)' % self.rows
+
+    @property
+    def shape(self):
+        return len(self.rows), len(self.rows[0])
+
+
+def vector(*values):
+    return Matrix([list(values)])
@@ -0,0 +1 @@
+from math import *
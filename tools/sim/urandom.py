@@ -0,0 +1 @@
+from random import random, uniform, seed, getrandbits, randint, choice